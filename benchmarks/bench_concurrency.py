@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Concurrency load test: sync Flask under gunicorn vs the ASGI entry point
+Runs the same closed-loop workload against each serving mode in a single
+process: N clients each post /api/track-order for a new order as soon as
+their last one returns, while the carrier stand-in answers slowly like a
+real scrape. A /health probe runs alongside.
+
+Reports, per mode, how many carrier lookups were in flight at once, completed
+lookups per second, request latency, /health latency under load and peak RSS
+of the app process, so concurrency can be compared at equal memory.
+
+Usage:
+    python benchmarks/bench_concurrency.py --clients 64 --duration 30
+    python benchmarks/bench_concurrency.py --servers asgi --carrier-latency 20
+
+Runs the HTTP fetch tier only, so no browser is needed; the carrier latency
+stands in for the page load.
+"""
+import argparse
+import json
+import os
+import subprocess
+import tempfile
+import threading
+import time
+import requests
+
+from bench_e2e import RESULTS_DIR, ROOT, MemorySampler, app_command, free_port, git_revision, percentile, wait_for
+from fakes import CarrierPages, FakeWooCommerce, OpenAIStub
+
+
+def summarize(latencies):
+    latencies = sorted(latencies)
+    return {
+        'p50': percentile(latencies, 0.50),
+        'p95': percentile(latencies, 0.95),
+        'max': latencies[-1] if latencies else None,
+    }
+
+
+def run_closed_loop(base_url, clients, duration, first_order_id):
+    """
+    `clients` threads looping over fresh orders until the deadline, plus a
+    /health probe every half second
+    """
+    deadline = time.monotonic() + duration
+    latencies = []
+    errors = {}
+    health_latencies = []
+    lock = threading.Lock()
+    next_order = iter(range(first_order_id, first_order_id + 10 ** 7))
+
+    def client():
+        session = requests.Session()
+        while time.monotonic() < deadline:
+            with lock:
+                order_id = next(next_order)
+            started = time.monotonic()
+            try:
+                response = session.post(f"{base_url}/api/track-order", json={'order_number': str(order_id), 'enhanced': True}, timeout=180)
+                error = None if response.status_code == 200 else f"HTTP {response.status_code}"
+            except Exception as e:
+                error = type(e).__name__
+            with lock:
+                if error is None:
+                    latencies.append(time.monotonic() - started)
+                else:
+                    errors[error] = errors.get(error, 0) + 1
+
+    def probe():
+        session = requests.Session()
+        while time.monotonic() < deadline:
+            started = time.monotonic()
+            try:
+                session.get(f"{base_url}/health", timeout=60)
+                health_latencies.append(time.monotonic() - started)
+            except Exception:
+                health_latencies.append(float('inf'))
+            time.sleep(0.5)
+
+    threads = [threading.Thread(target=client, daemon=True) for _ in range(clients)]
+    threads.append(threading.Thread(target=probe, daemon=True))
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    return {
+        'completed': len(latencies),
+        'errors': errors,
+        'throughput_rps': round(len(latencies) / elapsed, 3),
+        'latency_seconds': summarize(latencies),
+        'health_latency_seconds': summarize(health_latencies),
+    }
+
+
+def run_server(server, args, env, workdir):
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    log_path = os.path.join(workdir, f"{server}.log")
+    process = subprocess.Popen(
+        app_command(server, port, args.threads),
+        cwd=ROOT, env=env, stdout=open(log_path, 'w'), stderr=subprocess.STDOUT,
+    )
+    try:
+        wait_for(lambda: requests.get(f"{base_url}/health", timeout=2).ok, 60, f"{server} app server")
+        sampler = MemorySampler({'app': process}, interval=0.25).start()
+        run = run_closed_loop(base_url, args.clients, args.duration, first_order_id=10 ** 6)
+        sampler.stop()
+        run['peak_rss_mb'] = round(sampler.peaks['app'] / 2 ** 20, 1)
+        return run
+    finally:
+        process.terminate()
+        process.wait(30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--servers', default='wsgi,asgi', help='serving modes to compare')
+    parser.add_argument('--clients', type=int, default=64, help='concurrent closed-loop clients')
+    parser.add_argument('--duration', type=float, default=30, help='seconds of load per mode')
+    parser.add_argument('--carrier-latency', type=float, default=5.0, help='seconds per carrier page, i.e. one slow scrape')
+    parser.add_argument('--woocommerce-latency', type=float, default=0.05)
+    parser.add_argument('--threads', type=int, default=8, help='gunicorn threads, as in the Dockerfile')
+    parser.add_argument('--output', help='result file (default: benchmarks/results/concurrency-<time>.json)')
+    args = parser.parse_args()
+    args.servers = [server.strip() for server in args.servers.split(',') if server.strip()]
+
+    woocommerce = FakeWooCommerce(args.woocommerce_latency).start()
+    carrier_pages = CarrierPages(args.carrier_latency).start()
+    openai_stub = OpenAIStub(0.8).start()
+    workdir = tempfile.mkdtemp(prefix='tracking-bench-')
+
+    results = {
+        'benchmark': 'track-order-concurrency',
+        'revision': git_revision(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'config': {
+            'clients': args.clients,
+            'duration': args.duration,
+            'carrier_latency': args.carrier_latency,
+            'gunicorn_threads': args.threads,
+        },
+        'servers': {},
+    }
+    for server in args.servers:
+        env = dict(
+            os.environ,
+            WOOCOMMERCE_URL=woocommerce.url,
+            OPENAI_API_BASE=f"{openai_stub.url}/v1",
+            OPENAI_API_KEY='benchmark',
+            CARRIER_URL_OVERRIDE=carrier_pages.url_template,
+            DATABASE_URL=f"sqlite:///{os.path.join(workdir, f'{server}.db')}",
+            # Nothing listens here; the pages are all served by the HTTP tier
+            BROWSERLESS_ENDPOINT=f"ws://127.0.0.1:{free_port()}/",
+            # Let the serving mode, not the client pools, bound concurrency
+            HTTP_FETCH_POOL_SIZE=str(args.clients),
+            WOOCOMMERCE_POOL_SIZE=str(args.clients),
+            ORDER_SYNC_INTERVAL='0',
+            REFRESH_SCHEDULER_ENABLED='false',
+            PYTHONUNBUFFERED='1',
+        )
+        carrier_pages.reset_peak()
+        print(f"▶ {server}: {args.clients} clients for {args.duration}s, {args.carrier_latency}s per scrape")
+        run = run_server(server, args, env, workdir)
+        run['peak_lookups_in_flight'] = carrier_pages.peak_in_flight
+        results['servers'][server] = run
+
+        latency, health = run['latency_seconds'], run['health_latency_seconds']
+        fmt = lambda value: f"{value:.2f}s" if value is not None else 'n/a'
+        print(
+            f"  {run['peak_lookups_in_flight']} lookups in flight, {run['throughput_rps']} rps, "
+            f"p50 {fmt(latency['p50'])} p95 {fmt(latency['p95'])}, /health p95 {fmt(health['p95'])}, "
+            f"peak RSS {run['peak_rss_mb']} MB, errors {run['errors'] or 'none'}"
+        )
+
+    output = args.output or os.path.join(RESULTS_DIR, f"concurrency-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"💾 Results saved to {output}")
+
+    woocommerce.stop()
+    carrier_pages.stop()
+    openai_stub.stop()
+
+
+if __name__ == '__main__':
+    main()
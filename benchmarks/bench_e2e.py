@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+"""
+Offline end-to-end benchmark for /api/track-order
+Starts local stand-ins for WooCommerce, the carrier sites and OpenAI, a local
+Playwright browser server in place of Browserless, and the app itself under
+gunicorn (or uvicorn with --server asgi), then drives open-loop load at fixed
+request rates.
+
+Reports p50/p95/p99 latency, achieved requests per second, errors and memory
+per rate, and saves everything as JSON under benchmarks/results/.
+
+Usage:
+    python benchmarks/bench_e2e.py --rates 1,2,5 --duration 30
+    python benchmarks/bench_e2e.py --tiers http --rates 5,10,20
+    python benchmarks/bench_e2e.py --compare benchmarks/results/baseline.json
+    python benchmarks/bench_e2e.py --server asgi --rates 5,10,20
+    python benchmarks/bench_e2e.py --tiers browser --browser-backend local
+
+--tiers auto lets the app pick (HTTP first, browser on escalation), browser
+disables the HTTP tier, http runs without a browser server. --browser-backend
+local has the app launch its own Chromium pool instead of connecting to the
+browser server; its memory then counts towards the app. Browser tiers need
+`playwright install chromium`.
+"""
+import argparse
+import json
+import math
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+
+from fakes import CarrierPages, FakeWooCommerce, OpenAIStub
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(check, timeout, what):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if check():
+                return
+        except Exception:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Timed out waiting for {what}")
+
+
+def process_tree_rss(pid):
+    """
+    Resident memory in bytes of a process and all of its descendants
+    """
+    total = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f"/proc/{current}/status") as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        total += int(line.split()[1]) * 1024
+                        break
+            for task in os.listdir(f"/proc/{current}/task"):
+                with open(f"/proc/{current}/task/{task}/children") as f:
+                    pending.extend(int(child) for child in f.read().split())
+        except (FileNotFoundError, ProcessLookupError, PermissionError):
+            continue
+    return total
+
+
+class MemorySampler:
+    """
+    Samples the RSS of the given process trees in the background
+    """
+    def __init__(self, processes, interval=0.5):
+        self.processes = processes
+        self.interval = interval
+        self.peaks = {name: 0 for name in processes}
+        self.last = {name: 0 for name in processes}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def reset_peaks(self):
+        self.peaks = dict(self.last)
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.is_set():
+            for name, process in self.processes.items():
+                rss = process_tree_rss(process.pid)
+                self.last[name] = rss
+                self.peaks[name] = max(self.peaks[name], rss)
+            self._stop.wait(self.interval)
+
+
+def app_command(server, port, threads):
+    """
+    Command line for the app under gunicorn (sync Flask, as in the Dockerfile's
+    wsgi mode) or uvicorn (the ASGI entry point)
+    """
+    if server == 'asgi':
+        return [
+            sys.executable, '-m', 'uvicorn', '--host', '127.0.0.1', '--port', str(port),
+            '--workers', '1', '--no-access-log', '--app-dir', os.path.join(ROOT, 'src'), 'asgi:app',
+        ]
+    return [
+        sys.executable, '-m', 'gunicorn', '--bind', f"127.0.0.1:{port}", '--workers', '1',
+        '--worker-class', 'gthread', '--threads', str(threads), '--timeout', '120',
+        '--chdir', os.path.join(ROOT, 'src'), 'wsgi:app',
+    ]
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    # Nearest rank: the smallest value with at least `fraction` of the samples at or below it
+    index = min(len(sorted_values) - 1, max(0, math.ceil(round(fraction * len(sorted_values), 9)) - 1))
+    return sorted_values[index]
+
+
+def run_rate(base_url, rate, duration, first_order_id, max_in_flight, warm_orders):
+    """
+    Open-loop load: one request every 1/rate seconds for duration seconds.
+    Latency is measured from the scheduled send time, so queueing in the
+    client counts against the server instead of hiding it.
+    """
+    session = requests.Session()
+    session.mount('http://', requests.adapters.HTTPAdapter(pool_maxsize=max_in_flight))
+    total = max(1, int(rate * duration))
+    results = []
+    lock = threading.Lock()
+
+    def send(index, scheduled):
+        order_id = first_order_id + (index % warm_orders if warm_orders else index)
+        try:
+            response = session.post(f"{base_url}/api/track-order", json={'order_number': str(order_id), 'enhanced': True}, timeout=180)
+            body = response.json() if response.headers.get('content-type', '').startswith('application/json') else {}
+            ok = response.status_code == 200 and body.get('success', False)
+            method = (body.get('enhanced_tracking') or {}).get('extraction_method') if ok else None
+            error = None if ok else f"HTTP {response.status_code}"
+        except Exception as e:
+            ok, method, error = False, None, type(e).__name__
+        with lock:
+            results.append({'latency': time.monotonic() - scheduled, 'ok': ok, 'method': method, 'error': error})
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+        for index in range(total):
+            scheduled = started + index / rate
+            delay = scheduled - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(send, index, scheduled)
+    elapsed = time.monotonic() - started
+
+    latencies = sorted(result['latency'] for result in results if result['ok'])
+    methods = {}
+    errors = {}
+    for result in results:
+        if result['ok']:
+            methods[result['method']] = methods.get(result['method'], 0) + 1
+        else:
+            errors[result['error']] = errors.get(result['error'], 0) + 1
+
+    return {
+        'target_rps': rate,
+        'requests': len(results),
+        'succeeded': len(latencies),
+        'errors': errors,
+        'achieved_rps': round(len(latencies) / elapsed, 3) if elapsed else 0.0,
+        'elapsed_seconds': round(elapsed, 3),
+        'latency_seconds': {
+            'p50': percentile(latencies, 0.50),
+            'p95': percentile(latencies, 0.95),
+            'p99': percentile(latencies, 0.99),
+            'max': latencies[-1] if latencies else None,
+            'mean': sum(latencies) / len(latencies) if latencies else None,
+        },
+        'extraction_methods': methods,
+    }
+
+
+def compare(results, baseline_path, threshold):
+    """
+    Regressions against a saved run: p95 slower or throughput lower by more than threshold
+    """
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+
+    baseline_runs = {run['target_rps']: run for run in baseline['runs']}
+    regressions = []
+    for run in results['runs']:
+        before = baseline_runs.get(run['target_rps'])
+        if before is None:
+            continue
+        p95, before_p95 = run['latency_seconds']['p95'], before['latency_seconds']['p95']
+        if p95 and before_p95 and p95 > before_p95 * (1 + threshold):
+            regressions.append(f"{run['target_rps']} rps: p95 {before_p95:.3f}s -> {p95:.3f}s")
+        if run['achieved_rps'] < before['achieved_rps'] * (1 - threshold):
+            regressions.append(f"{run['target_rps']} rps: throughput {before['achieved_rps']} -> {run['achieved_rps']} rps")
+    return regressions
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, text=True).strip()
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rates', default='1,2,5', help='comma-separated target request rates (per second)')
+    parser.add_argument('--duration', type=float, default=30, help='seconds of load per rate')
+    parser.add_argument('--tiers', choices=('auto', 'http', 'browser'), default='auto')
+    parser.add_argument('--warm-orders', type=int, default=0,
+                        help='cycle through this many orders so caches are warm (default: every request is a new order)')
+    parser.add_argument('--max-in-flight', type=int, default=64)
+    parser.add_argument('--woocommerce-latency', type=float, default=0.05)
+    parser.add_argument('--carrier-latency', type=float, default=0.3)
+    parser.add_argument('--openai-latency', type=float, default=0.8)
+    parser.add_argument('--server', choices=('wsgi', 'asgi'), default='wsgi', help='gunicorn or uvicorn serving mode')
+    parser.add_argument('--browser-backend', choices=('browserless', 'local'), default='browserless',
+                        help='connect to a browser server, or launch Chromium inside the app')
+    parser.add_argument('--threads', type=int, default=8, help='gunicorn threads, as in the Dockerfile')
+    parser.add_argument('--output', help='result file (default: benchmarks/results/e2e-<time>.json)')
+    parser.add_argument('--compare', help='baseline result file to check for regressions')
+    parser.add_argument('--threshold', type=float, default=0.1, help='allowed regression fraction for --compare')
+    args = parser.parse_args()
+    rates = [float(rate) for rate in args.rates.split(',') if rate.strip()]
+
+    woocommerce = FakeWooCommerce(args.woocommerce_latency).start()
+    carrier_pages = CarrierPages(args.carrier_latency).start()
+    openai_stub = OpenAIStub(args.openai_latency).start()
+    workdir = tempfile.mkdtemp(prefix='tracking-bench-')
+    processes = {}
+
+    try:
+        env = dict(
+            os.environ,
+            WOOCOMMERCE_URL=woocommerce.url,
+            OPENAI_API_BASE=f"{openai_stub.url}/v1",
+            OPENAI_API_KEY='benchmark',
+            CARRIER_URL_OVERRIDE=carrier_pages.url_template,
+            DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+            HTTP_FETCH_ENABLED='false' if args.tiers == 'browser' else 'true',
+            BROWSER_BACKEND=args.browser_backend,
+            PYTHONUNBUFFERED='1',
+        )
+
+        if args.tiers != 'http' and args.browser_backend == 'browserless':
+            browser_port = free_port()
+            processes['browser'] = subprocess.Popen(
+                [sys.executable, '-m', 'playwright', 'run-server', '--port', str(browser_port), '--host', '127.0.0.1'],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+            wait_for(lambda: socket.create_connection(('127.0.0.1', browser_port), 1).close() is None, 30, 'browser server')
+            env['BROWSERLESS_ENDPOINT'] = f"ws://127.0.0.1:{browser_port}/"
+        elif args.tiers == 'http':
+            # Nothing listens here, so any escalation fails fast and shows up as a fallback
+            env['BROWSER_BACKEND'] = 'browserless'
+            env['BROWSERLESS_ENDPOINT'] = f"ws://127.0.0.1:{free_port()}/"
+
+        app_port = free_port()
+        base_url = f"http://127.0.0.1:{app_port}"
+        log_path = os.path.join(workdir, 'app.log')
+        processes['app'] = subprocess.Popen(
+            app_command(args.server, app_port, args.threads),
+            cwd=ROOT, env=env, stdout=open(log_path, 'w'), stderr=subprocess.STDOUT,
+        )
+        wait_for(lambda: requests.get(f"{base_url}/health", timeout=2).ok, 60, 'app server')
+
+        sampler = MemorySampler(processes, interval=0.5).start()
+        runs = []
+        first_order_id = 100000
+        for rate in rates:
+            sampler.reset_peaks()
+            print(f"▶ {rate} rps for {args.duration}s")
+            run = run_rate(base_url, rate, args.duration, first_order_id, args.max_in_flight, args.warm_orders)
+            if not args.warm_orders:
+                first_order_id += run['requests']
+            run['memory_mb'] = {
+                name: {'peak': round(sampler.peaks[name] / 2 ** 20, 1), 'end': round(sampler.last[name] / 2 ** 20, 1)}
+                for name in processes
+            }
+            runs.append(run)
+
+            latency = run['latency_seconds']
+            fmt = lambda value: f"{value:.3f}s" if value is not None else 'n/a'
+            print(
+                f"  {run['succeeded']}/{run['requests']} ok, {run['achieved_rps']} rps, "
+                f"p50 {fmt(latency['p50'])} p95 {fmt(latency['p95'])} p99 {fmt(latency['p99'])}, "
+                f"app peak {run['memory_mb']['app']['peak']} MB, errors {run['errors'] or 'none'}"
+            )
+        sampler.stop()
+
+        health = requests.get(f"{base_url}/health", timeout=5).json()
+        results = {
+            'benchmark': 'track-order-e2e',
+            'revision': git_revision(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'config': {
+                'tiers': args.tiers,
+                'server': args.server,
+                'duration': args.duration,
+                'warm_orders': args.warm_orders,
+                'threads': args.threads,
+                'latency': {
+                    'woocommerce': args.woocommerce_latency,
+                    'carrier': args.carrier_latency,
+                    'openai': args.openai_latency,
+                },
+            },
+            'runs': runs,
+            'fetch_tiers': health.get('fetch_tiers'),
+            'stand_in_requests': {
+                'woocommerce': woocommerce.requests,
+                'carrier_pages': carrier_pages.requests,
+                'openai': openai_stub.requests,
+            },
+        }
+
+        output = args.output or os.path.join(RESULTS_DIR, f"e2e-{time.strftime('%Y%m%d-%H%M%S')}.json")
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+        with open(output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Results saved to {output}")
+
+        if args.compare:
+            regressions = compare(results, args.compare, args.threshold)
+            for regression in regressions:
+                print(f"❌ Regression: {regression}")
+            if regressions:
+                sys.exit(1)
+            print("✅ No regressions against baseline")
+
+    finally:
+        for process in processes.values():
+            process.terminate()
+        for process in processes.values():
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        woocommerce.stop()
+        carrier_pages.stop()
+        openai_stub.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
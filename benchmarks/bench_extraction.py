@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Page text extraction micro-benchmark
+Compares the legacy regex HTML fallback and DOM walk with the streaming converter
+and single-pass TreeWalker from src/page_text.py on large saved pages
+
+Usage:
+    python benchmarks/bench_extraction.py [saved_page.html ...] [--browser] [--repeat N]
+
+Without saved pages a synthetic carrier page (~750 KB) is generated. --browser
+also times the in-page scripts in a local Chromium (needs `playwright install chromium`).
+"""
+import argparse
+import asyncio
+import logging
+import os
+import re
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from content_reducer import reduce_page_content  # noqa: E402
+from page_text import PAGE_TEXT_SCRIPT, html_to_text, page_text_arguments  # noqa: E402
+
+# The in-page extraction this replaced: innerText, then a quadratic element walk
+LEGACY_PAGE_SCRIPT = '''
+() => {
+    const unwanted = document.querySelectorAll('script, style, noscript, iframe');
+    unwanted.forEach(el => el.remove());
+    const body = document.body;
+    if (!body) return '';
+    let text = body.innerText || body.textContent || '';
+    const elements = document.querySelectorAll('div, span, p, td, th, li, h1, h2, h3, h4, h5, h6, strong, em');
+    const texts = [];
+    elements.forEach(el => {
+        const elementText = (el.innerText || el.textContent || '').trim();
+        if (elementText && elementText.length > 2 && !texts.includes(elementText)) {
+            texts.push(elementText);
+        }
+    });
+    return text.length < 200 ? texts.join(' ') : text;
+}
+'''
+
+
+def legacy_html_to_text(html_content):
+    """
+    The regex HTML fallback this replaced
+    """
+    text_content = re.sub(r'<script[^>]*>.*?</script>', '', html_content, flags=re.DOTALL)
+    text_content = re.sub(r'<style[^>]*>.*?</style>', '', text_content, flags=re.DOTALL)
+    text_content = re.sub(r'<[^>]+>', ' ', text_content)
+    return re.sub(r'\s+', ' ', text_content).strip()
+
+
+def synthetic_page(rows=4000):
+    """
+    A carrier-like page: heavy scripts and styles, a big nav/footer, repeated
+    promo blocks and one tracking result section
+    """
+    script = '<script>' + 'var analytics = {"event": "pageview", "id": 12345};' * 200 + '</script>'
+    style = '<style>' + '.c-card{margin:0;padding:4px;color:#333}' * 200 + '</style>'
+    nav = '<nav><ul>' + ''.join(f'<li><a href="/p{i}">Shipping option {i}</a></li>' for i in range(300)) + '</ul></nav>'
+    promos = ''.join(
+        f'<div class="promo"><span>Save on shipping supplies</span><p>Offer {i % 50} applies to select services.</p>'
+        f'<table><tr><td>Rate {i}</td><td>${i % 97}.99</td></tr></table></div>{script if i % 500 == 0 else ""}'
+        for i in range(rows)
+    )
+    tracking = (
+        '<div class="track-bar-container"><h2>Tracking Number: 9400111899223197428490</h2>'
+        '<div class="tb-status">Delivered, In/At Mailbox</div>'
+        '<p>Your item was delivered in or at the mailbox at 4:11 pm on June 9, 2025 in MILL VALLEY, CA 94941.</p>'
+        + ''.join(f'<div class="tb-step"><p>Arrived at USPS Regional Facility</p><p>June {i % 9 + 1}, 2025</p></div>' for i in range(40))
+        + '</div>'
+    )
+    footer = '<footer>' + '<p>Copyright © USPS. All Rights Reserved.</p>' * 50 + '</footer>'
+    return f'<html><head>{style}{script}</head><body>{nav}{promos}{tracking}{footer}</body></html>'
+
+
+def timed(fn, repeat):
+    durations = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        durations.append(time.perf_counter() - started)
+    return statistics.median(durations), result
+
+
+def report(label, seconds, output, downstream=None):
+    line = f"  {label:<28} {seconds * 1000:9.1f} ms   {len(output):>9} chars"
+    if downstream is not None:
+        line += f"   + relevance windowing {downstream * 1000:7.1f} ms"
+    print(line)
+
+
+def downstream_seconds(text, repeat):
+    """
+    Time the next pipeline stage (relevance windowing for the AI prompt) on the extracted text
+    """
+    seconds, _ = timed(lambda: reduce_page_content(text, None, 'benchmark'), repeat)
+    return seconds
+
+
+async def bench_browser(name, html, repeat):
+    from playwright.async_api import async_playwright
+
+    async with async_playwright() as playwright:
+        browser = await playwright.chromium.launch()
+        page = await browser.new_page()
+        try:
+            for label, script, arguments in (
+                ('legacy DOM walk', LEGACY_PAGE_SCRIPT, None),
+                ('single-pass walker (body)', PAGE_TEXT_SCRIPT, page_text_arguments(None)),
+                ('single-pass walker (root)', PAGE_TEXT_SCRIPT, page_text_arguments('.track-bar-container')),
+            ):
+                durations = []
+                output = ''
+                for _ in range(repeat):
+                    # The legacy script mutates the DOM, so every run starts from a fresh document
+                    await page.set_content(html)
+                    started = time.perf_counter()
+                    output = await page.evaluate(script, arguments) if arguments else await page.evaluate(script)
+                    durations.append(time.perf_counter() - started)
+                if isinstance(output, dict):
+                    output = output['text']
+                report(label, statistics.median(durations), output)
+        finally:
+            await browser.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('pages', nargs='*', help='saved carrier pages (HTML files)')
+    parser.add_argument('--browser', action='store_true', help='also time the in-page scripts in Chromium')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    pages = [(path, open(path, encoding='utf-8', errors='replace').read()) for path in args.pages]
+    if not pages:
+        pages = [('synthetic', synthetic_page())]
+
+    for name, html in pages:
+        print(f"{name}: {len(html) / 1024:.0f} KB of HTML")
+        seconds, output = timed(lambda: legacy_html_to_text(html), args.repeat)
+        report('legacy regex fallback', seconds, output, downstream_seconds(output, args.repeat))
+        seconds, output = timed(lambda: html_to_text(html), args.repeat)
+        report('streaming converter', seconds, output, downstream_seconds(output, args.repeat))
+        if args.browser:
+            asyncio.run(bench_browser(name, html, args.repeat))
+
+
+if __name__ == '__main__':
+    main()
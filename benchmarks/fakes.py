@@ -0,0 +1,224 @@
+"""
+Local stand-ins for the services a tracking lookup talks to
+- FakeWooCommerce: /wp-json/wc/v3/orders with generated orders
+- CarrierPages: recorded carrier tracking pages from benchmarks/pages
+- OpenAIStub: an OpenAI-compatible /v1/chat/completions endpoint
+Each server runs in a daemon thread on 127.0.0.1, adds a configurable latency
+and tracks its peak number of requests in flight.
+"""
+import json
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+PAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pages')
+
+CARRIERS = ('usps', 'ups', 'fedex', 'dhl')
+TRACKING_NUMBER_FORMATS = {
+    'usps': '9400111899{:012d}',
+    'ups': '1Z999AA1{:010d}',
+    'fedex': '7{:011d}',
+    'dhl': '{:010d}',
+}
+
+
+def order_for(order_id):
+    """
+    Deterministic order with a shipment tracking item; the carrier cycles with the ID
+    """
+    carrier = CARRIERS[order_id % len(CARRIERS)]
+    tracking_number = TRACKING_NUMBER_FORMATS[carrier].format(order_id)
+    return {
+        'id': order_id,
+        'number': str(order_id),
+        'status': 'completed',
+        'date_created': '2025-06-01T10:00:00',
+        'date_modified': '2025-06-02T10:00:00',
+        'meta_data': [{
+            'id': order_id,
+            'key': '_wc_shipment_tracking_items',
+            'value': [{'tracking_provider': carrier, 'tracking_number': tracking_number}],
+        }],
+    }
+
+
+class _StandInServer:
+    handler_class = None
+
+    def __init__(self, latency=0.0, port=0):
+        self.latency = latency
+        self.requests = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(self.handler_class):
+            stand_in = server
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name=type(self).__name__, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def count(self):
+        with self._lock:
+            self.requests += 1
+
+    def enter(self):
+        with self._lock:
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def leave(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def reset_peak(self):
+        with self._lock:
+            self.peak_in_flight = self.in_flight
+
+
+class _Handler(BaseHTTPRequestHandler):
+    stand_in = None
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_body(self, status, body, content_type):
+        self.stand_in.enter()
+        try:
+            if self.stand_in.latency:
+                time.sleep(self.stand_in.latency)
+            data = body.encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        finally:
+            self.stand_in.leave()
+
+    def send_json(self, status, payload):
+        self.send_body(status, json.dumps(payload), 'application/json')
+
+
+class _WooCommerceHandler(_Handler):
+    def do_GET(self):
+        self.stand_in.count()
+        url = urlsplit(self.path)
+        params = parse_qs(url.query)
+        match = re.fullmatch(r'/wp-json/wc/v3/orders(?:/(\d+))?', url.path)
+        if match is None:
+            self.send_json(404, {'code': 'rest_no_route'})
+            return
+
+        if match.group(1):
+            self.send_json(200, order_for(int(match.group(1))))
+            return
+
+        if 'include' in params:
+            ids = [int(value) for value in params['include'][0].split(',') if value.isdigit()]
+            self.send_json(200, [order_for(order_id) for order_id in ids])
+            return
+
+        search = params.get('search', [''])[0]
+        self.send_json(200, [order_for(int(search))] if search.isdigit() else [])
+
+
+class FakeWooCommerce(_StandInServer):
+    handler_class = _WooCommerceHandler
+
+
+class _CarrierPageHandler(_Handler):
+    def do_GET(self):
+        self.stand_in.count()
+        parts = urlsplit(self.path).path.strip('/').split('/')
+        if len(parts) != 2 or parts[0] not in self.stand_in.pages:
+            self.send_body(404, 'Not found', 'text/plain')
+            return
+        carrier, tracking_number = parts
+        self.send_body(200, self.stand_in.pages[carrier].replace('{{tracking_number}}', tracking_number), 'text/html; charset=utf-8')
+
+
+class CarrierPages(_StandInServer):
+    """
+    Serves /<carrier>/<tracking_number> from benchmarks/pages/<carrier>.html
+    """
+    handler_class = _CarrierPageHandler
+
+    def __init__(self, latency=0.0, port=0, pages_dir=PAGES_DIR):
+        super().__init__(latency, port)
+        self.pages = {}
+        for carrier in CARRIERS:
+            path = os.path.join(pages_dir, f"{carrier}.html")
+            if os.path.exists(path):
+                with open(path, encoding='utf-8') as f:
+                    self.pages[carrier] = f.read()
+
+    @property
+    def url_template(self):
+        return f"{self.url}/{{carrier}}/{{tracking_number}}"
+
+
+class _OpenAIHandler(_Handler):
+    def do_POST(self):
+        self.stand_in.count()
+        length = int(self.headers.get('Content-Length') or 0)
+        request = json.loads(self.rfile.read(length) or b'{}')
+        if urlsplit(self.path).path.rstrip('/') not in ('/v1/chat/completions', '/chat/completions'):
+            self.send_json(404, {'error': {'message': 'Unknown route'}})
+            return
+
+        prompt = ' '.join(str(message.get('content', '')) for message in request.get('messages', []))
+        # Only the page content part of the tracking prompt decides the answer
+        page_content = prompt.split('Page Content:', 1)[-1].split('CRITICAL:', 1)[0]
+        status = 'Delivered' if re.search(r'\bdelivered\b', page_content, re.IGNORECASE) else 'In Transit'
+        content = json.dumps({
+            'status': status,
+            'estimated_delivery': None,
+            'current_location': 'MILL VALLEY, CA 94941',
+            'last_update': '2025-06-09',
+            'delivery_date': '2025-06-09' if status == 'Delivered' else None,
+            'notes': 'Benchmark stub response',
+        })
+        prompt_tokens = len(prompt) // 4
+        self.send_json(200, {
+            'id': 'chatcmpl-benchmark',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': request.get('model', 'stub'),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': content},
+                'finish_reason': 'stop',
+            }],
+            'usage': {
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': len(content) // 4,
+                'total_tokens': prompt_tokens + len(content) // 4,
+            },
+        })
+
+
+class OpenAIStub(_StandInServer):
+    """
+    OpenAI-compatible chat completions; point OPENAI_API_BASE at url + '/v1'
+    """
+    handler_class = _OpenAIHandler
@@ -0,0 +1,139 @@
+"""
+ASGI entry point
+Serves enhanced POST /api/track-order lookups and /health natively async, so
+one process can hold dozens of slow scrapes and LLM calls in flight, and hands
+every other route to the Flask app on a small thread pool.
+
+    uvicorn --app-dir src --host 0.0.0.0 --port 8080 asgi:app
+"""
+import asyncio
+import json
+import logging
+import os
+from a2wsgi import WSGIMiddleware
+from main import app as flask_app, health, start_background_services
+from routes.tracking import lookup_order_tracking_async
+from single_flight import AsyncSingleFlight
+from woocommerce_client import close_async_woocommerce_client
+
+logger = logging.getLogger(__name__)
+
+# Threads for the Flask routes (job polling, event streams, batch NDJSON, static files)
+ASGI_WSGI_THREADS = int(os.getenv('ASGI_WSGI_THREADS', '8'))
+
+JSON_HEADERS = [
+    (b'content-type', b'application/json'),
+    (b'access-control-allow-origin', b'*'),
+]
+
+
+class ClientDisconnected(Exception):
+    pass
+
+
+async def read_body(receive):
+    body = b''
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            raise ClientDisconnected()
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            return body
+
+
+async def send_json(send, status, payload):
+    body = flask_app.json.dumps(payload).encode('utf-8') + b'\n'
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': JSON_HEADERS + [(b'content-length', str(len(body)).encode('ascii'))],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+def replay_body(body, receive):
+    """
+    Receive callable that hands Flask a request body already read here
+    """
+    sent = False
+
+    async def replay():
+        nonlocal sent
+        if sent:
+            return await receive()
+        sent = True
+        return {'type': 'http.request', 'body': body, 'more_body': False}
+
+    return replay
+
+
+class TrackingASGIApp:
+    """
+    Async /api/track-order and /health in front of the Flask app.
+
+    Only the inline enhanced lookup is handled natively; plain order lookups,
+    background job submission, validation errors and every other route go to
+    Flask unchanged, so responses match the WSGI deployment.
+    """
+    def __init__(self, wsgi_app):
+        self.flask = WSGIMiddleware(wsgi_app, workers=ASGI_WSGI_THREADS)
+        self.order_flight = AsyncSingleFlight('order')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+
+        try:
+            if scope['path'] == '/api/track-order' and scope['method'] == 'POST':
+                await self.track_order(scope, receive, send)
+            elif scope['path'] == '/health' and scope['method'] == 'GET':
+                await send_json(send, 200, await asyncio.to_thread(health))
+            else:
+                await self.flask(scope, receive, send)
+        except ClientDisconnected:
+            pass
+
+    async def track_order(self, scope, receive, send):
+        body = await read_body(receive)
+        try:
+            data = json.loads(body)
+        except ValueError:
+            data = None
+
+        order_number = data.get('order_number') if isinstance(data, dict) else None
+        if not isinstance(order_number, str) or not order_number.strip() or not data.get('enhanced') or data.get('async'):
+            await self.flask(scope, replay_body(body, receive), send)
+            return
+
+        order_number = order_number.strip()
+        try:
+            result = await self.order_flight.do(order_number, lookup_order_tracking_async, order_number)
+            await send_json(send, 200, result)
+        except LookupError as e:
+            await send_json(send, 404, {'success': False, 'error': str(e)})
+        except Exception as e:
+            logger.error(f"Error tracking order: {e}")
+            await send_json(send, 500, {
+                'success': False,
+                'error': 'Unable to retrieve tracking information. Please try again later.'
+            })
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await asyncio.to_thread(start_background_services)
+                logger.info(f"🌐 ASGI app ready ({ASGI_WSGI_THREADS} threads for Flask routes)")
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await close_async_woocommerce_client()
+                self.flask.executor.shutdown(wait=False, cancel_futures=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+app = TrackingASGIApp(flask_app.wsgi_app)
@@ -0,0 +1,365 @@
+"""
+Persistent browser pools
+Keeps long-lived browsers, either WebSocket connections to hosted
+Browserless.io browsers or locally launched Chromium processes, and hands
+out a fresh BrowserContext per tracking lookup
+"""
+import asyncio
+import logging
+import os
+import uuid
+from contextlib import asynccontextmanager
+from playwright.async_api import async_playwright
+from metrics import STAGE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Which browsers to use: browserless (hosted, over WebSocket) or local (chromium.launch)
+BROWSER_BACKEND = os.getenv('BROWSER_BACKEND', 'browserless').strip().lower()
+
+# Pool configuration
+BROWSERLESS_POOL_SIZE = int(os.getenv('BROWSERLESS_POOL_SIZE', '2'))
+BROWSERLESS_MAX_USES = int(os.getenv('BROWSERLESS_MAX_USES', '50'))
+BROWSERLESS_CONNECT_TIMEOUT = int(os.getenv('BROWSERLESS_CONNECT_TIMEOUT', '30'))  # seconds
+
+# Local Chromium configuration
+LOCAL_BROWSER_POOL_SIZE = int(os.getenv('LOCAL_BROWSER_POOL_SIZE', '2'))
+LOCAL_BROWSER_MAX_PAGES = int(os.getenv('LOCAL_BROWSER_MAX_PAGES', '100'))
+LOCAL_BROWSER_MAX_RSS_MB = int(os.getenv('LOCAL_BROWSER_MAX_RSS_MB', '600'))
+LOCAL_BROWSER_LAUNCH_TIMEOUT = int(os.getenv('LOCAL_BROWSER_LAUNCH_TIMEOUT', '30'))  # seconds
+LOCAL_BROWSER_ARGS = os.getenv('LOCAL_BROWSER_ARGS', '--disable-dev-shm-usage --disable-gpu').split()
+
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+class _PoolSlot:
+    """
+    One pooled browser and its usage counters
+    """
+    def __init__(self, index):
+        self.index = index
+        self.browser = None
+        self.uses = 0
+        self.connect_failed = False
+        self.marker = None
+        self.pid = None
+
+    @property
+    def healthy(self):
+        return self.browser is not None and self.browser.is_connected()
+
+
+class BrowserPool:
+    """
+    Fixed-size pool of browsers, subclassed per backend.
+
+    Each lookup borrows one browser exclusively, gets a brand new
+    BrowserContext on it and returns the browser when done. Browsers are
+    checked on checkout, replaced when they drop and recycled in the
+    background after max_uses lookups, so starting a browser stays off the
+    per-request path. Subclasses implement _open_browser().
+    """
+    name = 'browser'
+    label = 'browser'
+
+    def __init__(self, size, max_uses):
+        self.size = max(1, size)
+        self.max_uses = max(1, max_uses)
+        self._playwright = None
+        self._slots = None
+        self._start_lock = asyncio.Lock()
+        self._background_tasks = set()
+        self._closed = False
+        self.stats = {
+            'connects': 0,
+            'connect_failures': 0,
+            'reconnects': 0,
+            'recycles': 0,
+            'contexts': 0,
+        }
+
+    async def start(self):
+        """
+        Start the Playwright driver and pre-connect every pool slot
+        """
+        if self._slots is not None:
+            return
+
+        async with self._start_lock:
+            if self._slots is not None:
+                return
+
+            self._closed = False
+            self._playwright = await async_playwright().start()
+            slots = [_PoolSlot(index) for index in range(self.size)]
+
+            # Failed slots stay empty and connect on first checkout
+            await asyncio.gather(*(self._connect(slot) for slot in slots), return_exceptions=True)
+
+            queue = asyncio.Queue()
+            for slot in slots:
+                queue.put_nowait(slot)
+            self._slots = queue
+
+            connected = sum(1 for slot in slots if slot.healthy)
+            logger.info(f"🏊 {self.label} pool ready: {connected}/{self.size} browsers")
+
+    @asynccontextmanager
+    async def new_context(self, **context_options):
+        """
+        Borrow a pooled browser and yield a fresh context on it
+        """
+        await self.start()
+        slot = await self._slots.get()
+        context = None
+
+        try:
+            if not slot.healthy:
+                if slot.browser is not None:
+                    logger.warning(f"🔌 {self.label} browser {slot.index} dropped, replacing it")
+                    self.stats['reconnects'] += 1
+                await self._connect(slot)
+
+            slot.uses += 1
+            with STAGE_SECONDS.time(stage='context_create'):
+                context = await slot.browser.new_context(**context_options)
+            self.stats['contexts'] += 1
+            yield context
+
+        finally:
+            if context is not None:
+                try:
+                    await context.close()
+                except Exception as e:
+                    logger.debug(f"Context close error: {e}")
+            self._release(slot)
+
+    async def close(self):
+        """
+        Close all pooled browsers and stop the Playwright driver
+        """
+        self._closed = True
+
+        for task in list(self._background_tasks):
+            task.cancel()
+        self._background_tasks.clear()
+
+        if self._slots is not None:
+            while not self._slots.empty():
+                await self._disconnect(self._slots.get_nowait())
+            self._slots = None
+
+        if self._playwright is not None:
+            try:
+                await self._playwright.stop()
+            except Exception as e:
+                logger.debug(f"Playwright stop error: {e}")
+            self._playwright = None
+
+    def snapshot(self):
+        """
+        Current pool state for monitoring
+        """
+        return {
+            'backend': self.name,
+            'size': self.size,
+            'max_uses': self.max_uses,
+            'idle': self._slots.qsize() if self._slots is not None else 0,
+            **self.stats,
+        }
+
+    async def _open_browser(self, slot):
+        raise NotImplementedError
+
+    async def _connect(self, slot):
+        await self._disconnect(slot)
+
+        try:
+            with STAGE_SECONDS.time(stage='browser_connect'):
+                slot.browser = await self._open_browser(slot)
+        except Exception:
+            slot.connect_failed = True
+            self.stats['connect_failures'] += 1
+            raise
+
+        slot.uses = 0
+        slot.connect_failed = False
+        self.stats['connects'] += 1
+
+    async def _disconnect(self, slot):
+        browser, slot.browser = slot.browser, None
+        if browser is None:
+            return
+        try:
+            await browser.close()
+        except Exception as e:
+            logger.debug(f"Browser close error: {e}")
+
+    def _release(self, slot):
+        if self._closed:
+            self._spawn(self._disconnect(slot))
+            return
+
+        if slot.healthy and slot.uses < self.max_uses:
+            self._slots.put_nowait(slot)
+        elif slot.connect_failed:
+            # Don't hammer a failing endpoint, retry on next checkout
+            self._slots.put_nowait(slot)
+        else:
+            if slot.healthy:
+                logger.info(f"♻️ Recycling {self.label} browser {slot.index} after {slot.uses} uses")
+                self.stats['recycles'] += 1
+            else:
+                self.stats['reconnects'] += 1
+            self._spawn(self._replace(slot))
+
+    async def _replace(self, slot):
+        try:
+            await self._connect(slot)
+        except Exception as e:
+            logger.warning(f"⚠️ Background reconnect of browser {slot.index} failed: {e}")
+        finally:
+            if self._closed:
+                await self._disconnect(slot)
+            else:
+                self._slots.put_nowait(slot)
+
+    def _spawn(self, coro):
+        task = asyncio.get_running_loop().create_task(coro)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+
+class BrowserlessPool(BrowserPool):
+    """
+    Long-lived WebSocket connections to hosted Browserless.io browsers
+    (or any Playwright server at `endpoint`)
+    """
+    name = 'browserless'
+    label = 'Browserless'
+
+    def __init__(self, endpoint, size=BROWSERLESS_POOL_SIZE, max_uses=BROWSERLESS_MAX_USES):
+        super().__init__(size, max_uses)
+        self.endpoint = endpoint
+
+    async def _open_browser(self, slot):
+        logger.info(f"🌐 Connecting pooled browser {slot.index} to Browserless.io")
+        return await self._playwright.chromium.connect(
+            self.endpoint,
+            timeout=BROWSERLESS_CONNECT_TIMEOUT * 1000
+        )
+
+
+class LocalChromiumPool(BrowserPool):
+    """
+    Warm Chromium processes launched on this host.
+
+    Saves the round trip to a hosted browser and works offline. A process
+    is recycled after max_pages lookups, and after any lookup that leaves
+    its process tree (browser, renderers, GPU and utility processes) above
+    max_rss_mb, since long-lived Chromium grows steadily.
+    """
+    name = 'local_chromium'
+    label = 'Local Chromium'
+
+    def __init__(self, size=LOCAL_BROWSER_POOL_SIZE, max_pages=LOCAL_BROWSER_MAX_PAGES, max_rss_mb=LOCAL_BROWSER_MAX_RSS_MB):
+        super().__init__(size, max_pages)
+        self.max_rss = max_rss_mb * 2 ** 20
+        self.stats['memory_restarts'] = 0
+
+    async def _open_browser(self, slot):
+        # Unknown switch Chromium ignores; it finds the process under /proc for the memory check
+        slot.marker = f"--tracking-pool-browser={uuid.uuid4().hex}"
+        slot.pid = None
+        logger.info(f"🚀 Launching local Chromium {slot.index}")
+        return await self._playwright.chromium.launch(
+            headless=True,
+            args=LOCAL_BROWSER_ARGS + [slot.marker],
+            timeout=LOCAL_BROWSER_LAUNCH_TIMEOUT * 1000
+        )
+
+    def snapshot(self):
+        return {'max_rss_mb': self.max_rss // 2 ** 20, **super().snapshot()}
+
+    def _release(self, slot):
+        if self._closed or not slot.healthy or slot.uses >= self.max_uses or not self.max_rss:
+            super()._release(slot)
+            return
+        self._spawn(self._check_memory(slot))
+
+    async def _check_memory(self, slot):
+        """
+        Return the browser to the pool, or restart it when over the memory limit
+        """
+        try:
+            if slot.pid is None:
+                slot.pid = await asyncio.to_thread(find_process, slot.marker)
+            rss = await asyncio.to_thread(process_tree_rss, slot.pid) if slot.pid else None
+        except Exception as e:
+            logger.debug(f"Browser memory check error: {e}")
+            rss = None
+
+        if rss is not None and rss > self.max_rss and not self._closed:
+            logger.info(f"♻️ Restarting local Chromium {slot.index} at {rss / 2 ** 20:.0f} MB after {slot.uses} pages")
+            self.stats['memory_restarts'] += 1
+            await self._replace(slot)
+            return
+        super()._release(slot)
+
+
+def find_process(marker):
+    """
+    PID of the browser process launched with `marker` on its command line, or None
+    """
+    for pid in _proc_pids():
+        try:
+            with open(f"/proc/{pid}/cmdline", 'rb') as f:
+                args = f.read().split(b'\0')
+        except OSError:
+            continue
+        if marker.encode() in args and not any(arg.startswith(b'--type=') for arg in args):
+            return pid
+    return None
+
+
+def process_tree_rss(root_pid):
+    """
+    Resident memory in bytes of a process and all its descendants, from /proc
+    """
+    children = {}
+    for pid in _proc_pids():
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(pid)
+
+    total, stack = 0, [root_pid]
+    while stack:
+        pid = stack.pop()
+        try:
+            with open(f"/proc/{pid}/statm") as f:
+                total += int(f.read().split()[1]) * PAGE_SIZE
+        except (OSError, IndexError, ValueError):
+            continue
+        stack.extend(children.get(pid, ()))
+    return total
+
+
+def _proc_pids():
+    try:
+        return [int(name) for name in os.listdir('/proc') if name.isdigit()]
+    except OSError:
+        return []
+
+
+def create_browser_pool(endpoint):
+    """
+    Browser pool for BROWSER_BACKEND; `endpoint` is the Browserless WebSocket URL
+    """
+    if BROWSER_BACKEND == 'local':
+        return LocalChromiumPool()
+    if BROWSER_BACKEND != 'browserless':
+        logger.warning(f"⚠️ Unknown BROWSER_BACKEND {BROWSER_BACKEND!r}, using browserless")
+    return BrowserlessPool(endpoint)
@@ -0,0 +1,228 @@
+"""
+Carrier scrape profiles
+One registry of per-carrier knowledge (tracking URL, readiness signals,
+content root, extraction patterns, AI prompt hints, cache TTLs, the
+third-party domains to allow or block while loading and whether a plain
+HTTP fetch is worth trying), loaded
+and precompiled once at import
+"""
+import os
+import re
+
+# Replaces every carrier's tracking URL, e.g. "http://127.0.0.1:8766/{carrier}/{tracking_number}"
+# to point lookups at recorded pages
+CARRIER_URL_OVERRIDE = os.getenv('CARRIER_URL_OVERRIDE')
+
+# Tracking status wording, as a JavaScript regex literal
+STATUS_TEXT_PATTERN = "/\\b(delivered|in transit|out for delivery|label created|arrived at|departed|delivery exception)\\b/i"
+
+# True once any tracking status wording is on the page
+STATUS_TEXT_PREDICATE = f"{STATUS_TEXT_PATTERN}.test(document.body ? document.body.innerText : '')"
+
+# Readiness for carriers without a profile only: these match empty shells and
+# site chrome on most pages, so an element only counts once it holds status wording
+GENERIC_READY_SELECTORS = [
+    '[class*="track"]', '[class*="status"]', '[class*="delivery"]',
+    '[id*="track"]', '[id*="status"]', '[id*="delivery"]',
+]
+GENERIC_READY_PREDICATE = (
+    f"() => Array.from(document.querySelectorAll({', '.join(GENERIC_READY_SELECTORS)!r}))"
+    f".some((element) => {STATUS_TEXT_PATTERN}.test(element.innerText || ''))"
+)
+
+
+class CarrierProfile:
+    """
+    Everything the scraper and routes need to know about one carrier
+    """
+    def __init__(
+        self,
+        name,
+        url_template=None,
+        aliases=(),
+        ready_selectors=(),
+        content_root=None,
+        status_patterns=None,
+        prompt_hints=(),
+        cache_ttls=None,
+        allowed_domains=(),
+        blocked_domains=(),
+        http_fetch=True,
+        api_url_template=None,
+    ):
+        self.name = name
+        self.url_template = url_template
+        self.aliases = tuple(aliases)
+        self.ready_selectors = list(ready_selectors)
+        self.content_root = content_root
+        self.status_patterns = status_patterns or {}
+        self.prompt_hints = list(prompt_hints)
+        self.cache_ttls = cache_ttls or {}
+        self.allowed_domains = tuple(allowed_domains)
+        self.blocked_domains = tuple(blocked_domains)
+        self.http_fetch = http_fetch
+        self.api_url_template = api_url_template
+
+        # Precompiled forms used on the hot path; no selector without carrier selectors
+        self.ready_selector = ', '.join(self.ready_selectors) or None
+        if self.ready_selectors:
+            carrier_check = f"!!document.querySelector({self.ready_selector!r})"
+            self.ready_predicate = f"() => ({carrier_check}) || {STATUS_TEXT_PREDICATE}"
+        else:
+            self.ready_predicate = GENERIC_READY_PREDICATE
+        self.compiled_status_patterns = {
+            status: [(re.compile(pattern, re.IGNORECASE), strong) for pattern, strong in entries]
+            for status, entries in self.status_patterns.items()
+        }
+
+    def __repr__(self):
+        return f'<CarrierProfile {self.name}>'
+
+    def tracking_url(self, tracking_number):
+        if not self.url_template or not tracking_number:
+            return None
+        if CARRIER_URL_OVERRIDE:
+            return CARRIER_URL_OVERRIDE.format(carrier=self.name, tracking_number=tracking_number)
+        return self.url_template.format(tracking_number=tracking_number)
+
+    def api_url(self, tracking_number):
+        """
+        JSON endpoint the tracking page reads from, when the carrier has a public one
+        """
+        if not self.api_url_template or not tracking_number:
+            return None
+        return self.api_url_template.format(tracking_number=tracking_number)
+
+    def cache_ttl(self, status, default):
+        return self.cache_ttls.get(status, default)
+
+
+CARRIER_PROFILES = [
+    CarrierProfile(
+        'usps',
+        url_template='https://tools.usps.com/go/TrackConfirmAction?tLabels={tracking_number}',
+        aliases=('united states postal service', 'us postal service'),
+        ready_selectors=['.tb-status', '.tb-status-detail', '.track-bar-container', '.delivery_status'],
+        content_root='.track-bar-container, .tracking-progress-bar-status-container, #tracked-numbers',
+        status_patterns={
+            'Delivered': [
+                (r'\byour item was delivered\b', True),
+                (r'\bdelivered,\s*(?:in/at mailbox|front door/porch|front desk|parcel locker|left with individual|to agent|individual picked up|to original sender)', True),
+            ],
+            'In Transit': [
+                (r'\bin transit to next facility\b', True),
+                (r'\barrived at (?:usps )?(?:regional )?(?:facility|destination facility|post office)\b', True),
+            ],
+            'Label Created': [
+                (r'\blabel created,\s*not yet in system\b', True),
+                (r'\bshipping label created,\s*usps awaiting item\b', True),
+            ],
+        },
+        prompt_hints=[
+            '"Your item was delivered in or at the mailbox"',
+            '"Delivered, In/At Mailbox"',
+            '"Delivered, Front Door/Porch"',
+            '"delivered in or at the mailbox at 4:11 pm"',
+            'Any phrase containing both "delivered" and a time/location',
+        ],
+        cache_ttls={'In Transit': 2 * 60 * 60},
+        allowed_domains=('usps.com',),
+        blocked_domains=('siteimproveanalytics.com', 'qualtrics.com'),
+    ),
+    CarrierProfile(
+        'ups',
+        url_template='https://www.ups.com/track?loc=en_US&tracknum={tracking_number}',
+        aliases=('united parcel service',),
+        ready_selectors=['#st_App_PkgStsMonitor', '[id*="stApp_txtPackageStatus"]', '.ups-shipment_status'],
+        content_root='#stApp_trackingNumber, .ups-card, main',
+        status_patterns={
+            'Delivered': [
+                (r'\bdelivered\s+on\s+(?:mon|tue|wed|thu|fri|sat|sun)', True),
+                (r'\bleft at:\s*front door\b', True),
+            ],
+            'Label Created': [
+                (r'\bshipper created a label\b', True),
+            ],
+        },
+        prompt_hints=[
+            '"Delivered On <weekday>, <date> at <time>"',
+            '"Left At: Front Door"',
+            '"Shipper created a label, UPS has not received the package yet"',
+        ],
+        allowed_domains=('ups.com',),
+        blocked_domains=('medallia.com', 'tiqcdn.com'),
+        # Tracking page is rendered client-side; plain HTTP only gets the app shell
+        http_fetch=False,
+    ),
+    CarrierProfile(
+        'fedex',
+        url_template='https://www.fedex.com/fedextrack/?trknbr={tracking_number}',
+        aliases=('federal express', 'fedex ground', 'fedex express'),
+        ready_selectors=['[data-test-id="status"]', '.shipment-status-progress-step', 'trk-shared-status'],
+        content_root='trk-shared-shipment-status, .shipment-status-progress, main',
+        status_patterns={
+            'Delivered': [
+                (r'\bdelivered\s*\n?\s*(?:mon|tue|wed|thu|fri|sat|sun)[a-z]*,?\s+\d', True),
+                (r'\bsigned for by\b', True),
+            ],
+            'In Transit': [
+                (r'\bon the way\b', True),
+            ],
+        },
+        prompt_hints=[
+            '"Delivered <Weekday>, <date> at <time>"',
+            '"Signed for by: <name>"',
+            '"On the way" (In Transit)',
+        ],
+        allowed_domains=('fedex.com',),
+        blocked_domains=('qualtrics.com', 'tiqcdn.com'),
+        # Tracking page is rendered client-side; plain HTTP only gets the app shell
+        http_fetch=False,
+    ),
+    CarrierProfile(
+        'dhl',
+        url_template='https://www.dhl.com/us-en/home/tracking/tracking-express.html?submit=1&tracking-id={tracking_number}',
+        aliases=('dhl express', 'dhl ecommerce'),
+        ready_selectors=['.c-tracking-result--status', '.c-tracking-result--checkpoint'],
+        content_root='.c-tracking-result, .js--tracking-result',
+        status_patterns={
+            'Delivered': [
+                (r'\bdelivered\s*-\s*signed for by\b', True),
+                (r'\bshipment has been delivered\b', True),
+            ],
+            'In Transit': [
+                (r'\bshipment is in transit\b', True),
+                (r'\bprocessed at\b', False),
+            ],
+        },
+        prompt_hints=[
+            '"Delivered - Signed for by: <name>"',
+            '"The shipment has been delivered"',
+            '"Processed at <facility>" (In Transit)',
+        ],
+        allowed_domains=('dhl.com', 'dhl.de'),
+        blocked_domains=('usabilla.com', 'tiqcdn.com'),
+    ),
+]
+
+# Fallback for carriers without a profile: generic readiness and patterns only
+GENERIC_PROFILE = CarrierProfile('generic')
+
+_profiles_by_name = {}
+for _profile in CARRIER_PROFILES:
+    for _name in (_profile.name,) + _profile.aliases:
+        _profiles_by_name[_name] = _profile
+
+
+def get_carrier_profile(carrier_name):
+    """
+    Profile for a carrier name or alias (case-insensitive), or None if unknown
+    """
+    return _profiles_by_name.get((carrier_name or '').strip().lower())
+
+
+def get_scrape_profile(carrier_name):
+    """
+    Profile to scrape with, falling back to the generic profile
+    """
+    return get_carrier_profile(carrier_name) or GENERIC_PROFILE
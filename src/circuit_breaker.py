@@ -0,0 +1,170 @@
+"""
+Circuit breakers for upstream dependencies
+Per-dependency breakers (Browserless, OpenAI) that open on a high error rate
+over a rolling window, fail calls straight away while open, and let a
+single probe through after a cool-down to decide whether to close again
+"""
+import logging
+import os
+import threading
+import time
+from collections import deque
+from metrics import CIRCUIT_EVENTS
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# Breaker configuration
+CIRCUIT_WINDOW = int(os.getenv('CIRCUIT_WINDOW', '60'))  # seconds
+CIRCUIT_MIN_CALLS = int(os.getenv('CIRCUIT_MIN_CALLS', '5'))
+CIRCUIT_FAILURE_RATE = float(os.getenv('CIRCUIT_FAILURE_RATE', '0.5'))
+CIRCUIT_OPEN_SECONDS = int(os.getenv('CIRCUIT_OPEN_SECONDS', '30'))  # seconds
+
+
+class CircuitOpenError(Exception):
+    """
+    The dependency's circuit is open, so the call was not attempted
+    """
+    def __init__(self, name, retry_in):
+        super().__init__(f"{name} circuit is open, next probe in {retry_in:.0f}s")
+        self.name = name
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """
+    Rolling-window circuit breaker for one dependency.
+
+    Closed: calls go through and their outcomes are kept for `window`
+    seconds; once there are at least `min_calls` and the failure share
+    reaches `failure_rate` the circuit opens. Open: check() raises
+    CircuitOpenError for `open_seconds`. Half-open: one probe call is let
+    through; success closes the circuit with a clean window, failure opens
+    it again. A probe that never reports (cancelled, rejected elsewhere)
+    is replaced after another `open_seconds`.
+    """
+    def __init__(self, name, window=CIRCUIT_WINDOW, min_calls=CIRCUIT_MIN_CALLS,
+                 failure_rate=CIRCUIT_FAILURE_RATE, open_seconds=CIRCUIT_OPEN_SECONDS):
+        self.name = name
+        self.window = window
+        self.min_calls = max(1, min_calls)
+        self.failure_rate = failure_rate
+        self.open_seconds = open_seconds
+        self.state = CLOSED
+        self._outcomes = deque()
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_started = None
+        self._lock = threading.Lock()
+        self._stats = {'opened': 0, 'short_circuited': 0}
+
+    def check(self):
+        """
+        Raise CircuitOpenError unless a call may go ahead now
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self.state == OPEN and now - self._opened_at >= self.open_seconds:
+                self._transition(HALF_OPEN)
+            if self.state == HALF_OPEN and (self._probe_started is None or now - self._probe_started >= self.open_seconds):
+                self._probe_started = now
+                logger.info(f"🔌 {self.name} circuit half-open, probing")
+                return
+            if self.state == CLOSED:
+                return
+
+            self._stats['short_circuited'] += 1
+            retry_in = max(0.0, self._opened_at + self.open_seconds - now) if self.state == OPEN else self.open_seconds
+        CIRCUIT_EVENTS.inc(dependency=self.name, event='short_circuited')
+        raise CircuitOpenError(self.name, retry_in)
+
+    def record_success(self):
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._reset_window()
+                self._transition(CLOSED)
+                logger.info(f"✅ {self.name} circuit closed after a successful probe")
+                return
+            if self.state == CLOSED:
+                self._record(False)
+
+    def record_failure(self):
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._open('probe failed')
+                return
+            if self.state == OPEN:
+                return
+            self._record(True)
+            calls = len(self._outcomes)
+            if calls >= self.min_calls and self._failures / calls >= self.failure_rate:
+                self._open(f"{self._failures}/{calls} calls failed in {self.window}s")
+
+    def stats(self):
+        with self._lock:
+            self._trim(time.monotonic())
+            calls = len(self._outcomes)
+            return {
+                'state': self.state,
+                'calls': calls,
+                'failures': self._failures,
+                'failure_rate': round(self._failures / calls, 3) if calls else 0.0,
+                'open_for': round(max(0.0, self._opened_at + self.open_seconds - time.monotonic()), 1) if self.state == OPEN else 0.0,
+                **self._stats,
+            }
+
+    def _record(self, failed):
+        now = time.monotonic()
+        self._outcomes.append((now, failed))
+        self._failures += failed
+        self._trim(now)
+
+    def _trim(self, now):
+        while self._outcomes and now - self._outcomes[0][0] > self.window:
+            _, failed = self._outcomes.popleft()
+            self._failures -= failed
+
+    def _reset_window(self):
+        self._outcomes.clear()
+        self._failures = 0
+
+    def _open(self, reason):
+        self._opened_at = time.monotonic()
+        self._reset_window()
+        self._transition(OPEN)
+        self._stats['opened'] += 1
+        logger.warning(
+            f"⛔ {self.name} circuit opened ({reason}), "
+            f"failing fast for {self.open_seconds}s"
+        )
+
+    def _transition(self, state):
+        self.state = state
+        self._probe_started = None
+        CIRCUIT_EVENTS.inc(dependency=self.name, event=state)
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(name):
+    """
+    The process-wide breaker for a dependency, created on first use
+    """
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name)
+        return _breakers[name]
+
+
+def circuit_breaker_stats():
+    """
+    State of every breaker for /health
+    """
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.stats() for breaker in breakers}
@@ -0,0 +1,114 @@
+"""
+Content fingerprints for incremental re-analysis
+Hashes carrier page text after stripping what changes on every load
+(render timestamps, relative times, session tokens, URLs), so a re-scrape
+of an unchanged page can reuse the previous AI result instead of calling
+the model again
+"""
+import hashlib
+import logging
+import re
+import threading
+from metrics import CONTENT_FINGERPRINTS
+from tracking_cache import RULE_METHOD, get_tracking_cache, is_fallback_result
+
+logger = logging.getLogger(__name__)
+
+# Bump when normalization changes so old fingerprints stop matching
+FINGERPRINT_VERSION = 3
+
+# The date and time after "as of", "last updated" and similar render stamps.
+# Only the stamp goes: the rest of the line may be the status itself
+# ("Status as of Oct 16, 3:04 PM: In Transit"), and times elsewhere belong to
+# tracking events
+VOLATILE_STAMP_TOKEN = (
+    r'\d{4}-\d{2}-\d{2}t\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:z|[+-]\d{2}:?\d{2})?'  # ISO 8601
+    r'|1\d{9}(?:\d{3})?'  # epoch seconds or milliseconds
+    r'|(?:mon|tue|wed|thu|fri|sat|sun)[a-z]*\.?'
+    r'|(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?'
+    r'|\d{1,4}(?:st|nd|rd|th)?|[ap]\.?m\.?|at|today|yesterday|utc|gmt|[ecmp][sd]?t'
+)
+VOLATILE_STAMP_PATTERN = re.compile(
+    r'\b(last updated|last refreshed|updated on|as of|retrieved|current as of|page generated)\b'
+    rf'(?:[ \t,:/.\-]*(?:{VOLATILE_STAMP_TOKEN})\b)+',
+    re.IGNORECASE
+)
+RELATIVE_TIME_PATTERN = re.compile(
+    r'\b(?:\d+|a|an)\s+(?:seconds?|secs?|minutes?|mins?|hours?|hrs?)\s+ago\b|\bjust now\b', re.IGNORECASE
+)
+URL_PATTERN = re.compile(r'https?://\S+', re.IGNORECASE)
+UUID_PATTERN = re.compile(r'\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b', re.IGNORECASE)
+# Session ids, CSRF tokens and similar: long runs mixing letters and digits
+TOKEN_PATTERN = re.compile(r'\b(?=[\w-]*\d)(?=[\w-]*[a-z])[\w-]{24,}\b', re.IGNORECASE)
+
+
+def normalize_page_text(text, tracking_number=None):
+    """
+    Page text with per-load noise removed, lowercased and whitespace-collapsed
+    """
+    if tracking_number:
+        # Keep the tracking number itself out of reach of the token pattern
+        text = re.sub(re.escape(tracking_number), ' trackingnumber ', text, flags=re.IGNORECASE)
+    for pattern in (URL_PATTERN, UUID_PATTERN, TOKEN_PATTERN, RELATIVE_TIME_PATTERN):
+        text = pattern.sub(' ', text)
+    text = VOLATILE_STAMP_PATTERN.sub(r'\1 ', text)
+    return ' '.join(text.lower().split())
+
+
+def content_fingerprint(text, tracking_number=None):
+    """
+    Stable hash of the normalized page text
+    """
+    normalized = normalize_page_text(text or '', tracking_number)
+    return f"v{FINGERPRINT_VERSION}:{hashlib.sha256(normalized.encode('utf-8')).hexdigest()}"
+
+
+class ContentFingerprints:
+    """
+    Finds the stored result for a package whose page text has not changed.
+
+    Results carry the fingerprint of the page they were extracted from
+    (content_fingerprint) and live in the tracking result cache, whose
+    persistent tier keeps them past expiry, which is exactly when a package
+    gets scraped again.
+    """
+    def __init__(self, cache=None):
+        self.cache = cache or get_tracking_cache()
+        self._lock = threading.Lock()
+        self._stats = {'reused': 0, 'changed': 0, 'no_previous': 0}
+
+    async def find_reusable(self, carrier_name, tracking_number, fingerprint):
+        """
+        Previous successful result with the same fingerprint, or None
+        """
+        previous = await self.cache.aget_stale(carrier_name, tracking_number)
+        # Rule results are cheap to redo and may be awaiting AI confirmation, so only AI results are reused
+        if (previous is None or is_fallback_result(previous) or previous.get('extraction_method') == RULE_METHOD
+                or not previous.get('content_fingerprint')):
+            outcome = 'no_previous'
+        elif previous['content_fingerprint'] == fingerprint:
+            outcome = 'reused'
+        else:
+            outcome = 'changed'
+
+        with self._lock:
+            self._stats[outcome] += 1
+        CONTENT_FINGERPRINTS.inc(carrier=carrier_name, result=outcome)
+        return previous if outcome == 'reused' else None
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        checks = sum(stats.values())
+        return {
+            'checks': checks,
+            **stats,
+            'hit_rate': round(stats['reused'] / checks, 3) if checks else 0.0,
+        }
+
+
+_content_fingerprints = ContentFingerprints()
+
+
+def get_content_fingerprints():
+    return _content_fingerprints
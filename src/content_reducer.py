@@ -0,0 +1,135 @@
+"""
+Relevance windowing for AI analysis
+Scores blocks of carrier page text and keeps only the best windows within a
+token budget, so nav menus, footers and cookie banners never reach the LLM
+"""
+import logging
+import os
+import re
+from tracking_extractor import DATE_PATTERN, LOCATION_PATTERN
+
+logger = logging.getLogger(__name__)
+
+# Prompt budget for page content (roughly 4 characters per token)
+LLM_CONTENT_TOKEN_BUDGET = int(os.getenv('LLM_CONTENT_TOKEN_BUDGET', '1500'))
+CHARS_PER_TOKEN = 4
+
+# Blocks longer than this (e.g. single-line HTML fallback text) are split further
+MAX_BLOCK_CHARS = 300
+
+TRACKING_KEYWORDS = re.compile(
+    r'\b(?:delivered|delivery|in transit|out for delivery|arrived|departed|label|exception|'
+    r'facility|mailbox|porch|front door|shipment|package|tracking|status|expected|estimated|'
+    r'scheduled|signed|picked up|accepted|origin|destination)\b',
+    re.IGNORECASE
+)
+TIME_PATTERN = re.compile(r'\b\d{1,2}:\d{2}\s*(?:am|pm|a\.m\.|p\.m\.)?', re.IGNORECASE)
+BOILERPLATE_PATTERN = re.compile(
+    r'\b(?:cookie|cookies|privacy|sign in|log in|sign up|copyright|terms of use|terms and conditions|'
+    r'faqs?|careers|newsletter|all rights reserved|accessibility|site map)\b|©',
+    re.IGNORECASE
+)
+SENTENCE_BREAK = re.compile(r'(?<=[.!?])\s+')
+
+
+def split_blocks(page_content):
+    """
+    Whitespace-normalised, deduplicated text blocks in page order
+    """
+    blocks = []
+    seen = set()
+    for line in page_content.splitlines():
+        line = ' '.join(line.split())
+        if not line:
+            continue
+        pieces = [line] if len(line) <= MAX_BLOCK_CHARS else _split_long(line)
+        for piece in pieces:
+            if piece not in seen:
+                seen.add(piece)
+                blocks.append(piece)
+    return blocks
+
+
+def _split_long(line):
+    pieces, current = [], ''
+    for sentence in SENTENCE_BREAK.split(line):
+        while len(sentence) > MAX_BLOCK_CHARS:
+            pieces.append(sentence[:MAX_BLOCK_CHARS])
+            sentence = sentence[MAX_BLOCK_CHARS:]
+        if current and len(current) + len(sentence) + 1 > MAX_BLOCK_CHARS:
+            pieces.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}".strip()
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def score_block(block, tracking_number):
+    """
+    Relevance of one block to the shipment's tracking status
+    """
+    score = 2 * min(len(TRACKING_KEYWORDS.findall(block)), 4)
+    if tracking_number and tracking_number.lower() in block.lower():
+        score += 5
+    if DATE_PATTERN.search(block):
+        score += 3
+    if TIME_PATTERN.search(block):
+        score += 1
+    if LOCATION_PATTERN.search(block):
+        score += 3
+    if BOILERPLATE_PATTERN.search(block):
+        score -= 3
+    return score
+
+
+def reduce_page_content(page_content, tracking_number, carrier_name, token_budget=LLM_CONTENT_TOKEN_BUDGET):
+    """
+    Keep the highest scoring windows (a block plus its neighbours) that fit
+    in the token budget, in their original page order
+    """
+    char_budget = token_budget * CHARS_PER_TOKEN
+    original_length = len(page_content or '')
+    if original_length <= char_budget:
+        return page_content
+
+    blocks = split_blocks(page_content)
+    scores = [score_block(block, tracking_number) for block in blocks]
+
+    # A window is a relevant block with one non-boilerplate block of context either side
+    windows = []
+    for index, score in enumerate(scores):
+        if score <= 0:
+            continue
+        members = [i for i in (index - 1, index, index + 1) if 0 <= i < len(blocks) and scores[i] >= 0]
+        windows.append((score + 0.5 * sum(max(scores[i], 0) for i in members if i != index), index, members))
+    windows.sort(key=lambda window: (-window[0], window[1]))
+
+    kept = set()
+    used = 0
+    for _, _, members in windows:
+        new = [i for i in members if i not in kept]
+        cost = sum(len(blocks[i]) + 1 for i in new)
+        if used + cost > char_budget:
+            continue
+        kept.update(new)
+        used += cost
+
+    if kept:
+        lines, previous = [], None
+        for index in sorted(kept):
+            if previous is not None and index != previous + 1:
+                lines.append('...')
+            lines.append(blocks[index])
+            previous = index
+        reduced = '\n'.join(lines)
+    else:
+        # Nothing looked relevant, keep the start of the page
+        reduced = '\n'.join(blocks)[:char_budget]
+
+    logger.info(
+        f"✂️ Reduced {carrier_name} page content for AI: {original_length} -> {len(reduced)} chars "
+        f"(~{original_length // CHARS_PER_TOKEN} -> ~{len(reduced) // CHARS_PER_TOKEN} tokens)"
+    )
+    return reduced
@@ -4,31 +4,165 @@ Enhanced Stealth Tracking Scraper with Browserless.io
 Uses Browserless.io hosted browsers for reliable deployment
 """
 import asyncio
+import concurrent.futures
 import logging
 import os
 import random
+import threading
 import time
 from datetime import datetime
-from playwright.async_api import async_playwright
 from fake_useragent import UserAgent
 import openai
 import json
+from browser_pool import create_browser_pool
+from carrier_profiles import get_scrape_profile
+from circuit_breaker import CircuitOpenError, get_circuit_breaker
+from scraper_runtime import get_runtime
+from content_fingerprint import content_fingerprint, get_content_fingerprints
+from content_reducer import reduce_page_content
+from metrics import CACHE_REQUESTS, FALLBACKS, LLM_REQUESTS, LLM_TOKENS, LOOKUPS, RATE_LIMITED, RETRIES, STAGE_SECONDS
+from http_fetcher import MIN_TEXT_CHARS, TIER_BROWSER, TIER_HTTP, get_tiered_fetcher
+from page_readiness import wait_for_page_ready
+from page_text import PAGE_TEXT_SCRIPT, html_to_text, page_text_arguments
+from refresh_scheduler import get_refresh_scheduler
+from resource_blocking import get_resource_blocker
+from session_governor import BACKGROUND, BATCH, INTERACTIVE, SessionRejected, get_session_governor, is_rate_limit_error
+from single_flight import AsyncSingleFlight
+from tracking_cache import RULE_METHOD, get_tracking_cache, is_fallback_result, status_ttl
+from tracking_extractor import RULE_EXTRACTION_MIN_CONFIDENCE, RuleBasedExtractor
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Browserless.io configuration (BROWSERLESS_ENDPOINT can point at any Playwright server)
+BROWSERLESS_TOKEN = os.getenv('BROWSERLESS_TOKEN', "2SiFiu9vRPsrd2Y862a8e80a705326cc13364885560efd43f")
+BROWSERLESS_ENDPOINT = os.getenv(
+    'BROWSERLESS_ENDPOINT',
+    f"wss://production-sfo.browserless.io/chromium/playwright?token={BROWSERLESS_TOKEN}"
+)
+
+# Upper bound a caller waits for one lookup (stays under the gunicorn timeout)
+TRACKING_LOOKUP_TIMEOUT = int(os.getenv('TRACKING_LOOKUP_TIMEOUT', '110'))  # seconds
+
+# AI analysis limits
+OPENAI_MAX_CONCURRENCY = int(os.getenv('OPENAI_MAX_CONCURRENCY', '4'))
+OPENAI_TIMEOUT = float(os.getenv('OPENAI_TIMEOUT', '30'))  # seconds per call
+OPENAI_MAX_RETRIES = int(os.getenv('OPENAI_MAX_RETRIES', '3'))
+OPENAI_RETRY_BASE_DELAY = float(os.getenv('OPENAI_RETRY_BASE_DELAY', '1'))  # seconds
+# A longer Retry-After is not waited out: the 429/5xx goes straight back to the caller
+OPENAI_MAX_RETRY_AFTER = float(os.getenv('OPENAI_MAX_RETRY_AFTER', str(OPENAI_TIMEOUT)))  # seconds
+
+# Stealth overrides injected before any page script runs
+STEALTH_INIT_SCRIPT = """
+// Override webdriver detection
+Object.defineProperty(navigator, 'webdriver', {
+    get: () => undefined,
+});
+
+// Override automation flags
+delete window.cdc_adoQpoasnfa76pfcZLmcfl_Array;
+delete window.cdc_adoQpoasnfa76pfcZLmcfl_Promise;
+delete window.cdc_adoQpoasnfa76pfcZLmcfl_Symbol;
+delete window.cdc_adoQpoasnfa76pfcZLmcfl_JSON;
+delete window.cdc_adoQpoasnfa76pfcZLmcfl_Object;
+delete window.cdc_adoQpoasnfa76pfcZLmcfl_Proxy;
+
+// Mock realistic plugins
+Object.defineProperty(navigator, 'plugins', {
+    get: () => ({
+        length: 3,
+        0: { name: 'Chrome PDF Plugin' },
+        1: { name: 'Chrome PDF Viewer' },
+        2: { name: 'Native Client' }
+    }),
+});
+
+// Mock realistic languages
+Object.defineProperty(navigator, 'languages', {
+    get: () => ['en-US', 'en'],
+});
+
+// Mock realistic hardware
+Object.defineProperty(navigator, 'hardwareConcurrency', {
+    get: () => 8,
+});
+
+// Mock realistic memory
+Object.defineProperty(navigator, 'deviceMemory', {
+    get: () => 8,
+});
+
+// Mock chrome runtime
+window.chrome = {
+    runtime: {
+        onConnect: undefined,
+        onMessage: undefined
+    },
+    app: {
+        isInstalled: false
+    }
+};
+
+// Override toString methods
+window.navigator.webdriver = undefined;
+
+// Mock realistic connection
+Object.defineProperty(navigator, 'connection', {
+    get: () => ({
+        effectiveType: '4g',
+        rtt: 50,
+        downlink: 10
+    }),
+});
+"""
+
+
 class EnhancedStealthScraper:
     def __init__(self):
-        # Initialize OpenAI client
-        self.openai_client = openai.OpenAI(
+        # Initialize OpenAI client (non-blocking; retries are handled in _create_chat_completion)
+        self.openai_client = openai.AsyncOpenAI(
             api_key=os.getenv('OPENAI_API_KEY'),
-            base_url=os.getenv('OPENAI_API_BASE')
+            base_url=os.getenv('OPENAI_API_BASE'),
+            timeout=OPENAI_TIMEOUT,
+            max_retries=0
         )
+        self.openai_semaphore = asyncio.Semaphore(OPENAI_MAX_CONCURRENCY)
         
         # Browserless.io configuration
-        self.browserless_token = "2SiFiu9vRPsrd2Y862a8e80a705326cc13364885560efd43f"
-        self.browserless_endpoint = f"wss://production-sfo.browserless.io/chromium/playwright?token={self.browserless_token}"
+        self.browserless_token = BROWSERLESS_TOKEN
+        self.browserless_endpoint = BROWSERLESS_ENDPOINT
+        
+        # Long-lived pool of browsers (BROWSER_BACKEND), one fresh context per lookup
+        self.browser_pool = create_browser_pool(self.browserless_endpoint)
+        
+        # Plain-HTTP tier tried before the browser when the carrier allows it
+        self.tiered_fetcher = get_tiered_fetcher()
+        
+        # Aborts images, fonts, media and tracker requests on every context
+        self.resource_blocker = get_resource_blocker()
+        
+        # Status-aware result cache shared with the Flask app
+        self.result_cache = get_tracking_cache()
+        
+        # Re-scrapes non-terminal shipments before their cached result expires
+        self.refresh_scheduler = get_refresh_scheduler()
+        
+        # Fail fast while the browser backend or OpenAI keeps erroring
+        self.browser_circuit = get_circuit_breaker(self.browser_pool.name)
+        self.openai_circuit = get_circuit_breaker('openai')
+        
+        # Admission control for browser sessions: slots, token bucket, priority queue
+        self.session_governor = get_session_governor()
+        
+        # In-flight lookups keyed by (carrier, tracking number)
+        self.tracking_flight = AsyncSingleFlight('tracking')
+        
+        # Previous results for unchanged page text, so re-scrapes skip the AI call
+        self.content_fingerprints = get_content_fingerprints()
+        
+        # Local pattern extraction that lets confident pages skip the AI call
+        self.rule_extractor = RuleBasedExtractor()
         
         # Initialize fake user agent generator
         self.ua = UserAgent()
@@ -42,184 +176,197 @@ class EnhancedStealthScraper:
             {'width': 1280, 'height': 720, 'device_scale_factor': 1}
         ]
 
-    async def get_tracking_status(self, tracking_url, carrier_name, tracking_number):
+    async def get_tracking_status(self, tracking_url, carrier_name, tracking_number, priority=INTERACTIVE):
+        """
+        Get real tracking status, served from the result cache when still fresh
+        """
+        cached = await self.result_cache.aget(carrier_name, tracking_number)
+        if cached is not None:
+            CACHE_REQUESTS.inc(cache='tracking_result', result='hit')
+            logger.info(f"⚡ Tracking cache hit for {carrier_name} package {tracking_number}: {cached.get('status')}")
+            return cached
+        CACHE_REQUESTS.inc(cache='tracking_result', result='miss')
+        
+        # Concurrent misses for the same package share one lookup, run at the most urgent caller's priority
+        tracking_info = await self.tracking_flight.do(
+            ((carrier_name or '').lower(), tracking_number),
+            self._lookup_and_cache, tracking_url, carrier_name, tracking_number, False, priority=priority
+        )
+        
+        # No lookup could run: an expired result beats the fallback
+        if tracking_info.get('degraded'):
+            stale = await self.result_cache.aget_stale(carrier_name, tracking_number)
+            if stale is not None and not is_fallback_result(stale):
+                logger.info(f"🕰️ Serving stale result for {carrier_name} package {tracking_number} ({tracking_info['degraded']})")
+                return {**stale, 'stale': True}
+        return tracking_info
+
+    async def refresh_tracking_status(self, tracking_url, carrier_name, tracking_number):
         """
-        Get real tracking status using Browserless.io hosted browsers
+        Re-scrape ahead of cache expiry for the refresh scheduler; a failed
+        refresh leaves the cached result in place
+        """
+        return await self.tracking_flight.do(
+            ((carrier_name or '').lower(), tracking_number),
+            self._lookup_and_cache, tracking_url, carrier_name, tracking_number, True, priority=BACKGROUND
+        )
+
+    async def _lookup_and_cache(self, tracking_url, carrier_name, tracking_number, refresh=False, priority=INTERACTIVE):
+        tracking_info = await self._lookup_tracking_status(tracking_url, carrier_name, tracking_number, priority, refresh)
+        LOOKUPS.inc(carrier=carrier_name, extraction_method=tracking_info.get('extraction_method'))
+        # A lookup that never ran says nothing about the package, so never cache it
+        if not tracking_info.get('degraded') and not (refresh and is_fallback_result(tracking_info)):
+            await self.result_cache.aset(carrier_name, tracking_number, tracking_info, tracking_url)
+        self.refresh_scheduler.track(tracking_url, carrier_name, tracking_number, tracking_info)
+        return tracking_info
+
+    async def _lookup_tracking_status(self, tracking_url, carrier_name, tracking_number, priority=INTERACTIVE,
+                                      confirm_terminal=False):
+        """
+        Get real tracking status, via plain HTTP when that is enough and Browserless.io hosted browsers otherwise.
+        With confirm_terminal (background refreshes) a terminal status read by the rules goes to the AI as well.
         """
         try:
-            logger.info(f"🕵️‍♂️ Enhanced tracking via Browserless.io for {carrier_name} package {tracking_number}")
+            logger.info(f"🕵️‍♂️ Enhanced tracking for {carrier_name} package {tracking_number}")
             
-            # Use Browserless.io hosted browser to load the page
-            page_content = await self._browserless_stealth_load(tracking_url)
+            page_content, fetch_tier = await self._load_page_content(tracking_url, carrier_name, tracking_number, priority)
             
             if not page_content or len(page_content.strip()) < 50:
                 logger.warning(f"⚠️ Insufficient content: {len(page_content) if page_content else 0} chars")
-                return self._fallback_response(carrier_name, tracking_number)
+                return self._fallback_response(carrier_name, tracking_number, 'insufficient_content')
+            
+            fingerprint = content_fingerprint(page_content, tracking_number)
+            
+            # Deterministic rules first, AI only when they are not confident
+            rule_info = self.rule_extractor.extract(page_content, carrier_name, tracking_number)
+            confirming = confirm_terminal and status_ttl(carrier_name, rule_info['status']) is None
+            if rule_info['confidence'] >= RULE_EXTRACTION_MIN_CONFIDENCE and not confirming:
+                logger.info(f"📏 Rule-based extraction: {rule_info['status']} (confidence {rule_info['confidence']}), skipping AI")
+                rule_info.update(self._tracking_metadata(carrier_name, tracking_number, page_content, RULE_METHOD))
+                rule_info['fetch_tier'] = fetch_tier
+                rule_info['content_fingerprint'] = fingerprint
+                return rule_info
+            
+            # Same page text as last time: the previous analysis still holds
+            previous = await self.content_fingerprints.find_reusable(carrier_name, tracking_number, fingerprint)
+            if previous is not None:
+                logger.info(f"🧬 Page unchanged for {carrier_name} package {tracking_number}, reusing {previous.get('status')} without AI")
+                tracking_info = {
+                    **previous,
+                    **self._tracking_metadata(carrier_name, tracking_number, page_content, previous.get('extraction_method')),
+                    'analysis_reused': True,
+                }
+                tracking_info['fetch_tier'] = fetch_tier
+                return tracking_info
+            
+            if confirming:
+                logger.info(f"📏 Confirming rule-based {rule_info['status']} with AI before treating it as final")
+            else:
+                logger.info(f"📏 Rule-based confidence {rule_info['confidence']} below {RULE_EXTRACTION_MIN_CONFIDENCE}, using AI")
             
             # Use AI to analyze the page content
             tracking_info = await self._analyze_with_ai(page_content, tracking_number, carrier_name)
+            tracking_info['fetch_tier'] = fetch_tier
+            if not is_fallback_result(tracking_info):
+                tracking_info['content_fingerprint'] = fingerprint
             
             return tracking_info
             
+        except SessionRejected as e:
+            logger.warning(f"🚫 {e}, answering {carrier_name} package {tracking_number} without a browser")
+            return self._degraded_response(carrier_name, tracking_number, f"admission_{e.reason}")
+            
+        except CircuitOpenError as e:
+            logger.warning(f"⛔ {e}, answering {carrier_name} package {tracking_number} without it")
+            return self._degraded_response(carrier_name, tracking_number, f"{e.name}_circuit_open")
+            
         except Exception as e:
             logger.error(f"❌ Enhanced Browserless scraper error: {e}")
-            return self._fallback_response(carrier_name, tracking_number)
+            return self._fallback_response(carrier_name, tracking_number, 'scraper_error')
+
+    async def _load_page_content(self, tracking_url, carrier_name, tracking_number, priority=INTERACTIVE):
+        """
+        Fetch page text through the cheapest tier that yields usable content.
+        
+        Starts at the tier that last worked for the carrier and escalates from
+        plain HTTP to the browser when the HTTP text is too thin or carries no
+        tracking status (e.g. a JavaScript-only shell).
+        """
+        first_tier = self.tiered_fetcher.first_tier(carrier_name)
+        
+        if first_tier == TIER_HTTP:
+            content = await self.tiered_fetcher.fetch(tracking_url, carrier_name, tracking_number, self.ua.random)
+            if len(content.strip()) >= MIN_TEXT_CHARS and self.rule_extractor.extract(content, carrier_name, tracking_number)['status'] != 'Unknown':
+                self.tiered_fetcher.record(carrier_name, TIER_HTTP, content)
+                return content, TIER_HTTP
+            logger.info(f"⬆️ HTTP tier too thin for {carrier_name} ({len(content.strip())} chars), escalating to browser")
+        
+        # Load the page in a pooled browser (Browserless.io or local Chromium)
+        content = await self._browserless_stealth_load(tracking_url, carrier_name, priority)
+        self.tiered_fetcher.record(carrier_name, TIER_BROWSER, content, escalated=first_tier == TIER_HTTP)
+        return content, TIER_BROWSER
 
-    async def _browserless_stealth_load(self, tracking_url):
+    async def _browserless_stealth_load(self, tracking_url, carrier_name=None, priority=INTERACTIVE):
         """
-        Load page using Browserless.io hosted browser with stealth configuration and rate limiting
+        Load page using a pooled browser with stealth configuration and rate limiting.
+        
+        Every attempt checks the browser circuit and then waits for a
+        session from the governor; CircuitOpenError and SessionRejected
+        propagate so the caller can answer without a browser.
         """
         max_retries = 3
         base_delay = 2  # Base delay in seconds
         
         for attempt in range(max_retries):
+            self.browser_circuit.check()
             try:
-                # Add exponential backoff delay for retries
-                if attempt > 0:
-                    delay = base_delay * (2 ** (attempt - 1)) + random.uniform(0, 1)
-                    logger.info(f"⏳ Rate limit retry {attempt}/{max_retries}, waiting {delay:.1f}s...")
-                    await asyncio.sleep(delay)
-                
-                async with async_playwright() as p:
-                    logger.info(f"🌐 Connecting to Browserless.io: {self.browserless_endpoint}")
+                # Borrow a connected browser and create context with realistic configuration
+                async with self.session_governor.session(priority, carrier_name), \
+                        self.browser_pool.new_context(**self._context_options()) as context:
                     
-                    # Connect to Browserless.io hosted browser
-                    browser = await p.chromium.connect(self.browserless_endpoint)
+                    # Only the page text is needed, skip heavy and third-party resources
+                    blocked = await self.resource_blocker.attach(context, carrier_name)
                     
-                    # Create context with realistic configuration
-                    viewport = random.choice(self.viewport_configs)
-                    user_agent = self.ua.random
+                    # Create page with stealth configuration
+                    page = await context.new_page()
                     
-                    context = await browser.new_context(
-                        user_agent=user_agent,
-                        viewport=viewport,
-                        locale='en-US',
-                        timezone_id='America/New_York',
-                        permissions=['geolocation'],
-                        geolocation={'latitude': 40.7128, 'longitude': -74.0060},
-                        color_scheme='light',
-                        reduced_motion='no-preference',
-                        forced_colors='none',
-                        java_script_enabled=True,
-                        extra_http_headers={
-                            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
-                            'Accept-Language': 'en-US,en;q=0.9',
-                            'Accept-Encoding': 'gzip, deflate, br',
-                            'DNT': '1',
-                            'Connection': 'keep-alive',
-                            'Upgrade-Insecure-Requests': '1',
-                        'Sec-Fetch-Dest': 'document',
-                        'Sec-Fetch-Mode': 'navigate',
-                        'Sec-Fetch-Site': 'none',
-                        'Sec-Fetch-User': '?1',
-                        'Cache-Control': 'max-age=0',
-                        'sec-ch-ua': '"Not_A Brand";v="8", "Chromium";v="120", "Google Chrome";v="120"',
-                        'sec-ch-ua-mobile': '?0',
-                        'sec-ch-ua-platform': '"Windows"'
-                    }
-                )
-                
-                # Create page with stealth configuration
-                page = await context.new_page()
-                
-                # Enhanced stealth injections (Browserless.io already provides some stealth)
-                await page.add_init_script("""
-                    // Override webdriver detection
-                    Object.defineProperty(navigator, 'webdriver', {
-                        get: () => undefined,
-                    });
-                    
-                    // Override automation flags
-                    delete window.cdc_adoQpoasnfa76pfcZLmcfl_Array;
-                    delete window.cdc_adoQpoasnfa76pfcZLmcfl_Promise;
-                    delete window.cdc_adoQpoasnfa76pfcZLmcfl_Symbol;
-                    delete window.cdc_adoQpoasnfa76pfcZLmcfl_JSON;
-                    delete window.cdc_adoQpoasnfa76pfcZLmcfl_Object;
-                    delete window.cdc_adoQpoasnfa76pfcZLmcfl_Proxy;
-                    
-                    // Mock realistic plugins
-                    Object.defineProperty(navigator, 'plugins', {
-                        get: () => ({
-                            length: 3,
-                            0: { name: 'Chrome PDF Plugin' },
-                            1: { name: 'Chrome PDF Viewer' },
-                            2: { name: 'Native Client' }
-                        }),
-                    });
-                    
-                    // Mock realistic languages
-                    Object.defineProperty(navigator, 'languages', {
-                        get: () => ['en-US', 'en'],
-                    });
+                    # Enhanced stealth injections (Browserless.io already provides some stealth)
+                    await page.add_init_script(STEALTH_INIT_SCRIPT)
                     
-                    // Mock realistic hardware
-                    Object.defineProperty(navigator, 'hardwareConcurrency', {
-                        get: () => 8,
-                    });
+                    # Human-like pre-navigation behavior
+                    logger.info(f"🌐 Navigating to: {tracking_url}")
+                    await asyncio.sleep(random.uniform(1.5, 3.5))
                     
-                    // Mock realistic memory
-                    Object.defineProperty(navigator, 'deviceMemory', {
-                        get: () => 8,
-                    });
-                    
-                    // Mock chrome runtime
-                    window.chrome = {
-                        runtime: {
-                            onConnect: undefined,
-                            onMessage: undefined
-                        },
-                        app: {
-                            isInstalled: false
-                        }
-                    };
-                    
-                    // Override toString methods
-                    window.navigator.webdriver = undefined;
-                    
-                    // Mock realistic connection
-                    Object.defineProperty(navigator, 'connection', {
-                        get: () => ({
-                            effectiveType: '4g',
-                            rtt: 50,
-                            downlink: 10
-                        }),
-                    });
-                """)
-                
-                # Human-like pre-navigation behavior
-                logger.info(f"🌐 Navigating to: {tracking_url}")
-                await asyncio.sleep(random.uniform(1.5, 3.5))
-                
-                # Navigate with enhanced error handling
-                try:
-                    response = await page.goto(
-                        tracking_url,
-                        wait_until='domcontentloaded',
-                        timeout=60000
-                    )
+                    # Navigate with enhanced error handling
+                    try:
+                        with STAGE_SECONDS.time(stage='page_goto', carrier=carrier_name):
+                            response = await page.goto(
+                                tracking_url,
+                                wait_until='domcontentloaded',
+                                timeout=60000
+                            )
+                        
+                        status_code = response.status if response else 0
+                        logger.info(f"📄 Response status: {status_code}")
+                        
+                        if status_code >= 400:
+                            logger.warning(f"⚠️ HTTP error: {status_code}")
+                            
+                    except Exception as nav_error:
+                        # The carrier site failed, not the browser
+                        self.browser_circuit.record_success()
+                        logger.error(f"Navigation error: {nav_error}")
+                        return None
                     
-                    status_code = response.status if response else 0
-                    logger.info(f"📄 Response status: {status_code}")
+                    # Enhanced human behavior simulation
+                    await self._advanced_human_simulation(page)
                     
-                    if status_code >= 400:
-                        logger.warning(f"⚠️ HTTP error: {status_code}")
-                        
-                except Exception as nav_error:
-                    logger.error(f"Navigation error: {nav_error}")
-                    await context.close()
-                    await browser.close()
-                    return None
+                    # Multi-strategy content loading
+                    content = await self._multi_strategy_content_extraction(page, carrier_name)
                 
-                # Enhanced human behavior simulation
-                await self._advanced_human_simulation(page)
-                
-                # Multi-strategy content loading
-                content = await self._multi_strategy_content_extraction(page)
-                
-                await context.close()
-                await browser.close()
-                
-                logger.info(f"✅ Extracted {len(content)} characters via Browserless.io")
+                self.browser_circuit.record_success()
+                self.resource_blocker.record(blocked, carrier_name)
+                logger.info(f"✅ Extracted {len(content)} characters via {self.browser_pool.label}")
                 
                 if content and len(content.strip()) > 50:
                     preview = content.strip()[:400].replace('\n', ' ').replace('\r', ' ')
@@ -227,22 +374,33 @@ class EnhancedStealthScraper:
                 else:
                     logger.warning("⚠️ Minimal content extracted despite Browserless.io")
                 
-                    return content
+                return content
                     
+            except SessionRejected:
+                raise
+                
             except Exception as e:
                 error_msg = str(e)
                 logger.error(f"❌ Browserless.io loading error (attempt {attempt + 1}/{max_retries}): {error_msg}")
                 
                 # Check if it's a rate limiting error
-                if "429" in error_msg or "Too Many Requests" in error_msg:
+                if is_rate_limit_error(e):
+                    # Throttled, but up: a 429 is no reason to open the circuit
+                    self.browser_circuit.record_success()
+                    RATE_LIMITED.inc(carrier=carrier_name, upstream='browserless')
                     if attempt < max_retries - 1:
-                        logger.info("🔄 Rate limit detected, will retry with backoff...")
+                        # Back off every session, not just this one; the retry queues behind the pause
+                        delay = base_delay * (2 ** attempt) + random.uniform(0, 1)
+                        self.session_governor.throttle(delay)
+                        RETRIES.inc(carrier=carrier_name, stage='browser_load')
+                        logger.info(f"🔄 Rate limit detected, retry {attempt + 1}/{max_retries - 1} after {delay:.1f}s backoff...")
                         continue
                     else:
                         logger.error("❌ Rate limit exceeded all retries")
                         return None
                 else:
                     # For non-rate-limit errors, don't retry
+                    self.browser_circuit.record_failure()
                     logger.error(f"❌ Non-rate-limit error, not retrying: {error_msg}")
                     return None
         
@@ -250,6 +408,39 @@ class EnhancedStealthScraper:
         logger.error("❌ All Browserless.io connection attempts failed")
         return None
 
+    def _context_options(self):
+        """
+        Randomized but realistic BrowserContext configuration
+        """
+        return {
+            'user_agent': self.ua.random,
+            'viewport': random.choice(self.viewport_configs),
+            'locale': 'en-US',
+            'timezone_id': 'America/New_York',
+            'permissions': ['geolocation'],
+            'geolocation': {'latitude': 40.7128, 'longitude': -74.0060},
+            'color_scheme': 'light',
+            'reduced_motion': 'no-preference',
+            'forced_colors': 'none',
+            'java_script_enabled': True,
+            'extra_http_headers': {
+                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
+                'Accept-Language': 'en-US,en;q=0.9',
+                'Accept-Encoding': 'gzip, deflate, br',
+                'DNT': '1',
+                'Connection': 'keep-alive',
+                'Upgrade-Insecure-Requests': '1',
+                'Sec-Fetch-Dest': 'document',
+                'Sec-Fetch-Mode': 'navigate',
+                'Sec-Fetch-Site': 'none',
+                'Sec-Fetch-User': '?1',
+                'Cache-Control': 'max-age=0',
+                'sec-ch-ua': '"Not_A Brand";v="8", "Chromium";v="120", "Google Chrome";v="120"',
+                'sec-ch-ua-mobile': '?0',
+                'sec-ch-ua-platform': '"Windows"'
+            }
+        }
+
     async def _advanced_human_simulation(self, page):
         """
         Advanced human behavior simulation
@@ -279,78 +470,35 @@ class EnhancedStealthScraper:
         except Exception as e:
             logger.debug(f"Human simulation error: {e}")
 
-    async def _multi_strategy_content_extraction(self, page):
+    async def _multi_strategy_content_extraction(self, page, carrier_name=None):
         """
-        Multiple strategies for content extraction
+        Wait for the tracking result to render, then extract the page text
         """
         content = ""
+        timings = {}
         
         try:
-            # Strategy 1: Wait for network idle
-            await page.wait_for_load_state('networkidle', timeout=60000)
-            
-            # Strategy 2: Wait for specific elements
-            tracking_selectors = [
-                '[class*="track"]', '[class*="status"]', '[class*="delivery"]',
-                '[id*="track"]', '[id*="status"]', '[id*="delivery"]',
-                'main', '.content', '#content', '.container', '.wrapper'
-            ]
+            # Strategy 1: Race readiness conditions under one deadline
+            readiness = await wait_for_page_ready(page, carrier_name)
+            timings['readiness'] = readiness['elapsed']
+            STAGE_SECONDS.observe(readiness['elapsed'], stage='readiness_wait', carrier=carrier_name)
             
-            for selector in tracking_selectors:
-                try:
-                    await page.wait_for_selector(selector, timeout=3000)
-                    logger.info(f"✅ Found tracking element: {selector}")
-                    break
-                except:
-                    continue
+            # Strategy 2: Single read-only pass over the carrier's content root
+            started = time.monotonic()
+            extracted = await page.evaluate(PAGE_TEXT_SCRIPT, page_text_arguments(get_scrape_profile(carrier_name).content_root))
+            content = (extracted or {}).get('text') or ''
+            timings['extraction'] = round(time.monotonic() - started, 3)
+            timings['scoped'] = bool((extracted or {}).get('scoped'))
+            STAGE_SECONDS.observe(time.monotonic() - started, stage='text_extraction', carrier=carrier_name)
             
-            # Strategy 3: Progressive content checking
-            for attempt in range(15):
-                current_content = await page.evaluate('''
-                    () => {
-                        // Remove unwanted elements
-                        const unwanted = document.querySelectorAll('script, style, noscript, iframe');
-                        unwanted.forEach(el => el.remove());
-                        
-                        // Get text content
-                        const body = document.body;
-                        if (!body) return '';
-                        
-                        let text = body.innerText || body.textContent || '';
-                        
-                        // If minimal, try specific extraction
-                        if (text.length < 200) {
-                            const elements = document.querySelectorAll('div, span, p, td, th, li, h1, h2, h3, h4, h5, h6, strong, em');
-                            const texts = [];
-                            elements.forEach(el => {
-                                const elementText = (el.innerText || el.textContent || '').trim();
-                                if (elementText && elementText.length > 2 && !texts.includes(elementText)) {
-                                    texts.push(elementText);
-                                }
-                            });
-                            text = texts.join(' ');
-                        }
-                        
-                        return text;
-                    }
-                ''')
-                
-                if current_content and len(current_content.strip()) > 100:
-                    content = current_content
-                    logger.info(f"✅ Content loaded after {attempt + 1} attempts: {len(content)} chars")
-                    break
-                    
-                await asyncio.sleep(1)
-            
-            # Strategy 4: HTML fallback if text extraction fails
+            # Strategy 3: HTML fallback if text extraction fails
             if not content or len(content.strip()) < 100:
+                started = time.monotonic()
                 html_content = await page.content()
-                # Basic HTML cleaning
-                import re
-                text_content = re.sub(r'<script[^>]*>.*?</script>', '', html_content, flags=re.DOTALL)
-                text_content = re.sub(r'<style[^>]*>.*?</style>', '', text_content, flags=re.DOTALL)
-                text_content = re.sub(r'<[^>]+>', ' ', text_content)
-                text_content = re.sub(r'\s+', ' ', text_content).strip()
+                text_content = html_to_text(html_content)
+                
+                timings['html_fallback'] = round(time.monotonic() - started, 3)
+                STAGE_SECONDS.observe(time.monotonic() - started, stage='html_fallback', carrier=carrier_name)
                 
                 if len(text_content) > len(content):
                     content = text_content
@@ -361,23 +509,30 @@ class EnhancedStealthScraper:
         except Exception as e:
             logger.error(f"Content extraction error: {e}")
             return content
+        
+        finally:
+            logger.info(f"⏱️ Content stage timings: {timings}")
 
     async def _analyze_with_ai(self, page_content, tracking_number, carrier_name):
         """
         Enhanced AI analysis with better prompting
         """
         try:
+            # Only the relevant windows of the page go into the prompt
+            relevant_content = reduce_page_content(page_content, tracking_number, carrier_name)
+            carrier_hints = self._carrier_prompt_hints(carrier_name)
+            
             # Enhanced prompt for better extraction
             prompt = f"""
-            You are an expert at extracting tracking information from USPS and other carrier websites.
+            You are an expert at extracting tracking information from carrier websites.
             Analyze this page content carefully and extract the delivery status.
             
             Tracking Number: {tracking_number}
             Carrier: {carrier_name}
-            Content Length: {len(page_content)} characters
+            Content Length: {len(relevant_content)} characters
             
             Page Content:
-            {page_content}
+            {relevant_content}
             
             CRITICAL: This package was delivered weeks ago. Look VERY carefully for delivery information.
             
@@ -404,13 +559,7 @@ class EnhancedStealthScraper:
             - ZIP codes with delivery context
             - Facility names with locations
             
-            SPECIFIC USPS DELIVERY PHRASES:
-            - "Your item was delivered in or at the mailbox"
-            - "Delivered, In/At Mailbox"
-            - "Delivered, Front Door/Porch"
-            - "delivered in or at the mailbox at 4:11 pm"
-            - Any phrase containing both "delivered" and a time/location
-            
+            {carrier_hints}
             SEARCH STRATEGY:
             1. First scan for the word "delivered" anywhere in the content
             2. If found, extract the surrounding context for date/time/location
@@ -434,7 +583,8 @@ class EnhancedStealthScraper:
             If tracking information is truly not found after thorough analysis, use "Unknown" for status.
             """
             
-            response = self.openai_client.chat.completions.create(
+            response = await self._create_chat_completion(
+                carrier_name,
                 model="gpt-4.1-mini",
                 messages=[
                     {"role": "system", "content": "You are a precise tracking information extraction expert. You MUST thoroughly scan ALL content for delivery-related keywords. Look for ANY mention of 'delivered', 'delivery', dates, locations. Return only valid JSON with accurate data extracted from the provided content. Be very thorough in your analysis."},
@@ -451,29 +601,115 @@ class EnhancedStealthScraper:
                 tracking_info = json.loads(ai_response)
                 
                 # Add enhanced metadata
-                tracking_info.update({
-                    'carrier': carrier_name,
-                    'tracking_number': tracking_number,
-                    'extraction_method': 'browserless_stealth_AI',
-                    'timestamp': datetime.now().isoformat(),
-                    'content_length': len(page_content),
-                    'stealth_version': '3.0_browserless'
-                })
+                tracking_info.update(self._tracking_metadata(carrier_name, tracking_number, page_content, 'browserless_stealth_AI'))
                 
                 return tracking_info
                 
             except json.JSONDecodeError:
                 logger.error(f"JSON parse error: {ai_response}")
-                return self._fallback_response(carrier_name, tracking_number)
+                return self._fallback_response(carrier_name, tracking_number, 'ai_parse_error')
                 
+        except CircuitOpenError:
+            raise
+            
         except Exception as e:
             logger.error(f"AI analysis error: {e}")
-            return self._fallback_response(carrier_name, tracking_number)
+            return self._fallback_response(carrier_name, tracking_number, 'ai_error')
+
+    async def _create_chat_completion(self, carrier_name=None, **request):
+        """
+        Chat completion with bounded concurrency, retrying 429/5xx, timeouts
+        and connection errors with full-jitter exponential backoff, honouring
+        Retry-After up to OPENAI_MAX_RETRY_AFTER. 5xx, timeouts and connection
+        errors count against the OpenAI circuit.
+        """
+        model = request.get('model')
+        for attempt in range(OPENAI_MAX_RETRIES + 1):
+            self.openai_circuit.check()
+            try:
+                async with self.openai_semaphore:
+                    with STAGE_SECONDS.time(stage='llm_call', carrier=carrier_name):
+                        response = await self.openai_client.chat.completions.create(timeout=OPENAI_TIMEOUT, **request)
+                
+                self.openai_circuit.record_success()
+                LLM_REQUESTS.inc(carrier=carrier_name, model=model, outcome='success')
+                usage = getattr(response, 'usage', None)
+                if usage is not None:
+                    LLM_TOKENS.inc(usage.prompt_tokens or 0, carrier=carrier_name, model=model, kind='prompt')
+                    LLM_TOKENS.inc(usage.completion_tokens or 0, carrier=carrier_name, model=model, kind='completion')
+                return response
+                    
+            except (openai.APIConnectionError, openai.APIStatusError) as e:
+                status_code = getattr(e, 'status_code', None)
+                if status_code == 429:
+                    RATE_LIMITED.inc(carrier=carrier_name, upstream='openai')
+                retryable = status_code is None or status_code == 429 or status_code >= 500
+                if status_code is None or status_code >= 500:
+                    self.openai_circuit.record_failure()
+                else:
+                    self.openai_circuit.record_success()
+                retry_after = e.response.headers.get('retry-after') if getattr(e, 'response', None) is not None else None
+                retry_after = float(retry_after) if retry_after and retry_after.replace('.', '', 1).isdigit() else None
+                if retry_after is not None and retry_after > OPENAI_MAX_RETRY_AFTER:
+                    logger.warning(f"⏳ OpenAI asked to retry after {retry_after:.0f}s, not retrying")
+                    retryable = False
+                if not retryable or attempt >= OPENAI_MAX_RETRIES:
+                    LLM_REQUESTS.inc(carrier=carrier_name, model=model, outcome='error')
+                    raise
+                RETRIES.inc(carrier=carrier_name, stage='llm_call')
+                
+                delay = random.uniform(0, OPENAI_RETRY_BASE_DELAY * (2 ** attempt))
+                if retry_after is not None:
+                    delay = max(delay, retry_after)
+                
+                logger.warning(f"⏳ OpenAI {status_code or type(e).__name__}, retry {attempt + 1}/{OPENAI_MAX_RETRIES} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    @staticmethod
+    def _carrier_prompt_hints(carrier_name):
+        """
+        Carrier-specific phrase hints for the AI prompt from the carrier profile
+        """
+        hints = get_scrape_profile(carrier_name).prompt_hints
+        if not hints:
+            return ''
+        lines = '\n            '.join(f"- {hint}" for hint in hints)
+        return f"SPECIFIC {carrier_name.upper()} DELIVERY PHRASES:\n            {lines}\n"
+
+    def _tracking_metadata(self, carrier_name, tracking_number, page_content, extraction_method):
+        """
+        Metadata added to every successful extraction
+        """
+        return {
+            'carrier': carrier_name,
+            'tracking_number': tracking_number,
+            'extraction_method': extraction_method,
+            'timestamp': datetime.now().isoformat(),
+            'content_length': len(page_content),
+            'stealth_version': '3.0_browserless'
+        }
+
+    async def close(self):
+        """
+        Release pooled browser and HTTP connections
+        """
+        await self.browser_pool.close()
+        await self.tiered_fetcher.close()
+
+    def _degraded_response(self, carrier_name, tracking_number, reason):
+        """
+        Fallback for a lookup that was not attempted (overload or an open
+        circuit); `degraded` keeps it out of the cache
+        """
+        tracking_info = self._fallback_response(carrier_name, tracking_number, reason)
+        tracking_info['degraded'] = reason
+        return tracking_info
 
-    def _fallback_response(self, carrier_name, tracking_number):
+    def _fallback_response(self, carrier_name, tracking_number, reason='extraction_failed'):
         """
         Enhanced fallback response
         """
+        FALLBACKS.inc(carrier=carrier_name, reason=reason)
         return {
             'status': 'Check tracking link for current status',
             'carrier': carrier_name,
@@ -488,37 +724,136 @@ class EnhancedStealthScraper:
         }
 
 
+# Created on first use (it needs OPENAI_API_KEY) and closed when the runtime shuts down
+_scraper = None
+_scraper_lock = threading.Lock()
+
+
+def get_scraper():
+    global _scraper
+    with _scraper_lock:
+        if _scraper is None:
+            _scraper = EnhancedStealthScraper()
+            get_runtime().add_shutdown_hook(_scraper.close)
+        return _scraper
+
+
+def submit_enhanced_stealth_tracking(tracking_url, carrier_name, tracking_number):
+    """
+    Schedule a lookup on the background runtime and return its Future
+    """
+    return get_runtime().submit(
+        get_scraper().get_tracking_status(tracking_url, carrier_name, tracking_number)
+    )
+
+
 # Synchronous wrapper
-def get_enhanced_stealth_tracking(tracking_url, carrier_name, tracking_number):
+def get_enhanced_stealth_tracking(tracking_url, carrier_name, tracking_number, timeout=TRACKING_LOOKUP_TIMEOUT):
     """
     Synchronous wrapper for Browserless.io enhanced tracking
     """
+    future = None
     try:
-        scraper = EnhancedStealthScraper()
+        future = submit_enhanced_stealth_tracking(tracking_url, carrier_name, tracking_number)
+        return future.result(timeout)
         
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        result = loop.run_until_complete(
-            scraper.get_tracking_status(tracking_url, carrier_name, tracking_number)
-        )
-        loop.close()
-        
-        return result
+    except Exception as e:
+        if future is not None:
+            future.cancel()
+        logger.error(f"Enhanced Browserless wrapper error: {e!r}")
+        return _wrapper_error_response(carrier_name, tracking_number)
+
+
+async def get_enhanced_stealth_tracking_async(tracking_url, carrier_name, tracking_number, timeout=TRACKING_LOOKUP_TIMEOUT):
+    """
+    Awaitable wrapper for callers on another event loop (the ASGI app);
+    the lookup itself still runs on the scraper runtime
+    """
+    future = None
+    try:
+        future = submit_enhanced_stealth_tracking(tracking_url, carrier_name, tracking_number)
+        return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
         
     except Exception as e:
-        logger.error(f"Enhanced Browserless wrapper error: {e}")
-        return {
-            'status': 'Check tracking link for current status',
-            'carrier': carrier_name,
-            'tracking_number': tracking_number,
-            'estimated_delivery': None,
-            'current_location': None,
-            'last_update': datetime.now().strftime('%Y-%m-%d'),
-            'delivery_date': None,
-            'notes': 'System error during tracking extraction',
-            'extraction_method': 'browserless_error',
-            'timestamp': datetime.now().isoformat()
-        }
+        if future is not None:
+            future.cancel()
+        logger.error(f"Enhanced Browserless wrapper error: {e!r}")
+        return _wrapper_error_response(carrier_name, tracking_number)
+
+
+def submit_enhanced_stealth_tracking_batch(lookups, concurrency=None):
+    """
+    Schedule many (tracking_url, carrier_name, tracking_number) lookups with at
+    most `concurrency` running at once; returns one Future per lookup
+    """
+    scraper = get_scraper()
+    semaphore = asyncio.Semaphore(concurrency) if concurrency else None
+    
+    async def limited(tracking_url, carrier_name, tracking_number):
+        if semaphore is None:
+            return await scraper.get_tracking_status(tracking_url, carrier_name, tracking_number, BATCH)
+        async with semaphore:
+            return await scraper.get_tracking_status(tracking_url, carrier_name, tracking_number, BATCH)
+    
+    runtime = get_runtime()
+    return [runtime.submit(limited(*lookup)) for lookup in lookups]
+
+
+def get_enhanced_stealth_tracking_many(lookups, timeout=TRACKING_LOOKUP_TIMEOUT, concurrency=None):
+    """
+    Run many (tracking_url, carrier_name, tracking_number) lookups at once
+    and return their results in the same order
+    """
+    try:
+        futures = submit_enhanced_stealth_tracking_batch(lookups, concurrency)
+    except Exception as e:
+        logger.error(f"Enhanced Browserless batch submit error: {e!r}")
+        return [_wrapper_error_response(carrier_name, tracking_number) for _, carrier_name, tracking_number in lookups]
+    
+    concurrent.futures.wait(futures, timeout=timeout)
+    
+    results = []
+    for lookup, future in zip(lookups, futures):
+        results.append(enhanced_tracking_result(future, *lookup))
+    return results
+
+
+def enhanced_tracking_result(future, tracking_url, carrier_name, tracking_number):
+    """
+    Result of a submitted lookup, or the error response if it failed or is still running
+    """
+    if future.done() and not future.cancelled() and future.exception() is None:
+        return future.result()
+    
+    future.cancel()
+    logger.error(f"Enhanced Browserless lookup failed for {tracking_number}")
+    return _wrapper_error_response(carrier_name, tracking_number)
+
+
+def shutdown_enhanced_stealth_tracking():
+    """
+    Close the shared scraper and stop the background runtime
+    """
+    global _scraper
+    get_runtime().shutdown()
+    with _scraper_lock:
+        _scraper = None
+
+
+def _wrapper_error_response(carrier_name, tracking_number):
+    FALLBACKS.inc(carrier=carrier_name, reason='lookup_error')
+    return {
+        'status': 'Check tracking link for current status',
+        'carrier': carrier_name,
+        'tracking_number': tracking_number,
+        'estimated_delivery': None,
+        'current_location': None,
+        'last_update': datetime.now().strftime('%Y-%m-%d'),
+        'delivery_date': None,
+        'notes': 'System error during tracking extraction',
+        'extraction_method': 'browserless_error',
+        'timestamp': datetime.now().isoformat()
+    }
 
 
 if __name__ == "__main__":
@@ -527,6 +862,6 @@ if __name__ == "__main__":
         test_url = sys.argv[1]
         result = get_enhanced_stealth_tracking(test_url, "USPS", "test123")
         print(f"Browserless Result: {result}")
+        shutdown_enhanced_stealth_tracking()
     else:
         print("Usage: python enhanced_stealth_scraper.py <tracking_url>")
-
@@ -0,0 +1,200 @@
+"""
+Tiered tracking page fetch
+A pooled plain-HTTP fetch that serves carriers whose tracking data is in the
+server-rendered HTML (or a JSON endpoint), with per-carrier memory of which
+tier last worked so later lookups go straight to it
+"""
+import json
+import logging
+import os
+import threading
+import time
+import httpx
+from carrier_profiles import get_scrape_profile
+from metrics import FETCH_TIER_LOOKUPS, RATE_LIMITED, STAGE_SECONDS
+from page_text import html_to_text
+
+logger = logging.getLogger(__name__)
+
+# Fetch tiers, cheapest first
+TIER_HTTP = 'http'
+TIER_BROWSER = 'browser'
+FETCH_TIERS = (TIER_HTTP, TIER_BROWSER)
+
+# HTTP tier configuration
+HTTP_FETCH_ENABLED = os.getenv('HTTP_FETCH_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+HTTP_FETCH_TIMEOUT = float(os.getenv('HTTP_FETCH_TIMEOUT', '10'))  # seconds
+HTTP_FETCH_POOL_SIZE = int(os.getenv('HTTP_FETCH_POOL_SIZE', '10'))
+HTTP_FETCH_MAX_BYTES = int(os.getenv('HTTP_FETCH_MAX_BYTES', str(2 * 1024 * 1024)))
+# Carriers pinned to the browser still get an HTTP probe every N lookups
+HTTP_REPROBE_INTERVAL = int(os.getenv('HTTP_REPROBE_INTERVAL', '20'))
+
+# Same thresholds the browser path uses for "too thin"
+MIN_USABLE_CHARS = 50
+MIN_TEXT_CHARS = 100
+
+
+def json_to_text(data, prefix=''):
+    """
+    Flatten a JSON document into "path: value" lines
+    """
+    lines = []
+    if isinstance(data, dict):
+        for key, value in data.items():
+            lines.extend(json_to_text(value, f"{prefix}{key} ").splitlines())
+    elif isinstance(data, list):
+        for value in data:
+            lines.extend(json_to_text(value, prefix).splitlines())
+    elif data not in (None, ''):
+        lines.append(f"{prefix.strip()}: {data}" if prefix else str(data))
+    return '\n'.join(lines)
+
+
+class TieredFetcher:
+    """
+    Plain-HTTP tier over one pooled keep-alive client, plus the per-carrier
+    tier memory and counters for the share of lookups each tier served
+    """
+    def __init__(self, enabled=HTTP_FETCH_ENABLED, reprobe_interval=HTTP_REPROBE_INTERVAL):
+        self.enabled = enabled
+        self.reprobe_interval = max(1, reprobe_interval)
+        self._client = None
+        self._lock = threading.Lock()
+        self._last_good = {}
+        self._since_probe = {}
+        self._served = {tier: 0 for tier in FETCH_TIERS}
+        self._stats = {'http_attempts': 0, 'http_errors': 0, 'escalations': 0, 'failures': 0, 'http_seconds': 0.0}
+
+    def first_tier(self, carrier_name):
+        """
+        Tier to try first for this carrier
+        """
+        if not self.enabled or not get_scrape_profile(carrier_name).http_fetch:
+            return TIER_BROWSER
+
+        carrier = (carrier_name or '').lower()
+        with self._lock:
+            if self._last_good.get(carrier, TIER_HTTP) == TIER_HTTP:
+                return TIER_HTTP
+            # Pinned to the browser, but re-check now and then in case the page changed
+            self._since_probe[carrier] = self._since_probe.get(carrier, 0) + 1
+            if self._since_probe[carrier] >= self.reprobe_interval:
+                self._since_probe[carrier] = 0
+                return TIER_HTTP
+        return TIER_BROWSER
+
+    async def fetch(self, tracking_url, carrier_name, tracking_number, user_agent=None):
+        """
+        Page text via plain HTTP, or '' when the request fails
+        """
+        profile = get_scrape_profile(carrier_name)
+        url = profile.api_url(tracking_number) or tracking_url
+        started = time.monotonic()
+        with self._lock:
+            self._stats['http_attempts'] += 1
+
+        try:
+            headers = {'User-Agent': user_agent} if user_agent else {}
+            async with self._get_client().stream('GET', url, headers=headers) as response:
+                if response.status_code == 429:
+                    RATE_LIMITED.inc(carrier=carrier_name, upstream='carrier')
+                if response.status_code >= 400:
+                    raise httpx.HTTPStatusError(f"HTTP {response.status_code}", request=response.request, response=response)
+
+                # Stop reading at the cap rather than downloading the whole page
+                content = bytearray()
+                async for chunk in response.aiter_bytes():
+                    content += chunk
+                    if len(content) >= HTTP_FETCH_MAX_BYTES:
+                        break
+
+            body = bytes(content[:HTTP_FETCH_MAX_BYTES]).decode(response.charset_encoding or 'utf-8', errors='replace')
+            if 'json' in response.headers.get('content-type', ''):
+                text = json_to_text(json.loads(body))
+            else:
+                text = html_to_text(body)
+            logger.info(f"⚡ HTTP tier fetched {len(text)} chars for {carrier_name} in {time.monotonic() - started:.2f}s")
+            return text
+
+        except Exception as e:
+            with self._lock:
+                self._stats['http_errors'] += 1
+            logger.info(f"HTTP tier failed for {carrier_name}: {e}")
+            return ''
+
+        finally:
+            elapsed = time.monotonic() - started
+            STAGE_SECONDS.observe(elapsed, stage='http_fetch', carrier=carrier_name)
+            with self._lock:
+                self._stats['http_seconds'] += elapsed
+
+    def record(self, carrier_name, tier, content, escalated=False):
+        """
+        Remember which tier produced usable content for this carrier
+        """
+        carrier = (carrier_name or '').lower()
+        usable = is_usable(content)
+        with self._lock:
+            if escalated:
+                self._stats['escalations'] += 1
+            if not usable:
+                self._stats['failures'] += 1
+                return
+            self._served[tier] += 1
+            FETCH_TIER_LOOKUPS.inc(carrier=carrier_name, tier=tier)
+            if self._last_good.get(carrier) != tier:
+                logger.info(f"🧭 {carrier_name} now starts at the {tier} tier")
+            self._last_good[carrier] = tier
+            if tier == TIER_HTTP:
+                self._since_probe[carrier] = 0
+
+    def stats(self):
+        with self._lock:
+            served_total = sum(self._served.values())
+            return {
+                'enabled': self.enabled,
+                'served': dict(self._served),
+                'share': {
+                    tier: round(count / served_total, 3) if served_total else 0.0
+                    for tier, count in self._served.items()
+                },
+                'last_good_tier': dict(self._last_good),
+                'http_attempts': self._stats['http_attempts'],
+                'http_errors': self._stats['http_errors'],
+                'escalations': self._stats['escalations'],
+                'failures': self._stats['failures'],
+                'http_average_seconds': round(self._stats['http_seconds'] / self._stats['http_attempts'], 3)
+                if self._stats['http_attempts'] else 0.0,
+            }
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _get_client(self):
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=HTTP_FETCH_TIMEOUT,
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=HTTP_FETCH_POOL_SIZE, max_keepalive_connections=HTTP_FETCH_POOL_SIZE),
+                headers={
+                    'Accept': 'text/html,application/xhtml+xml,application/json;q=0.9,*/*;q=0.8',
+                    'Accept-Language': 'en-US,en;q=0.9',
+                },
+            )
+        return self._client
+
+
+def is_usable(content):
+    """
+    Same thin-content check the browser path applies before analysis
+    """
+    return bool(content) and len(content.strip()) >= MIN_USABLE_CHARS
+
+
+_tiered_fetcher = TieredFetcher()
+
+
+def get_tiered_fetcher():
+    return _tiered_fetcher
@@ -2,19 +2,99 @@ import os
 import sys
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+# Sibling modules are imported by bare name, also when this file is loaded as src.main (flask --app)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from flask import Flask, send_from_directory
+import threading
+import click
+from flask import Flask, Response, send_from_directory
 from flask_cors import CORS
-from routes.tracking import tracking_bp
+from routes.tracking import lookup_order_tracking, tracking_bp
+from routes.webhooks import webhooks_bp
+from src.models.user import db
+from src.models.tracking_result import TrackingResult  # registers the cache table for create_all
+from src.models.tracking_job import TrackingJob  # registers the job table for create_all
+from src.models.order_index import IndexedOrder, OrderSyncState  # registers the order index tables for create_all
+from tracking_cache import get_tracking_cache
+from tracking_jobs import get_job_manager
+from circuit_breaker import circuit_breaker_stats
+from content_fingerprint import get_content_fingerprints
+from http_fetcher import get_tiered_fetcher
+from metrics import render_metrics
+from order_index import get_order_index
+from refresh_scheduler import get_refresh_scheduler
+from resource_blocking import get_resource_blocker
+from session_governor import get_session_governor
+from woocommerce_client import async_woocommerce_client_stats, get_woocommerce_client
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
 app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
 
+# Database (tracking result cache, background jobs and the order index live in app.db)
+app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv(
+    'DATABASE_URL',
+    f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
+)
+app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+db.init_app(app)
+
+# Bind only; nothing touches the database or starts a thread on import, so
+# CLI commands and tests get a quiet app. Servers call start_background_services()
+get_tracking_cache().init_app(app)
+get_job_manager().init_app(app, lookup_order_tracking)
+get_order_index().init_app(app, start_sync=False)
+
+_background_lock = threading.Lock()
+_background_started = False
+
+
+def create_tables():
+    with app.app_context():
+        db.create_all()
+
+
+def start_background_services():
+    """
+    Create tables, resume persisted tracking jobs and start the refresh
+    scheduler and the periodic order sync. Called once per serving process
+    by the entry points (wsgi.py, the asgi.py lifespan, python main.py)
+    """
+    global _background_started
+    with _background_lock:
+        if _background_started:
+            return
+        _background_started = True
+
+    create_tables()
+    get_job_manager().start()
+    get_refresh_scheduler().init_app(app)
+    get_order_index().start()
+
+
 # Enable CORS
 CORS(app)
 
-# Register tracking blueprint
+# Register tracking and webhook blueprints
 app.register_blueprint(tracking_bp, url_prefix='/api')
+app.register_blueprint(webhooks_bp, url_prefix='/api')
+
+@app.cli.command('sync-orders')
+@click.option('--max-pages', type=int, default=None, help='Stop after this many pages; the next run resumes')
+def sync_orders(max_pages):
+    """
+    Bulk sync WooCommerce orders into the local order index.
+
+    flask --app src/main.py sync-orders [--max-pages N]  (from the repo root)
+    """
+    order_index = get_order_index()
+    if not order_index.ready:
+        raise click.ClickException('Order index is disabled (ORDER_INDEX_ENABLED)')
+
+    create_tables()
+    synced = order_index.sync(max_pages=max_pages, wait=True)
+    if synced is None:
+        raise click.ClickException('Order sync skipped: another sync is running')
+    click.echo(f"Indexed {synced} orders")
 
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
@@ -34,9 +114,26 @@ def serve(path):
 
 @app.route('/health')
 def health():
-    return {'status': 'healthy', 'service': 'enhanced-customer-tracking'}
+    return {
+        'status': 'healthy',
+        'service': 'enhanced-customer-tracking',
+        'woocommerce_pool': get_woocommerce_client().pool_stats(),
+        'woocommerce_async_pool': async_woocommerce_client_stats(),
+        'resource_blocking': get_resource_blocker().stats(),
+        'fetch_tiers': get_tiered_fetcher().stats(),
+        'browser_sessions': get_session_governor().stats(),
+        'circuit_breakers': circuit_breaker_stats(),
+        'content_fingerprints': get_content_fingerprints().stats(),
+        'refresh_scheduler': get_refresh_scheduler().stats(),
+        'order_index': get_order_index().stats()
+    }
+
+@app.route('/metrics')
+def metrics():
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
 
 if __name__ == '__main__':
+    start_background_services()
     port = int(os.environ.get('PORT', 8080))
     app.run(host='0.0.0.0', port=port, debug=False)
 
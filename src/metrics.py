@@ -0,0 +1,202 @@
+"""
+Prometheus-style metrics
+Lock-protected in-process counters and histograms for every tracking stage,
+rendered in the Prometheus text exposition format on /metrics
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Latency buckets in seconds, from cache reads up to full browser loads
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """
+    Monotonic counter with optional labels
+    """
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            return self._values.get(key, 0)
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram with optional labels
+    """
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self):
+        with self._lock:
+            values = sorted((key, (list(series[0]), series[1], series[2])) for key, series in self._values.items())
+        for key, (counts, total, count) in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(float(bound)) if bound != float("inf") else "+Inf"}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, key)} {count}"
+
+
+class MetricsRegistry:
+    """
+    Named collection of metrics rendered together
+    """
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        """
+        All metrics in the Prometheus text exposition format (version 0.0.4)
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+    def _register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+
+REGISTRY = MetricsRegistry()
+
+# Per-stage latency: woocommerce_lookup, session_wait, browser_connect, context_create,
+# http_fetch, page_goto, readiness_wait, text_extraction, llm_call
+STAGE_SECONDS = REGISTRY.histogram(
+    'tracking_stage_duration_seconds', 'Duration of each tracking pipeline stage', ('stage', 'carrier')
+)
+LOOKUPS = REGISTRY.counter(
+    'tracking_lookups_total', 'Tracking lookups by result source', ('carrier', 'extraction_method')
+)
+CACHE_REQUESTS = REGISTRY.counter(
+    'tracking_cache_requests_total', 'Cache lookups by cache and result', ('cache', 'result')
+)
+RETRIES = REGISTRY.counter(
+    'tracking_retries_total', 'Retried calls by carrier and stage', ('carrier', 'stage')
+)
+RATE_LIMITED = REGISTRY.counter(
+    'tracking_rate_limited_total', 'HTTP 429 responses by carrier and upstream', ('carrier', 'upstream')
+)
+FALLBACKS = REGISTRY.counter(
+    'tracking_fallbacks_total', 'Fallback responses returned instead of tracking data', ('carrier', 'reason')
+)
+FETCH_TIER_LOOKUPS = REGISTRY.counter(
+    'tracking_fetch_tier_total', 'Lookups served per fetch tier', ('carrier', 'tier')
+)
+BLOCKED_REQUESTS = REGISTRY.counter(
+    'tracking_blocked_requests_total', 'Browser requests aborted by resource blocking', ('reason',)
+)
+# Coalescing rate = follower / (leader + follower) per scope (order, tracking)
+COALESCED_REQUESTS = REGISTRY.counter(
+    'tracking_single_flight_total', 'Lookups by single-flight role; followers joined an identical in-flight lookup',
+    ('scope', 'role')
+)
+SESSION_ADMISSIONS = REGISTRY.counter(
+    'tracking_browser_session_admissions_total', 'Browser session admission decisions by priority', ('priority', 'outcome')
+)
+# event is a state entered (open, half_open, closed) or short_circuited for a call failed fast
+CIRCUIT_EVENTS = REGISTRY.counter(
+    'tracking_circuit_breaker_events_total', 'Circuit breaker transitions and short-circuited calls', ('dependency', 'event')
+)
+# Hit rate = reused / (reused + changed + no_previous); each reuse is an LLM call skipped
+CONTENT_FINGERPRINTS = REGISTRY.counter(
+    'tracking_content_fingerprint_total', 'AI analyses checked against the previous page fingerprint', ('carrier', 'result')
+)
+REFRESHES = REGISTRY.counter(
+    'tracking_background_refreshes_total', 'Background shipment refreshes by outcome', ('carrier', 'outcome')
+)
+LLM_REQUESTS = REGISTRY.counter(
+    'tracking_llm_requests_total', 'OpenAI chat completion calls by outcome', ('carrier', 'model', 'outcome')
+)
+LLM_TOKENS = REGISTRY.counter(
+    'tracking_llm_tokens_total', 'OpenAI tokens used, from the response usage', ('carrier', 'model', 'kind')
+)
+
+
+def render_metrics():
+    """
+    Text for the /metrics endpoint
+    """
+    return REGISTRY.render()
@@ -0,0 +1,52 @@
+import json
+from src.models.user import db
+
+class IndexedOrder(db.Model):
+    __tablename__ = 'order_index'
+
+    id = db.Column(db.Integer, primary_key=True)  # WooCommerce order ID
+    number = db.Column(db.String(80), nullable=False, index=True)
+    status = db.Column(db.String(40))
+    date_created = db.Column(db.String(32))
+    date_modified = db.Column(db.String(32))
+    date_modified_gmt = db.Column(db.String(32))
+    tracking_items = db.Column(db.Text, nullable=False, default='[]')  # parsed, first item wins
+    indexed_at = db.Column(db.Float, nullable=False)
+
+    def __repr__(self):
+        return f'<IndexedOrder {self.id} #{self.number} {self.status}>'
+
+    def to_order(self):
+        """
+        Slim order in the shape track_order reads, tracking meta already parsed
+        """
+        return {
+            'id': self.id,
+            'number': self.number,
+            'status': self.status,
+            'date_created': self.date_created,
+            'date_modified': self.date_modified,
+            'meta_data': [{'key': '_wc_shipment_tracking_items', 'value': json.loads(self.tracking_items)}]
+        }
+
+class OrderSyncState(db.Model):
+    __tablename__ = 'order_sync_state'
+
+    name = db.Column(db.String(40), primary_key=True)
+    modified_after = db.Column(db.String(32))  # GMT cursor of the bulk sync
+    page = db.Column(db.Integer, nullable=False, default=1)
+    orders_synced = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.Float)
+    last_completed_at = db.Column(db.Float)
+
+    def __repr__(self):
+        return f'<OrderSyncState {self.name} {self.modified_after} page {self.page}>'
+
+    def to_dict(self):
+        return {
+            'modified_after': self.modified_after,
+            'page': self.page,
+            'orders_synced': self.orders_synced,
+            'updated_at': self.updated_at,
+            'last_completed_at': self.last_completed_at
+        }
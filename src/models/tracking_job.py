@@ -0,0 +1,31 @@
+import json
+from src.models.user import db
+
+class TrackingJob(db.Model):
+    __tablename__ = 'tracking_job'
+
+    id = db.Column(db.String(32), primary_key=True)
+    order_number = db.Column(db.String(80), nullable=False)
+    state = db.Column(db.String(20), nullable=False, index=True)
+    stage = db.Column(db.String(40))
+    result = db.Column(db.Text)
+    error = db.Column(db.String(500))
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.Float, nullable=False)
+    updated_at = db.Column(db.Float, nullable=False)
+
+    def __repr__(self):
+        return f'<TrackingJob {self.id} {self.state}>'
+
+    def to_dict(self):
+        return {
+            'job_id': self.id,
+            'order_number': self.order_number,
+            'state': self.state,
+            'stage': self.stage,
+            'result': json.loads(self.result) if self.result else None,
+            'error': self.error,
+            'attempts': self.attempts,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at
+        }
@@ -0,0 +1,21 @@
+import json
+from src.models.user import db
+
+class TrackingResult(db.Model):
+    __tablename__ = 'tracking_result'
+
+    id = db.Column(db.Integer, primary_key=True)
+    cache_key = db.Column(db.String(160), unique=True, nullable=False, index=True)
+    carrier = db.Column(db.String(40), nullable=False)
+    tracking_number = db.Column(db.String(80), nullable=False)
+    tracking_url = db.Column(db.String(512))
+    status = db.Column(db.String(80))
+    result = db.Column(db.Text, nullable=False)
+    fetched_at = db.Column(db.Float, nullable=False)
+    expires_at = db.Column(db.Float, nullable=True)  # NULL never expires
+
+    def __repr__(self):
+        return f'<TrackingResult {self.cache_key} {self.status}>'
+
+    def to_dict(self):
+        return json.loads(self.result)
@@ -0,0 +1,353 @@
+"""
+Local WooCommerce order index
+Order number/ID -> status, dates and parsed tracking items in app.db, filled
+by a resumable bulk sync over /orders?modified_after= and kept current by the
+order webhooks, so track_order resolves orders with one indexed read
+"""
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from woocommerce_client import get_woocommerce_client
+
+logger = logging.getLogger(__name__)
+
+# Sync configuration
+ORDER_INDEX_ENABLED = os.getenv('ORDER_INDEX_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+ORDER_SYNC_INTERVAL = int(os.getenv('ORDER_SYNC_INTERVAL', '900'))  # seconds, 0 disables the periodic sync
+ORDER_SYNC_PAGE_SIZE = 100  # API maximum per_page
+# Pages per periodic run; a large backfill resumes where the last run stopped
+ORDER_SYNC_MAX_PAGES = int(os.getenv('ORDER_SYNC_MAX_PAGES', '20'))
+ORDER_SYNC_FIELDS = 'id,number,status,date_created,date_modified,date_modified_gmt,meta_data'
+SYNC_STATE_NAME = 'orders'
+
+WC_DATE_FORMAT = '%Y-%m-%dT%H:%M:%S'
+
+
+def parse_tracking_items(order):
+    """
+    Tracking items of an order, WooCommerce Shipment Tracking first and the
+    RouteApp tracking number (no provider) as a backup
+    """
+    items = []
+    meta_data = order.get('meta_data', [])
+    for meta in meta_data:
+        if meta.get('key', '') != '_wc_shipment_tracking_items':
+            continue
+        value = meta.get('value', [])
+        # Handle both string (JSON) and list formats
+        if isinstance(value, str):
+            try:
+                value = json.loads(value)
+            except json.JSONDecodeError as e:
+                logger.warning(f"Error parsing WC tracking data: {e}")
+                continue
+        if not isinstance(value, list):
+            continue
+        for item in value:
+            if not isinstance(item, dict):
+                continue
+            tracking_number = str(item.get('tracking_number') or '').strip()
+            if tracking_number:
+                items.append({
+                    'tracking_number': tracking_number,
+                    'tracking_provider': str(item.get('tracking_provider') or '').strip()
+                })
+
+    if not items:
+        for meta in meta_data:
+            if 'routeapp_shipment_tracking_number' in meta.get('key', '').lower():
+                value = str(meta.get('value') or '').strip()
+                if len(value) > 5:
+                    items.append({'tracking_number': value, 'tracking_provider': ''})
+                    break
+
+    return items
+
+
+def _step_back(timestamp):
+    """
+    One second before a WooCommerce GMT timestamp, so orders sharing the last
+    timestamp of a page are read again instead of skipped
+    """
+    try:
+        return (datetime.strptime(timestamp[:19], WC_DATE_FORMAT) - timedelta(seconds=1)).strftime(WC_DATE_FORMAT)
+    except (TypeError, ValueError):
+        return timestamp
+
+
+class LocalOrderIndex:
+    """
+    Order lookups against the order_index table.
+
+    Writes keep the newest version of an order by date_modified_gmt, so a
+    late webhook or an overlapping sync page never rolls an order back.
+    Without init_app() every read misses and track_order goes to the API.
+    """
+    def __init__(self, enabled=ORDER_INDEX_ENABLED, sync_interval=ORDER_SYNC_INTERVAL):
+        self.enabled = enabled
+        self.sync_interval = sync_interval
+        self._app = None
+        self._db = None
+        self._model = None
+        self._state_model = None
+        self._sync_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._stats_lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'upserts': 0, 'webhooks': 0, 'errors': 0}
+
+    def init_app(self, app, start_sync=True):
+        from src.models.order_index import IndexedOrder, OrderSyncState, db
+        if not self.enabled:
+            logger.info("⏸️ Local order index disabled")
+            return
+
+        self._app = app
+        self._db = db
+        self._model = IndexedOrder
+        self._state_model = OrderSyncState
+
+        if start_sync:
+            self.start()
+
+    def start(self):
+        """
+        Start the periodic sync thread
+        """
+        if not self.ready or self.sync_interval <= 0 or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._sync_forever, name='order-sync', daemon=True)
+        self._thread.start()
+
+    @property
+    def ready(self):
+        return self._app is not None
+
+    def get(self, order_number):
+        """
+        Indexed slim order by order number or ID, or None on a miss
+        """
+        return self.get_many([order_number]).get(str(order_number).strip())
+
+    def get_many(self, order_numbers):
+        """
+        {order_number: slim order} for the orders in the index, in one query
+        """
+        if not self.ready or not order_numbers:
+            return {}
+
+        numbers = [str(number).strip() for number in order_numbers]
+        ids = [int(number) for number in numbers if number.isdigit()]
+        try:
+            with self._app.app_context():
+                condition = self._model.number.in_(numbers)
+                if ids:
+                    condition = condition | self._model.id.in_(ids)
+                rows = self._model.query.filter(condition).all()
+                by_number = {row.number: row.to_order() for row in rows}
+                by_id = {str(row.id): row.to_order() for row in rows}
+        except Exception as e:
+            self._count('errors')
+            logger.warning(f"⚠️ Order index read error: {e}")
+            return {}
+
+        # Same precedence as the API lookup: an exact order number beats an ID
+        found = {}
+        for number in numbers:
+            order = by_number.get(number) or by_id.get(number)
+            if order is not None:
+                found[number] = order
+        self._count('hits', len(found))
+        self._count('misses', len(numbers) - len(found))
+        return found
+
+    def upsert(self, orders):
+        """
+        Index WooCommerce orders (full or slim API dicts); returns how many were written
+        """
+        if not self.ready:
+            return 0
+
+        written = 0
+        with self._app.app_context():
+            for order in orders:
+                try:
+                    written += self._upsert_one(order)
+                    self._db.session.commit()
+                except Exception as e:
+                    self._db.session.rollback()
+                    self._count('errors')
+                    logger.warning(f"⚠️ Order index write error for order {order.get('id')}: {e}")
+        self._count('upserts', written)
+        return written
+
+    def _upsert_one(self, order):
+        order_id = order.get('id')
+        if not order_id:
+            return 0
+
+        row = self._db.session.get(self._model, int(order_id))
+        modified_gmt = order.get('date_modified_gmt')
+        if row is not None and row.date_modified_gmt and modified_gmt and modified_gmt < row.date_modified_gmt:
+            return 0
+        if row is None:
+            row = self._model(id=int(order_id))
+            self._db.session.add(row)
+
+        row.number = str(order.get('number') or order_id)
+        row.status = order.get('status')
+        row.date_created = order.get('date_created')
+        row.date_modified = order.get('date_modified')
+        row.date_modified_gmt = modified_gmt or row.date_modified_gmt
+        row.tracking_items = json.dumps(parse_tracking_items(order))
+        row.indexed_at = time.time()
+        return 1
+
+    def delete(self, order_id):
+        if not self.ready:
+            return
+        try:
+            with self._app.app_context():
+                self._model.query.filter_by(id=int(order_id)).delete()
+                self._db.session.commit()
+        except Exception as e:
+            self._count('errors')
+            logger.warning(f"⚠️ Order index delete error for order {order_id}: {e}")
+
+    def handle_webhook(self, topic, order):
+        """
+        Apply an order.created / order.updated / order.deleted (or restored) webhook
+        """
+        self._count('webhooks')
+        if topic == 'order.deleted':
+            self.delete(order.get('id'))
+            return
+        self.upsert([order])
+
+    def sync(self, max_pages=None, wait=False):
+        """
+        Page through orders modified since the stored cursor, oldest first.
+
+        The cursor and page are saved after every page, so an interrupted or
+        page-limited run picks up where it stopped. Returns the number of
+        orders indexed, or None when another sync in this process is running
+        and wait is False.
+        """
+        if not self.ready:
+            return 0
+        if not self._sync_lock.acquire(blocking=wait):
+            logger.info("Order sync already running")
+            return None
+
+        try:
+            return self._sync(max_pages)
+        finally:
+            self._sync_lock.release()
+
+    def _sync(self, max_pages):
+        client = get_woocommerce_client()
+        state = self._load_state()
+        cursor, page = state['modified_after'], state['page']
+        synced = pages = 0
+        started = time.monotonic()
+
+        while max_pages is None or pages < max_pages:
+            params = {
+                'per_page': ORDER_SYNC_PAGE_SIZE,
+                'page': page,
+                'orderby': 'modified',
+                'order': 'asc',
+                'status': 'any',
+                'dates_are_gmt': 'true',
+                '_fields': ORDER_SYNC_FIELDS
+            }
+            if cursor:
+                params['modified_after'] = cursor
+
+            response = client.get('orders', params=params)
+            if response.status_code != 200:
+                logger.warning(f"WooCommerce order sync returned {response.status_code}")
+                break
+
+            orders = response.json()
+            written = self.upsert(orders)
+            synced += written
+            pages += 1
+
+            if len(orders) < ORDER_SYNC_PAGE_SIZE:
+                # Caught up; the next run starts from the newest order seen
+                if orders:
+                    cursor = _step_back(orders[-1].get('date_modified_gmt')) or cursor
+                self._save_state(cursor, 1, written, completed=True)
+                logger.info(f"🗂️ Order sync caught up: {synced} orders in {time.monotonic() - started:.1f}s")
+                return synced
+
+            next_cursor = _step_back(orders[-1].get('date_modified_gmt'))
+            if next_cursor and next_cursor != cursor:
+                cursor, page = next_cursor, 1
+            else:
+                # A full page inside one second: page through it under the same cursor
+                page += 1
+            self._save_state(cursor, page, written)
+
+        logger.info(f"🗂️ Order sync paused after {pages} pages ({synced} orders), resuming at {cursor} page {page}")
+        return synced
+
+    def _load_state(self):
+        with self._app.app_context():
+            state = self._db.session.get(self._state_model, SYNC_STATE_NAME)
+            if state is None:
+                return {'modified_after': None, 'page': 1}
+            return state.to_dict()
+
+    def _save_state(self, cursor, page, written, completed=False):
+        with self._app.app_context():
+            state = self._db.session.get(self._state_model, SYNC_STATE_NAME)
+            if state is None:
+                state = self._state_model(name=SYNC_STATE_NAME, orders_synced=0)
+                self._db.session.add(state)
+            state.modified_after = cursor
+            state.page = page
+            state.orders_synced = (state.orders_synced or 0) + written
+            state.updated_at = time.time()
+            if completed:
+                state.last_completed_at = state.updated_at
+            self._db.session.commit()
+
+    def _sync_forever(self):
+        while not self._stop.is_set():
+            try:
+                self.sync(max_pages=ORDER_SYNC_MAX_PAGES)
+            except Exception as e:
+                self._count('errors')
+                logger.error(f"Order sync error: {e}")
+            self._stop.wait(self.sync_interval)
+
+    def stop(self):
+        self._stop.set()
+
+    def _count(self, name, amount=1):
+        with self._stats_lock:
+            self._stats[name] += amount
+
+    def stats(self):
+        with self._stats_lock:
+            stats = {'enabled': self.enabled, 'ready': self.ready, **self._stats}
+        if self.ready:
+            try:
+                with self._app.app_context():
+                    stats['orders'] = self._model.query.count()
+                stats['sync'] = self._load_state()
+            except Exception as e:
+                logger.warning(f"⚠️ Order index stats error: {e}")
+        return stats
+
+
+_order_index = LocalOrderIndex()
+
+
+def get_order_index():
+    return _order_index
@@ -0,0 +1,114 @@
+"""
+Event-driven page readiness
+Races several "tracking content is on the page" conditions under one overall
+deadline and returns as soon as the first one is satisfied
+"""
+import asyncio
+import logging
+import os
+import time
+from carrier_profiles import get_scrape_profile
+
+logger = logging.getLogger(__name__)
+
+# Readiness configuration
+PAGE_READY_DEADLINE = float(os.getenv('PAGE_READY_DEADLINE', '20'))  # seconds for all conditions together
+PAGE_READY_MIN_CHARS = int(os.getenv('PAGE_READY_MIN_CHARS', '300'))
+PAGE_READY_QUIET_MS = int(os.getenv('PAGE_READY_QUIET_MS', '500'))
+
+# Resolves with the text length once the body holds enough text and DOM
+# mutations have been quiet for a moment, or with 0 when it gives up
+CONTENT_THRESHOLD_OBSERVER = '''
+({ minChars, quietMs, timeoutMs }) => new Promise((resolve) => {
+    let quietTimer = null;
+    const textLength = () => (document.body ? (document.body.innerText || '').length : 0);
+    const finish = (value) => {
+        observer.disconnect();
+        clearTimeout(quietTimer);
+        clearTimeout(giveUpTimer);
+        resolve(value);
+    };
+    const check = () => {
+        if (textLength() < minChars) return;
+        clearTimeout(quietTimer);
+        quietTimer = setTimeout(() => finish(textLength()), quietMs);
+    };
+    const observer = new MutationObserver(check);
+    observer.observe(document.documentElement, { childList: true, subtree: true, characterData: true });
+    const giveUpTimer = setTimeout(() => finish(0), timeoutMs);
+    check();
+})
+'''
+
+async def wait_for_page_ready(page, carrier_name, deadline=PAGE_READY_DEADLINE):
+    """
+    Run every readiness condition at once and return on the first one satisfied.
+
+    Returns a report with the winning condition, total elapsed seconds and
+    per-condition satisfaction times (None for conditions that were not met).
+    """
+    started = time.monotonic()
+    timeout_ms = int(deadline * 1000)
+    profile = get_scrape_profile(carrier_name)
+
+    async def selector_ready():
+        await page.wait_for_selector(profile.ready_selector, state='visible', timeout=timeout_ms)
+        return True
+
+    async def content_threshold():
+        length = await page.evaluate(CONTENT_THRESHOLD_OBSERVER, {
+            'minChars': PAGE_READY_MIN_CHARS,
+            'quietMs': PAGE_READY_QUIET_MS,
+            'timeoutMs': timeout_ms,
+        })
+        return length > 0
+
+    async def carrier_rendered():
+        await page.wait_for_function(profile.ready_predicate, polling='mutation', timeout=timeout_ms)
+        return True
+
+    tasks = {
+        asyncio.create_task(content_threshold()): 'content_threshold',
+        asyncio.create_task(carrier_rendered()): 'carrier_predicate',
+    }
+    # Unknown carriers have no selector of their own; their predicate checks
+    # the generic selectors for status text instead
+    if profile.ready_selector:
+        tasks[asyncio.create_task(selector_ready())] = 'selector'
+    report = {
+        'ready': False,
+        'condition': None,
+        'elapsed': 0.0,
+        'conditions': {name: None for name in tasks.values()},
+    }
+
+    pending = set(tasks)
+    try:
+        while pending:
+            remaining = deadline - (time.monotonic() - started)
+            if remaining <= 0:
+                break
+
+            done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.cancelled() or task.exception() is not None or not task.result():
+                    continue
+                name = tasks[task]
+                report['conditions'][name] = round(time.monotonic() - started, 3)
+                if not report['ready']:
+                    report['ready'] = True
+                    report['condition'] = name
+
+            if report['ready']:
+                break
+    finally:
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    report['elapsed'] = round(time.monotonic() - started, 3)
+    if report['ready']:
+        logger.info(f"✅ Page ready via {report['condition']} in {report['elapsed']}s")
+    else:
+        logger.warning(f"⏰ Page readiness deadline reached after {report['elapsed']}s")
+    return report
@@ -0,0 +1,151 @@
+"""
+Page text extraction
+A single-pass, read-only in-page text walker scoped to the carrier's content
+root, and an incremental HTMLParser-based converter for raw HTML
+"""
+import os
+from html.parser import HTMLParser
+
+# Upper bound on the text handed back from a page
+PAGE_TEXT_MAX_CHARS = int(os.getenv('PAGE_TEXT_MAX_CHARS', '100000'))
+
+# Scoped text shorter than this is retried over the whole body
+MIN_SCOPED_CHARS = 100
+
+SKIPPED_TAGS = {'script', 'style', 'noscript', 'template', 'svg', 'iframe', 'head'}
+BLOCK_TAGS = {
+    'address', 'article', 'aside', 'blockquote', 'br', 'dd', 'div', 'dl', 'dt', 'footer', 'form',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'hr', 'li', 'main', 'nav', 'ol', 'p', 'section',
+    'table', 'tbody', 'td', 'th', 'thead', 'tr', 'ul',
+}
+
+# One TreeWalker pass over the content root (or body), never touching the DOM.
+# Text is split into lines at block elements and deduplicated with a Set.
+PAGE_TEXT_SCRIPT = '''
+({ rootSelector, maxChars, minScopedChars, skipTags, blockTags }) => {
+    const SKIP = new Set(skipTags.map(tag => tag.toUpperCase()));
+    const BLOCK = new Set(blockTags.map(tag => tag.toUpperCase()));
+
+    const walk = (targets) => {
+        const seen = new Set();
+        const lines = [];
+        let total = 0;
+        let current = [];
+        const flush = () => {
+            const line = current.join(' ').replace(/\\s+/g, ' ').trim();
+            current = [];
+            if (line.length > 2 && !seen.has(line)) {
+                seen.add(line);
+                lines.push(line);
+                total += line.length + 1;
+            }
+        };
+        for (const target of targets) {
+            const walker = document.createTreeWalker(target, NodeFilter.SHOW_ELEMENT | NodeFilter.SHOW_TEXT, {
+                acceptNode: (node) => node.nodeType === Node.ELEMENT_NODE
+                    && (SKIP.has(node.tagName) || node.hidden || node.getAttribute('aria-hidden') === 'true')
+                    ? NodeFilter.FILTER_REJECT
+                    : NodeFilter.FILTER_ACCEPT,
+            });
+            let node;
+            while (total < maxChars && (node = walker.nextNode())) {
+                if (node.nodeType === Node.TEXT_NODE) {
+                    current.push(node.nodeValue);
+                } else if (BLOCK.has(node.tagName)) {
+                    flush();
+                }
+            }
+            flush();
+        }
+        return lines.join('\\n').slice(0, maxChars);
+    };
+
+    const body = document.body;
+    if (!body) return { text: '', scoped: false };
+
+    if (rootSelector) {
+        const roots = Array.from(document.querySelectorAll(rootSelector));
+        const outermost = roots.filter(root => !roots.some(other => other !== root && other.contains(root)));
+        if (outermost.length) {
+            const text = walk(outermost);
+            if (text.length >= minScopedChars) return { text, scoped: true };
+        }
+    }
+    return { text: walk([body]), scoped: false };
+}
+'''
+
+
+def page_text_arguments(content_root, max_chars=PAGE_TEXT_MAX_CHARS):
+    """
+    Argument object for PAGE_TEXT_SCRIPT
+    """
+    return {
+        'rootSelector': content_root,
+        'maxChars': max_chars,
+        'minScopedChars': MIN_SCOPED_CHARS,
+        'skipTags': sorted(SKIPPED_TAGS),
+        'blockTags': sorted(BLOCK_TAGS),
+    }
+
+
+# Raw HTML is fed to the parser in slices this big, so it can stop early at max_chars
+HTML_FEED_CHUNK = 64 * 1024
+
+
+class _TextExtractor(HTMLParser):
+    """
+    Incremental HTML-to-text parser: skips invisible elements, breaks lines
+    at block elements and drops repeated lines
+    """
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.lines = []
+        self.total = 0
+        self._seen = set()
+        self._current = []
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIPPED_TAGS:
+            self._skip_depth += 1
+        elif tag in BLOCK_TAGS:
+            self._break()
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag in BLOCK_TAGS:
+            self._break()
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self._current.append(data)
+
+    def close(self):
+        super().close()
+        self._break()
+
+    def _break(self):
+        line = ' '.join(''.join(self._current).split())
+        self._current = []
+        if len(line) <= 2 or line in self._seen:
+            return
+        self._seen.add(line)
+        self.lines.append(line)
+        self.total += len(line) + 1
+
+
+def html_to_text(html, max_chars=PAGE_TEXT_MAX_CHARS):
+    """
+    Visible text of an HTML document, one line per block element, stopping
+    once max_chars of text has been collected
+    """
+    html = html or ''
+    parser = _TextExtractor()
+    for start in range(0, len(html), HTML_FEED_CHUNK):
+        parser.feed(html[start:start + HTML_FEED_CHUNK])
+        if parser.total >= max_chars:
+            break
+    parser.close()
+    return '\n'.join(parser.lines)[:max_chars]
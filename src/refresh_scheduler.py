@@ -0,0 +1,256 @@
+"""
+Background refresh of in-flight shipments
+Keeps non-terminal shipments in a priority queue ordered by when their status
+is next expected to change and re-scrapes them ahead of cache expiry, so
+customer lookups are served from precomputed results
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+from metrics import REFRESHES
+from scraper_runtime import get_runtime
+from tracking_cache import TrackingResultCache, is_fallback_result, ttl_for_result
+
+logger = logging.getLogger(__name__)
+
+# Scheduler configuration
+REFRESH_SCHEDULER_ENABLED = os.getenv('REFRESH_SCHEDULER_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+REFRESH_CONCURRENCY = int(os.getenv('REFRESH_CONCURRENCY', '2'))
+REFRESH_RATE_PER_MINUTE = float(os.getenv('REFRESH_RATE_PER_MINUTE', '20'))
+REFRESH_MAX_SHIPMENTS = int(os.getenv('REFRESH_MAX_SHIPMENTS', '5000'))
+# Refresh once this share of the status TTL has passed, so the cached result never expires
+REFRESH_LEAD_FRACTION = float(os.getenv('REFRESH_LEAD_FRACTION', '0.8'))
+REFRESH_MIN_INTERVAL = int(os.getenv('REFRESH_MIN_INTERVAL', '300'))  # seconds
+# Failed refreshes back off exponentially from REFRESH_MIN_INTERVAL
+REFRESH_MAX_BACKOFF = int(os.getenv('REFRESH_MAX_BACKOFF', '21600'))  # seconds
+REFRESH_MAX_FAILURES = int(os.getenv('REFRESH_MAX_FAILURES', '5'))
+REFRESH_IDLE_WAIT = 60  # seconds
+
+
+def refresh_interval(result, failures=0):
+    """
+    Seconds until a shipment should be looked at again, None once it is terminal.
+
+    Follows the status TTLs of the result cache: out-for-delivery comes round
+    every few minutes, label-created every few hours, delivered never.
+    """
+    if failures:
+        return min(REFRESH_MIN_INTERVAL * 2 ** (failures - 1), REFRESH_MAX_BACKOFF)
+    ttl = ttl_for_result(result)
+    if ttl is None:
+        return None
+    return max(REFRESH_MIN_INTERVAL, ttl * REFRESH_LEAD_FRACTION)
+
+
+class _Shipment:
+    def __init__(self, tracking_url, carrier_name, tracking_number):
+        self.tracking_url = tracking_url
+        self.carrier_name = carrier_name
+        self.tracking_number = tracking_number
+        self.status = None
+        self.due = None
+        self.failures = 0
+
+
+class RefreshScheduler:
+    """
+    Min-heap of (due time, shipment) drained by a task on the scraper runtime.
+
+    Every finished lookup, customer or background, reports its result with
+    track(), which reschedules the shipment or drops it once it reaches a
+    terminal status. Refreshes run through EnhancedStealthScraper with at
+    most `concurrency` in flight and at most `rate_per_minute` started.
+    """
+    def __init__(self, enabled=REFRESH_SCHEDULER_ENABLED, concurrency=REFRESH_CONCURRENCY,
+                 rate_per_minute=REFRESH_RATE_PER_MINUTE, max_shipments=REFRESH_MAX_SHIPMENTS):
+        self.enabled = enabled
+        self.concurrency = max(1, concurrency)
+        self.rate_per_minute = max(0.1, rate_per_minute)
+        self.max_shipments = max_shipments
+        self._heap = []
+        self._shipments = {}
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._loop = None
+        self._wake = None
+        self._running = 0
+        self._stats = {'refreshed': 0, 'changed': 0, 'failed': 0, 'deferred': 0, 'completed': 0, 'dropped': 0}
+
+    @property
+    def started(self):
+        return self._loop is not None
+
+    def init_app(self, app):
+        """
+        Start the scheduler and queue the non-terminal shipments already in app.db
+        """
+        from src.models.tracking_result import TrackingResult
+        if not self.enabled:
+            logger.info("⏸️ Refresh scheduler disabled")
+            return
+
+        self.start()
+        try:
+            with app.app_context():
+                rows = (
+                    TrackingResult.query
+                    .filter(TrackingResult.expires_at.isnot(None), TrackingResult.tracking_url.isnot(None))
+                    .order_by(TrackingResult.fetched_at.desc())
+                    .limit(self.max_shipments)
+                    .all()
+                )
+                seeds = [(row.tracking_url, row.carrier, row.tracking_number, row.to_dict(), row.fetched_at) for row in rows]
+        except Exception as e:
+            logger.warning(f"⚠️ Refresh scheduler seed error: {e}")
+            return
+
+        for seed in seeds:
+            self.track(*seed)
+        logger.info(f"🗓️ Refresh scheduler seeded with {len(self._shipments)} shipments")
+
+    def start(self):
+        if self.started:
+            return
+        self._wake = asyncio.Event()
+        self._loop = get_runtime().start()
+        get_runtime().submit(self._run())
+
+    def track(self, tracking_url, carrier_name, tracking_number, result, fetched_at=None):
+        """
+        Schedule the next refresh from a lookup result, or drop the shipment
+        once it is terminal or keeps failing
+        """
+        if not self.started or not tracking_url:
+            return
+
+        key = TrackingResultCache.make_key(carrier_name, tracking_number)
+        failed = is_fallback_result(result)
+        with self._lock:
+            shipment = self._shipments.get(key)
+            if shipment is None:
+                if failed or ttl_for_result(result) is None or len(self._shipments) >= self.max_shipments:
+                    return
+                shipment = self._shipments[key] = _Shipment(tracking_url, carrier_name, tracking_number)
+
+            # Not attempted (overload, open circuit): retry later without counting a failure
+            if result.get('degraded'):
+                interval = REFRESH_MIN_INTERVAL
+            else:
+                shipment.failures = shipment.failures + 1 if failed else 0
+                interval = refresh_interval(result, shipment.failures)
+            if interval is None or shipment.failures >= REFRESH_MAX_FAILURES:
+                del self._shipments[key]
+                self._stats['completed' if interval is None else 'dropped'] += 1
+                return
+
+            if not failed:
+                shipment.status = result.get('status')
+            shipment.tracking_url = tracking_url
+            shipment.due = (fetched_at or time.time()) + interval
+            heapq.heappush(self._heap, (shipment.due, next(self._sequence), key))
+
+        self._loop.call_soon_threadsafe(self._wake.set)
+
+    def stats(self):
+        with self._lock:
+            by_status = {}
+            for shipment in self._shipments.values():
+                by_status[shipment.status] = by_status.get(shipment.status, 0) + 1
+            next_due = min((shipment.due for shipment in self._shipments.values() if shipment.due), default=None)
+            return {
+                'enabled': self.enabled,
+                'started': self.started,
+                'queued': len(self._shipments),
+                'running': self._running,
+                'by_status': by_status,
+                'next_due_in': round(max(0.0, next_due - time.time()), 1) if next_due else None,
+                **self._stats,
+            }
+
+    def _next_due(self):
+        """
+        The next due shipment and 0, or None and the seconds until one is due
+        """
+        now = time.time()
+        with self._lock:
+            while self._heap:
+                due, _, key = self._heap[0]
+                shipment = self._shipments.get(key)
+                if shipment is None or shipment.due != due:
+                    # Superseded by a later track() call or dropped
+                    heapq.heappop(self._heap)
+                    continue
+                if due > now:
+                    return None, due - now
+                heapq.heappop(self._heap)
+                shipment.due = None
+                return shipment, 0
+        return None, REFRESH_IDLE_WAIT
+
+    async def _run(self):
+        semaphore = asyncio.Semaphore(self.concurrency)
+        spacing = 60 / self.rate_per_minute
+        next_start = 0.0
+        logger.info(f"🗓️ Refresh scheduler running ({self.concurrency} concurrent, {self.rate_per_minute:g}/min)")
+
+        while True:
+            self._wake.clear()
+            shipment, delay = self._next_due()
+            if shipment is None:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), min(delay, REFRESH_IDLE_WAIT))
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await semaphore.acquire()
+            wait = next_start - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            next_start = time.monotonic() + spacing
+
+            task = asyncio.ensure_future(self._refresh(shipment))
+            task.add_done_callback(lambda _: semaphore.release())
+
+    async def _refresh(self, shipment):
+        from enhanced_stealth_scraper import get_scraper
+        previous = shipment.status
+        with self._lock:
+            self._running += 1
+        try:
+            result = await get_scraper().refresh_tracking_status(
+                shipment.tracking_url, shipment.carrier_name, shipment.tracking_number
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Refresh failed for {shipment.carrier_name} package {shipment.tracking_number}: {e}")
+            result = {'extraction_method': 'browserless_error'}
+            self.track(shipment.tracking_url, shipment.carrier_name, shipment.tracking_number, result)
+        finally:
+            with self._lock:
+                self._running -= 1
+
+        if result.get('degraded'):
+            outcome = 'deferred'
+        elif is_fallback_result(result):
+            outcome = 'failed'
+        elif result.get('status') != previous:
+            outcome = 'changed'
+            logger.info(f"🔄 {shipment.carrier_name} package {shipment.tracking_number}: {previous} → {result.get('status')}")
+        else:
+            outcome = 'unchanged'
+        with self._lock:
+            self._stats['refreshed'] += 1
+            if outcome != 'unchanged':
+                self._stats[outcome] += 1
+        REFRESHES.inc(carrier=shipment.carrier_name, outcome=outcome)
+
+
+_refresh_scheduler = RefreshScheduler()
+
+
+def get_refresh_scheduler():
+    return _refresh_scheduler
@@ -0,0 +1,150 @@
+"""
+Request interception for tracking page loads
+Aborts heavy resource types (images, media, fonts) and known third-party
+analytics/ad domains on the browser context, and keeps running totals of
+what was blocked
+"""
+import logging
+import os
+import threading
+from urllib.parse import urlsplit
+from carrier_profiles import get_scrape_profile
+from metrics import BLOCKED_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+# Interception configuration
+RESOURCE_BLOCKING_ENABLED = os.getenv('RESOURCE_BLOCKING_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+BLOCKED_RESOURCE_TYPES = frozenset(
+    resource_type.strip()
+    for resource_type in os.getenv('BLOCKED_RESOURCE_TYPES', 'image,media,font').split(',')
+    if resource_type.strip()
+)
+# Block third-party hosts that are on neither the carrier's allow list nor a deny list
+BLOCK_UNLISTED_THIRD_PARTY = os.getenv('BLOCK_UNLISTED_THIRD_PARTY', 'false').lower() in ('1', 'true', 'yes')
+
+# Analytics, tag manager and ad hosts that never carry tracking content
+BLOCKED_DOMAINS = (
+    'google-analytics.com', 'googletagmanager.com', 'googlesyndication.com', 'googleadservices.com',
+    'doubleclick.net', 'facebook.net', 'connect.facebook.com', 'bat.bing.com', 'clarity.ms',
+    'hotjar.com', 'demdex.net', 'omtrdc.net', 'scorecardresearch.com', 'quantserve.com',
+    'criteo.com', 'taboola.com', 'outbrain.com', 'ads-twitter.com', 'ads.linkedin.com', 'nr-data.net',
+)
+
+# Rough transfer size per aborted request, used to estimate bandwidth saved
+ESTIMATED_BYTES = {
+    'image': 40000,
+    'media': 500000,
+    'font': 35000,
+    'script': 60000,
+    'stylesheet': 20000,
+    'xhr': 5000,
+    'fetch': 5000,
+}
+DEFAULT_ESTIMATED_BYTES = 10000
+
+
+def host_matches(host, domains):
+    """
+    True if host is one of domains or a subdomain of one
+    """
+    return any(host == domain or host.endswith('.' + domain) for domain in domains)
+
+
+def block_reason(resource_type, url, profile):
+    """
+    Why a request should be aborted for this carrier, or None to let it through
+    """
+    if resource_type in BLOCKED_RESOURCE_TYPES:
+        return 'resource_type'
+
+    host = (urlsplit(url).hostname or '').lower()
+    if not host or host_matches(host, profile.allowed_domains):
+        return None
+    if host_matches(host, BLOCKED_DOMAINS) or host_matches(host, profile.blocked_domains):
+        return 'blocked_domain'
+    if BLOCK_UNLISTED_THIRD_PARTY and profile.allowed_domains:
+        return 'third_party'
+    return None
+
+
+class ResourceBlocker:
+    """
+    Installs a route handler per browser context and aggregates what it blocked
+    """
+    def __init__(self, enabled=RESOURCE_BLOCKING_ENABLED):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._totals = {'requests': 0, 'blocked': 0, 'estimated_bytes': 0, 'by_reason': {}, 'by_type': {}}
+
+    async def attach(self, context, carrier_name):
+        """
+        Route every request of the context through the block rules.
+
+        Returns the per-page counts that record() folds into the totals,
+        or None when blocking is disabled.
+        """
+        if not self.enabled:
+            return None
+
+        profile = get_scrape_profile(carrier_name)
+        counts = {'requests': 0, 'blocked': 0, 'estimated_bytes': 0, 'by_reason': {}, 'by_type': {}}
+
+        async def handle(route):
+            request = route.request
+            counts['requests'] += 1
+            reason = block_reason(request.resource_type, request.url, profile)
+            try:
+                if reason is None:
+                    await route.continue_()
+                    return
+                counts['blocked'] += 1
+                counts['estimated_bytes'] += ESTIMATED_BYTES.get(request.resource_type, DEFAULT_ESTIMATED_BYTES)
+                counts['by_reason'][reason] = counts['by_reason'].get(reason, 0) + 1
+                counts['by_type'][request.resource_type] = counts['by_type'].get(request.resource_type, 0) + 1
+                await route.abort('blockedbyclient')
+            except Exception as e:
+                # The page may already be closing
+                logger.debug(f"Route handling error for {request.url}: {e}")
+
+        await context.route('**/*', handle)
+        return counts
+
+    def record(self, counts, carrier_name=None):
+        """
+        Add one page's counts to the running totals
+        """
+        if not counts:
+            return
+        with self._lock:
+            for name in ('requests', 'blocked', 'estimated_bytes'):
+                self._totals[name] += counts[name]
+            for group in ('by_reason', 'by_type'):
+                for key, value in counts[group].items():
+                    self._totals[group][key] = self._totals[group].get(key, 0) + value
+        for reason, value in counts['by_reason'].items():
+            BLOCKED_REQUESTS.inc(value, reason=reason)
+
+        logger.info(
+            f"🚫 Blocked {counts['blocked']}/{counts['requests']} requests for {carrier_name} "
+            f"(~{counts['estimated_bytes'] // 1024} KB)"
+        )
+
+    def stats(self):
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'blocked_resource_types': sorted(BLOCKED_RESOURCE_TYPES),
+                'requests': self._totals['requests'],
+                'blocked': self._totals['blocked'],
+                'estimated_bytes': self._totals['estimated_bytes'],
+                'by_reason': dict(self._totals['by_reason']),
+                'by_type': dict(self._totals['by_type']),
+            }
+
+
+_resource_blocker = ResourceBlocker()
+
+
+def get_resource_blocker():
+    return _resource_blocker
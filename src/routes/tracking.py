@@ -1,24 +1,56 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, url_for
 from flask_cors import cross_origin
-import requests
+import asyncio
+import concurrent.futures
 import logging
 import json
-from enhanced_stealth_scraper import get_enhanced_stealth_tracking
+import os
+import time
+from carrier_profiles import get_carrier_profile
+from enhanced_stealth_scraper import (
+    enhanced_tracking_result,
+    get_enhanced_stealth_tracking,
+    get_enhanced_stealth_tracking_async,
+    submit_enhanced_stealth_tracking_batch,
+)
+from metrics import CACHE_REQUESTS
+from order_index import get_order_index, parse_tracking_items
+from single_flight import SingleFlight
+from tracking_cache import LRUCache
+from tracking_jobs import TERMINAL_STATES, get_job_manager
+from woocommerce_client import get_async_woocommerce_client, get_woocommerce_client
 
 logger = logging.getLogger(__name__)
 
 tracking_bp = Blueprint('tracking', __name__)
 
-# WooCommerce configuration
-WOOCOMMERCE_URL = "https://shop.humanfoodbar.com"
-WOOCOMMERCE_CONSUMER_KEY = "ck_e796b39727d0a0717194131cc4218eeea6dd43cd"
-WOOCOMMERCE_CONSUMER_SECRET = "cs_f7aa55b988e4cc3fefe3c86da06bf45d9fd36574"
+# Order lookup cache (order number or ID -> slim order record)
+ORDER_CACHE_TTL = int(os.getenv('ORDER_CACHE_TTL', '60'))  # seconds
+ORDER_CACHE_MAX_ENTRIES = int(os.getenv('ORDER_CACHE_MAX_ENTRIES', '2048'))
+ORDER_FIELDS = 'id,number,status,date_created,date_modified,date_modified_gmt,meta_data'
+order_cache = LRUCache(ORDER_CACHE_MAX_ENTRIES)
+
+# Concurrent /api/track-order requests for the same order share one lookup
+order_flight = SingleFlight('order')
+
+# Batch tracking (/api/track-orders)
+BATCH_MAX_ORDERS = int(os.getenv('BATCH_MAX_ORDERS', '500'))
+BATCH_TRACKING_CONCURRENCY = int(os.getenv('BATCH_TRACKING_CONCURRENCY', '4'))
+BATCH_TRACKING_MAX_CONCURRENCY = int(os.getenv('BATCH_TRACKING_MAX_CONCURRENCY', '16'))
+BATCH_TRACKING_TIMEOUT = int(os.getenv('BATCH_TRACKING_TIMEOUT', '900'))  # seconds
+WOOCOMMERCE_INCLUDE_CHUNK = 100  # API maximum per_page
+
+# Background job streaming (/api/track-order/jobs/<id>/events)
+TRACKING_JOB_POLL_INTERVAL = float(os.getenv('TRACKING_JOB_POLL_INTERVAL', '0.5'))  # seconds
+TRACKING_JOB_STREAM_TIMEOUT = int(os.getenv('TRACKING_JOB_STREAM_TIMEOUT', '180'))  # seconds
 
 @tracking_bp.route('/track-order', methods=['POST'])
 @cross_origin()
 def track_order():
     """
-    Track order with both WooCommerce status and enhanced tracking
+    Track order with WooCommerce status and the carrier tracking URL.
+    With "async": true the enhanced carrier lookup runs as a background job
+    and a job ID is returned straight away; "enhanced": true runs it inline.
     """
     try:
         data = request.get_json()
@@ -30,6 +62,25 @@ def track_order():
                 'error': 'Order number is required'
             }), 400
         
+        if data.get('async'):
+            job = get_job_manager().submit(order_number)
+            return jsonify({
+                'success': True,
+                'job_id': job['job_id'],
+                'state': job['state'],
+                'status_url': url_for('tracking.get_tracking_job', job_id=job['job_id']),
+                'events_url': url_for('tracking.stream_tracking_job', job_id=job['job_id'])
+            }), 202
+        
+        if data.get('enhanced'):
+            try:
+                return jsonify(order_flight.do(order_number, lookup_order_tracking, order_number))
+            except LookupError as e:
+                return jsonify({
+                    'success': False,
+                    'error': str(e)
+                }), 404
+        
         # Get order from WooCommerce
         order = get_woocommerce_order(order_number)
         
@@ -39,69 +90,7 @@ def track_order():
                 'error': f'Order {order_number} not found'
             }), 404
         
-        # Extract order information
-        order_status = order.get('status', 'unknown').upper()
-        order_date = order.get('date_created', '')
-        
-        # Extract tracking information from WooCommerce Shipment Tracking plugin
-        tracking_number = None
-        tracking_provider = None
-        
-        meta_data = order.get('meta_data', [])
-        for meta in meta_data:
-            key = meta.get('key', '')
-            if key == '_wc_shipment_tracking_items':
-                try:
-                    value = meta.get('value', [])
-                    # Handle both string (JSON) and list formats
-                    if isinstance(value, str):
-                        tracking_items = json.loads(value)
-                    elif isinstance(value, list):
-                        tracking_items = value
-                    else:
-                        tracking_items = []
-                        
-                    if tracking_items and len(tracking_items) > 0:
-                        tracking_item = tracking_items[0]
-                        tracking_number = tracking_item.get('tracking_number', '').strip()
-                        tracking_provider = tracking_item.get('tracking_provider', '').strip()
-                        if tracking_number:
-                            logger.info(f"Found WC tracking: {tracking_number} via {tracking_provider}")
-                            break
-                except (json.JSONDecodeError, TypeError) as e:
-                    logger.warning(f"Error parsing WC tracking data: {e}")
-                    continue
-        
-        # Backup: Check for RouteApp tracking number
-        if not tracking_number:
-            for meta in meta_data:
-                key = meta.get('key', '').lower()
-                if 'routeapp_shipment_tracking_number' in key:
-                    value = meta.get('value', '').strip()
-                    if value and len(value) > 5:
-                        tracking_number = value
-                        logger.info(f"Found RouteApp tracking: {tracking_number}")
-                        break
-        
-        response_data = {
-            'success': True,
-            'order_id': order.get('id'),
-            'order_number': order.get('number'),
-            'order_status': order_status,
-            'order_date': order_date,
-            'tracking_number': tracking_number,
-            'carrier': tracking_provider.upper() if tracking_provider else None
-        }
-        
-        # If we have a tracking number, use direct tracking URL
-        if tracking_number:
-            response_data['message'] = f"Order {order_status.lower()}: Tracking number {tracking_number}"
-            response_data['tracking_url'] = get_tracking_url(tracking_number, tracking_provider)
-            logger.info(f"Using direct tracking URL: {response_data['tracking_url']}")
-        else:
-            response_data['message'] = f"Order {order_status.lower()}: No tracking information available"
-        
-        return jsonify(response_data)
+        return jsonify(build_order_response(order))
         
     except Exception as e:
         logger.error(f"Error tracking order: {e}")
@@ -110,64 +99,511 @@ def track_order():
             'error': 'Unable to retrieve tracking information. Please try again later.'
         }), 500
 
-def get_tracking_url(tracking_number, provider):
+@tracking_bp.route('/track-order/jobs/<job_id>', methods=['GET'])
+@cross_origin()
+def get_tracking_job(job_id):
     """
-    Generate tracking URL based on provider
+    Poll a background tracking job
     """
-    if not tracking_number:
-        return None
+    job = get_job_manager().get(job_id)
+    if job is None:
+        return jsonify({
+            'success': False,
+            'error': f'Job {job_id} not found'
+        }), 404
+    
+    return jsonify({'success': True, **job})
+
+@tracking_bp.route('/track-order/jobs/<job_id>/events', methods=['GET'])
+@cross_origin()
+def stream_tracking_job(job_id):
+    """
+    Stream background tracking job progress as Server-Sent Events
+    """
+    if get_job_manager().get(job_id) is None:
+        return jsonify({
+            'success': False,
+            'error': f'Job {job_id} not found'
+        }), 404
+    
+    return Response(
+        stream_job_events(job_id),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+def stream_job_events(job_id):
+    """
+    Emit a "progress" event whenever the job changes and a final "done" event
+    """
+    manager = get_job_manager()
+    last_update = None
+    last_sent = time.monotonic()
+    deadline = last_sent + TRACKING_JOB_STREAM_TIMEOUT
+    
+    while time.monotonic() < deadline:
+        job = manager.get(job_id)
+        if job is None:
+            return
         
-    if not provider:
-        return None  # Don't default to anything if provider is unknown
+        if job['updated_at'] != last_update:
+            last_update = job['updated_at']
+            last_sent = time.monotonic()
+            finished = job['state'] in TERMINAL_STATES
+            yield sse_event('done' if finished else 'progress', {'success': True, **job})
+            if finished:
+                return
+        elif time.monotonic() - last_sent > 15:
+            last_sent = time.monotonic()
+            yield ': keep-alive\n\n'
+        
+        time.sleep(TRACKING_JOB_POLL_INTERVAL)
+
+def sse_event(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+def lookup_order_tracking(order_number, progress=None):
+    """
+    Full lookup for one order: WooCommerce order first, then the carrier.
+    Raises LookupError when the order does not exist.
+    """
+    if progress:
+        progress('resolving_order')
+    
+    order = get_woocommerce_order(order_number)
+    if not order:
+        raise LookupError(f'Order {order_number} not found')
+    
+    response_data = build_order_response(order)
+    if not response_data.get('tracking_url'):
+        return response_data
+    
+    # Order details are useful to show while the carrier page loads
+    if progress:
+        progress('tracking', response_data)
+    
+    tracking_info = get_enhanced_stealth_tracking(
+        response_data['tracking_url'],
+        response_data['carrier'],
+        response_data['tracking_number']
+    )
+    return attach_enhanced_tracking(response_data, tracking_info)
+
+async def lookup_order_tracking_async(order_number):
+    """
+    lookup_order_tracking for the ASGI app, awaiting WooCommerce and the
+    scraper instead of holding a worker thread
+    """
+    order = await get_woocommerce_order_async(order_number)
+    if not order:
+        raise LookupError(f'Order {order_number} not found')
+    
+    response_data = build_order_response(order)
+    if not response_data.get('tracking_url'):
+        return response_data
+    
+    tracking_info = await get_enhanced_stealth_tracking_async(
+        response_data['tracking_url'],
+        response_data['carrier'],
+        response_data['tracking_number']
+    )
+    return attach_enhanced_tracking(response_data, tracking_info)
+
+@tracking_bp.route('/track-orders', methods=['POST'])
+@cross_origin()
+def track_orders():
+    """
+    Track many orders at once, streaming one NDJSON line per order as it completes
+    """
+    data = request.get_json(silent=True) or {}
+    order_numbers = data.get('order_numbers')
+    
+    if not isinstance(order_numbers, list) or not order_numbers:
+        return jsonify({
+            'success': False,
+            'error': 'order_numbers must be a non-empty list'
+        }), 400
+    
+    # Dedupe while keeping the caller's order
+    order_numbers = list(dict.fromkeys(str(number).strip() for number in order_numbers if str(number).strip()))
+    
+    if len(order_numbers) > BATCH_MAX_ORDERS:
+        return jsonify({
+            'success': False,
+            'error': f'At most {BATCH_MAX_ORDERS} orders per batch'
+        }), 400
+    
+    try:
+        concurrency = int(data.get('concurrency') or BATCH_TRACKING_CONCURRENCY)
+    except (TypeError, ValueError):
+        concurrency = BATCH_TRACKING_CONCURRENCY
+    concurrency = max(1, min(concurrency, BATCH_TRACKING_MAX_CONCURRENCY))
+    
+    logger.info(f"📦 Batch tracking {len(order_numbers)} orders with concurrency {concurrency}")
+    
+    return Response(
+        stream_batch_tracking(order_numbers, concurrency),
+        mimetype='application/x-ndjson'
+    )
+
+def stream_batch_tracking(order_numbers, concurrency):
+    """
+    Resolve orders in bulk, fan carrier lookups out to the scraper and yield
+    NDJSON lines in completion order
+    """
+    try:
+        orders = get_woocommerce_orders(order_numbers)
+    except Exception as e:
+        logger.error(f"Batch order resolution error: {e}")
+        orders = {}
+    
+    # Group orders by shipment so a shared tracking number is scraped once
+    pending = {}
+    for order_number in order_numbers:
+        order = orders.get(order_number)
+        if not order:
+            yield ndjson_line({
+                'success': False,
+                'order_number': order_number,
+                'error': f'Order {order_number} not found'
+            })
+            continue
         
-    provider = provider.lower()
+        response_data = build_order_response(order)
+        response_data['requested_order_number'] = order_number
+        if not response_data.get('tracking_url'):
+            yield ndjson_line(response_data)
+            continue
+        
+        lookup = (response_data['tracking_url'], response_data['carrier'], response_data['tracking_number'])
+        pending.setdefault(lookup, []).append(response_data)
+    
+    if not pending:
+        return
+    
+    lookups = list(pending)
+    futures = dict(zip(submit_enhanced_stealth_tracking_batch(lookups, concurrency), lookups))
+    
+    try:
+        for future in concurrent.futures.as_completed(list(futures), timeout=BATCH_TRACKING_TIMEOUT):
+            lookup = futures.pop(future)
+            tracking_info = enhanced_tracking_result(future, *lookup)
+            for response_data in pending[lookup]:
+                yield ndjson_line(attach_enhanced_tracking(response_data, tracking_info))
+    except concurrent.futures.TimeoutError:
+        logger.warning(f"⏰ Batch tracking deadline reached with {len(futures)} lookups outstanding")
+        for future, lookup in list(futures.items()):
+            tracking_info = enhanced_tracking_result(future, *lookup)
+            for response_data in pending[lookup]:
+                yield ndjson_line(attach_enhanced_tracking(response_data, tracking_info))
+    finally:
+        # Stop outstanding lookups if the client went away mid-stream
+        for future in futures:
+            future.cancel()
+
+def ndjson_line(payload):
+    return json.dumps(payload) + '\n'
+
+def build_order_response(order):
+    """
+    Order status and tracking details in the /api/track-order response shape
+    """
+    # Extract order information
+    order_status = order.get('status', 'unknown').upper()
+    order_date = order.get('date_created', '')
     
-    if provider == 'usps':
-        return f"https://tools.usps.com/go/TrackConfirmAction?tLabels={tracking_number}"
-    elif provider == 'ups':
-        return f"https://www.ups.com/track?loc=en_US&tracknum={tracking_number}"
-    elif provider == 'fedex':
-        return f"https://www.fedex.com/fedextrack/?trknbr={tracking_number}"
-    elif provider == 'dhl':
-        return f"https://www.dhl.com/us-en/home/tracking/tracking-express.html?submit=1&tracking-id={tracking_number}"
+    tracking_number, tracking_provider = extract_tracking_info(order)
+    
+    response_data = {
+        'success': True,
+        'order_id': order.get('id'),
+        'order_number': order.get('number'),
+        'order_status': order_status,
+        'order_date': order_date,
+        'tracking_number': tracking_number,
+        'carrier': tracking_provider.upper() if tracking_provider else None
+    }
+    
+    # If we have a tracking number, use direct tracking URL
+    if tracking_number:
+        response_data['message'] = f"Order {order_status.lower()}: Tracking number {tracking_number}"
+        response_data['tracking_url'] = get_tracking_url(tracking_number, tracking_provider)
+        logger.info(f"Using direct tracking URL: {response_data['tracking_url']}")
     else:
-        return None  # Return None for unknown providers instead of defaulting
+        response_data['message'] = f"Order {order_status.lower()}: No tracking information available"
+    
+    return response_data
+
+def attach_enhanced_tracking(response_data, tracking_info):
+    """
+    Add scraper results to an order response the way the tracking page reads them
+    """
+    return {
+        **response_data,
+        'enhanced_tracking': tracking_info,
+        'delivery_status': tracking_info.get('status') if tracking_info else None
+    }
+
+def extract_tracking_info(order):
+    """
+    Tracking number and provider from WooCommerce Shipment Tracking or RouteApp meta
+    """
+    items = parse_tracking_items(order)
+    if not items:
+        return None, None
+    
+    tracking_number = items[0]['tracking_number']
+    tracking_provider = items[0]['tracking_provider'] or None
+    logger.info(f"Found tracking: {tracking_number} via {tracking_provider or 'RouteApp'}")
+    return tracking_number, tracking_provider
+
+def get_tracking_url(tracking_number, provider):
+    """
+    Generate tracking URL based on provider
+    """
+    if not tracking_number or not provider:
+        return None  # Don't default to anything if provider is unknown
+
+    profile = get_carrier_profile(provider)
+    return profile.tracking_url(tracking_number) if profile else None
 
 def get_woocommerce_order(order_number):
     """
-    Get order details from WooCommerce
+    Get order details: order cache, then the local order index, then the
+    WooCommerce API
+    """
+    order_number = str(order_number).strip()
+    
+    order = cached_order(order_number)
+    if order is not None:
+        return order
+    
+    order = indexed_order(get_order_index().get(order_number), order_number)
+    if order is not None:
+        return order
+    
+    return store_fetched_order(fetch_woocommerce_order(order_number), order_number)
+
+async def get_woocommerce_order_async(order_number):
+    """
+    get_woocommerce_order for the ASGI app: the index read runs off the event
+    loop and the API call goes through the async client
+    """
+    order_number = str(order_number).strip()
+    
+    order = cached_order(order_number)
+    if order is not None:
+        return order
+    
+    order = indexed_order(await asyncio.to_thread(get_order_index().get, order_number), order_number)
+    if order is not None:
+        return order
+    
+    order = await fetch_woocommerce_order_async(order_number)
+    if order:
+        await asyncio.to_thread(get_order_index().upsert, [order])
+    return store_fetched_order(order, order_number, index=False)
+
+def cached_order(order_number):
+    cached = order_cache.get(order_number)
+    if cached is not None:
+        CACHE_REQUESTS.inc(cache='order', result='hit')
+        logger.info(f"⚡ Order cache hit for {order_number}")
+        return cached
+    CACHE_REQUESTS.inc(cache='order', result='miss')
+    return None
+
+def indexed_order(indexed, order_number):
+    # An indexed order without tracking may have shipped since; ask the API
+    if indexed is not None and extract_tracking_info(indexed)[0]:
+        CACHE_REQUESTS.inc(cache='order_index', result='hit')
+        cache_order(indexed, order_number)
+        return indexed
+    CACHE_REQUESTS.inc(cache='order_index', result='miss')
+    return None
+
+def store_fetched_order(order, order_number, index=True):
+    """
+    Index and cache an order fetched from the API and return it slimmed
+    """
+    if not order:
+        return order
+    if index:
+        get_order_index().upsert([order])
+    order = slim_order(order)
+    cache_order(order, order_number)
+    return order
+
+def get_woocommerce_orders(order_numbers):
+    """
+    Resolve many orders at once: cache first, then the local order index,
+    then bulk include= queries for numeric IDs, then single lookups for
+    whatever is left
+    """
+    orders = {}
+    missing = []
+    for order_number in order_numbers:
+        cached = order_cache.get(order_number)
+        if cached is not None:
+            CACHE_REQUESTS.inc(cache='order', result='hit')
+            orders[order_number] = cached
+        else:
+            CACHE_REQUESTS.inc(cache='order', result='miss')
+            missing.append(order_number)
+    
+    # Local index next; orders indexed without tracking still go to the API
+    for order_number, order in get_order_index().get_many(missing).items():
+        if extract_tracking_info(order)[0]:
+            CACHE_REQUESTS.inc(cache='order_index', result='hit')
+            cache_order(order, order_number)
+            orders[order_number] = order
+    missing = [number for number in missing if number not in orders]
+    
+    numeric = [number for number in missing if number.isdigit()]
+    client = get_woocommerce_client()
+    for i in range(0, len(numeric), WOOCOMMERCE_INCLUDE_CHUNK):
+        chunk = numeric[i:i + WOOCOMMERCE_INCLUDE_CHUNK]
+        try:
+            response = client.get('orders', params={
+                'include': ','.join(chunk),
+                'per_page': len(chunk),
+                'status': 'any',
+                '_fields': ORDER_FIELDS
+            })
+            if response.status_code != 200:
+                logger.warning(f"WooCommerce bulk lookup returned {response.status_code}")
+                continue
+            for order in response.json():
+                order_id = str(order.get('id', ''))
+                # Custom order numbers fall through to the single lookup below
+                if str(order.get('number', '')) in (order_id, ''):
+                    get_order_index().upsert([order])
+                    order = slim_order(order)
+                    cache_order(order)
+                    orders[order_id] = order
+        except Exception as e:
+            logger.error(f"WooCommerce bulk API error: {e}")
+    
+    for order_number in missing:
+        if order_number not in orders:
+            orders[order_number] = get_woocommerce_order(order_number)
+    
+    return orders
+
+def fetch_woocommerce_order(order_number):
+    """
+    Look an order up in the WooCommerce API, direct ID first for numeric input
     """
     try:
-        url = f"{WOOCOMMERCE_URL}/wp-json/wc/v3/orders"
-        auth = (WOOCOMMERCE_CONSUMER_KEY, WOOCOMMERCE_CONSUMER_SECRET)
+        client = get_woocommerce_client()
+        direct_order = None
         
-        # Search by order number
-        params = {
-            'search': order_number,
-            'per_page': 50,
-            'status': 'any'
-        }
+        # Fast path: numeric input is almost always the order ID
+        if order_number.isdigit():
+            response = client.get(f"orders/{order_number}", params={'_fields': ORDER_FIELDS})
+            if response.status_code == 200:
+                direct_order = response.json()
+                if is_direct_match(direct_order, order_number):
+                    return direct_order
         
-        response = requests.get(url, auth=auth, params=params, timeout=30)
+        # Search by order number
+        response = client.get('orders', params=order_search_params(order_number))
         
         if response.status_code == 200:
-            orders = response.json()
-            
-            # Find exact match by order number or ID
-            for order in orders:
-                if str(order.get('number', '')) == str(order_number) or str(order.get('id', '')) == str(order_number):
-                    return order
-        
-        # Try direct ID lookup if order_number is numeric
+            return find_order_match(response.json(), order_number) or direct_order
+        
+        return direct_order
+        
+    except Exception as e:
+        logger.error(f"WooCommerce API error: {e}")
+        return None
+
+async def fetch_woocommerce_order_async(order_number):
+    """
+    fetch_woocommerce_order over the async WooCommerce client
+    """
+    try:
+        client = get_async_woocommerce_client()
+        direct_order = None
+        
         if order_number.isdigit():
-            direct_url = f"{url}/{order_number}"
-            response = requests.get(direct_url, auth=auth, timeout=30)
+            response = await client.get(f"orders/{order_number}", params={'_fields': ORDER_FIELDS})
             if response.status_code == 200:
-                return response.json()
+                direct_order = response.json()
+                if is_direct_match(direct_order, order_number):
+                    return direct_order
         
-        return None
+        response = await client.get('orders', params=order_search_params(order_number))
+        
+        if response.status_code == 200:
+            return find_order_match(response.json(), order_number) or direct_order
+        
+        return direct_order
         
     except Exception as e:
         logger.error(f"WooCommerce API error: {e}")
         return None
 
+def is_direct_match(order, order_number):
+    # Stores with custom order numbers need the search to match by number
+    return str(order.get('number', '')) in (order_number, str(order.get('id', '')))
+
+def order_search_params(order_number):
+    return {
+        'search': order_number,
+        'per_page': 50,
+        'status': 'any',
+        '_fields': ORDER_FIELDS
+    }
+
+def find_order_match(orders, order_number):
+    """
+    Exact match by order number or ID among search results
+    """
+    for order in orders:
+        if str(order.get('number', '')) == str(order_number) or str(order.get('id', '')) == str(order_number):
+            return order
+    return None
+
+def slim_order(order):
+    """
+    Keep only the order fields and tracking meta that track_order reads
+    """
+    meta_data = [
+        meta for meta in order.get('meta_data', [])
+        if meta.get('key') == '_wc_shipment_tracking_items'
+        or 'routeapp_shipment_tracking_number' in meta.get('key', '').lower()
+    ]
+    return {
+        'id': order.get('id'),
+        'number': order.get('number'),
+        'status': order.get('status'),
+        'date_created': order.get('date_created'),
+        'date_modified': order.get('date_modified'),
+        'date_modified_gmt': order.get('date_modified_gmt'),
+        'meta_data': meta_data
+    }
+
+def cache_order(order, *aliases):
+    """
+    Cache a slim order under its number, its ID and any lookup aliases
+    """
+    keys = {str(order.get('number', '')), str(order.get('id', ''))} | {str(alias) for alias in aliases}
+    for key in keys - {''}:
+        order_cache.set(key, order, ttl=ORDER_CACHE_TTL)
+
+def invalidate_order_cache(order_number=None):
+    """
+    Drop one cached order (by number or ID), or the whole cache when no number is given
+    """
+    if order_number is None:
+        order_cache.clear()
+        return
+    
+    order_number = str(order_number).strip()
+    cached = order_cache.get(order_number)
+    keys = {order_number}
+    if cached is not None:
+        keys |= {str(cached.get('number', '')), str(cached.get('id', ''))}
+    for key in keys - {''}:
+        order_cache.delete(key)
@@ -0,0 +1,99 @@
+from flask import Blueprint, request, jsonify
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+from order_index import get_order_index, parse_tracking_items
+from routes.tracking import invalidate_order_cache, order_cache
+from tracking_cache import get_tracking_cache
+
+logger = logging.getLogger(__name__)
+
+webhooks_bp = Blueprint('webhooks', __name__)
+
+# Secret set on the WooCommerce webhook (WooCommerce > Settings > Advanced > Webhooks)
+WOOCOMMERCE_WEBHOOK_SECRET = os.getenv('WOOCOMMERCE_WEBHOOK_SECRET', '')
+ORDER_TOPICS = ('order.created', 'order.updated', 'order.deleted', 'order.restored')
+
+@webhooks_bp.route('/webhooks/woocommerce', methods=['POST'])
+def woocommerce_webhook():
+    """
+    Keep the local order index current from WooCommerce order webhooks.
+
+    Cached tracking results are dropped for tracking numbers the webhook
+    added or removed (e.g. a corrected tracking number); an update that
+    leaves the tracking items alone keeps them
+    """
+    if not WOOCOMMERCE_WEBHOOK_SECRET:
+        return jsonify({
+            'success': False,
+            'error': 'Webhook secret is not configured'
+        }), 503
+
+    body = request.get_data()
+    topic = request.headers.get('X-WC-Webhook-Topic', '')
+
+    # WooCommerce sends an unsigned form-encoded ping when the webhook is saved
+    if not topic and body.startswith(b'webhook_id='):
+        return jsonify({'success': True})
+
+    if not valid_signature(body, request.headers.get('X-WC-Webhook-Signature', '')):
+        logger.warning(f"🔒 Rejected WooCommerce webhook with a bad signature ({topic or 'no topic'})")
+        return jsonify({
+            'success': False,
+            'error': 'Invalid signature'
+        }), 401
+
+    if topic not in ORDER_TOPICS:
+        return jsonify({'success': True, 'ignored': topic})
+
+    try:
+        order = json.loads(body)
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'error': 'Invalid JSON body'
+        }), 400
+
+    if not isinstance(order, dict):
+        return jsonify({
+            'success': False,
+            'error': 'Expected a JSON order object'
+        }), 400
+
+    # Compare against the stored copy before the index and cache take the new one
+    changed_items = changed_tracking_items(order)
+    get_order_index().handle_webhook(topic, order)
+    # Only by key: invalidate_order_cache(None) clears the whole cache
+    for key in (order.get('id'), order.get('number')):
+        if key:
+            invalidate_order_cache(key)
+    for provider, tracking_number in changed_items:
+        get_tracking_cache().invalidate(provider, tracking_number)
+    logger.info(f"🪝 {topic} for order {order.get('number') or order.get('id')}")
+
+    return jsonify({'success': True})
+
+def changed_tracking_items(order):
+    """
+    (provider, tracking number) pairs added or removed by this webhook, judged
+    against the indexed or cached copy of the order; all of them when neither
+    has the order
+    """
+    key = order.get('number') or order.get('id')
+    previous = (get_order_index().get(key) or order_cache.get(str(key))) if key else None
+    items = {(item['tracking_provider'], item['tracking_number']) for item in parse_tracking_items(order)}
+    if previous is None:
+        return items
+    return items ^ {(item['tracking_provider'], item['tracking_number']) for item in parse_tracking_items(previous)}
+
+def valid_signature(body, signature):
+    """
+    X-WC-Webhook-Signature is the base64 HMAC-SHA256 of the raw body
+    """
+    expected = base64.b64encode(
+        hmac.new(WOOCOMMERCE_WEBHOOK_SECRET.encode('utf-8'), body, hashlib.sha256).digest()
+    ).decode('ascii')
+    return hmac.compare_digest(expected, signature)
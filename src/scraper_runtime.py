@@ -0,0 +1,125 @@
+"""
+Process-wide asyncio runtime for the tracking scraper
+Runs one event loop in a dedicated thread so pooled browsers and warm
+clients survive across Flask requests
+"""
+import asyncio
+import atexit
+import concurrent.futures
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class ScraperRuntime:
+    """
+    Long-lived event loop running in a background daemon thread.
+
+    Flask workers hand coroutines to the loop with submit(), which uses
+    asyncio.run_coroutine_threadsafe and returns a concurrent.futures.Future
+    that can be waited on from any thread.
+    """
+    def __init__(self, name='scraper-runtime'):
+        self.name = name
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._shutdown_hooks = []
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """
+        Start the loop thread if it is not running yet and return the loop
+        """
+        with self._lock:
+            if self.running:
+                return self._loop
+
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+
+            def run_loop():
+                asyncio.set_event_loop(loop)
+                loop.call_soon(ready.set)
+                loop.run_forever()
+
+            self._thread = threading.Thread(target=run_loop, name=self.name, daemon=True)
+            self._loop = loop
+            self._thread.start()
+            ready.wait()
+
+            logger.info(f"🔁 Scraper runtime started on thread {self.name}")
+            return loop
+
+    def submit(self, coro):
+        """
+        Schedule a coroutine on the runtime loop and return its Future
+        """
+        loop = self.start()
+        return asyncio.run_coroutine_threadsafe(coro, loop)
+
+    def run(self, coro, timeout=None):
+        """
+        Run a coroutine on the runtime loop and block until it finishes
+        """
+        future = self.submit(coro)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+    def add_shutdown_hook(self, hook):
+        """
+        Register a coroutine function awaited on the loop during shutdown
+        """
+        self._shutdown_hooks.append(hook)
+
+    def shutdown(self, timeout=30):
+        """
+        Run shutdown hooks, cancel outstanding work and stop the loop thread
+        """
+        with self._lock:
+            if not self.running:
+                return
+
+            loop, thread = self._loop, self._thread
+            hooks, self._shutdown_hooks = self._shutdown_hooks, []
+
+            async def drain():
+                for hook in hooks:
+                    try:
+                        await hook()
+                    except Exception as e:
+                        logger.warning(f"⚠️ Runtime shutdown hook failed: {e}")
+
+                current = asyncio.current_task()
+                pending = [task for task in asyncio.all_tasks() if task is not current]
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+
+            try:
+                asyncio.run_coroutine_threadsafe(drain(), loop).result(timeout)
+            except Exception as e:
+                logger.warning(f"⚠️ Scraper runtime drain error: {e}")
+
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(timeout)
+            loop.close()
+
+            self._loop = None
+            self._thread = None
+            logger.info("🛑 Scraper runtime stopped")
+
+
+_runtime = ScraperRuntime()
+atexit.register(_runtime.shutdown)
+
+
+def get_runtime():
+    return _runtime
@@ -0,0 +1,340 @@
+"""
+Browser session admission control
+A token bucket plus a cap on concurrent sessions in front of every browser
+page load, with a bounded priority queue so customer lookups go ahead of
+batch and background work, capacity held back for them, and a fast
+rejection when the queue is full
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from metrics import SESSION_ADMISSIONS, STAGE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Lookup priorities, lower goes first
+INTERACTIVE = 0
+BATCH = 1
+BACKGROUND = 2
+PRIORITY_NAMES = {INTERACTIVE: 'interactive', BATCH: 'batch', BACKGROUND: 'background'}
+
+# Governor configuration
+BROWSER_MAX_SESSIONS = int(os.getenv('BROWSER_MAX_SESSIONS', '2'))
+BROWSER_SESSIONS_PER_MINUTE = float(os.getenv('BROWSER_SESSIONS_PER_MINUTE', '30'))
+BROWSER_SESSION_BURST = int(os.getenv('BROWSER_SESSION_BURST', '4'))
+BROWSER_QUEUE_MAX = int(os.getenv('BROWSER_QUEUE_MAX', '20'))
+# Held back for customer lookups: batch and background work never takes the last
+# BROWSER_RESERVED_SESSIONS slots or the last BROWSER_RESERVED_TOKENS tokens
+BROWSER_RESERVED_SESSIONS = int(os.getenv('BROWSER_RESERVED_SESSIONS', '1'))
+BROWSER_RESERVED_TOKENS = int(os.getenv('BROWSER_RESERVED_TOKENS', '1'))
+
+# Longest a request waits for a session before failing fast, per priority
+QUEUE_TIMEOUTS = {
+    INTERACTIVE: float(os.getenv('BROWSER_QUEUE_TIMEOUT', '20')),  # seconds
+    BATCH: float(os.getenv('BROWSER_BATCH_QUEUE_TIMEOUT', '120')),  # seconds
+    BACKGROUND: float(os.getenv('BROWSER_BACKGROUND_QUEUE_TIMEOUT', '60')),  # seconds
+}
+
+
+class SessionRejected(Exception):
+    """
+    No browser session could be granted in time; reason is queue_full or queue_timeout
+    """
+    def __init__(self, reason, priority):
+        super().__init__(f"Browser session rejected ({reason}, {PRIORITY_NAMES.get(priority, priority)})")
+        self.reason = reason
+        self.priority = priority
+
+
+class LookupPriority:
+    """
+    Priority of one shared lookup, raised (never lowered) when a more urgent
+    caller joins it, so a customer waiting on a background refresh is not
+    queued as background
+    """
+    def __init__(self, value):
+        self.value = value
+        self._listeners = []
+
+    def raise_to(self, value):
+        """
+        Raise the priority to `value`; True when that changed it
+        """
+        if value >= self.value:
+            return False
+        self.value = value
+        for listener in list(self._listeners):
+            listener()
+        return True
+
+    def subscribe(self, listener):
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+
+def priority_value(priority):
+    return priority.value if isinstance(priority, LookupPriority) else priority
+
+
+class SessionGovernor:
+    """
+    Admission control for browser sessions on one event loop.
+
+    A session needs a free slot (at most max_sessions at once) and a token
+    from a bucket refilled at rate_per_minute. Callers that cannot start
+    straight away wait in a heap ordered by priority then arrival; when the
+    queue is full a new caller displaces the lowest-priority waiter or is
+    rejected. Batch and background sessions only start while
+    reserved_sessions slots and reserved_tokens tokens stay free, so a
+    customer lookup never waits behind them for either. Priority may be a
+    LookupPriority, whose waiter moves up the queue when it is raised.
+    throttle() empties the bucket for a while after an upstream 429, so
+    every queued session waits instead of each retrying on its own.
+    """
+    def __init__(self, max_sessions=BROWSER_MAX_SESSIONS, rate_per_minute=BROWSER_SESSIONS_PER_MINUTE,
+                 burst=BROWSER_SESSION_BURST, queue_max=BROWSER_QUEUE_MAX,
+                 reserved_sessions=BROWSER_RESERVED_SESSIONS, reserved_tokens=BROWSER_RESERVED_TOKENS):
+        self.max_sessions = max(1, max_sessions)
+        self.rate = max(0.01, rate_per_minute) / 60
+        self.burst = max(1, burst)
+        self.queue_max = max(0, queue_max)
+        # Leave batch and background at least one slot and one token to start with
+        self.reserved_sessions = min(max(0, reserved_sessions), self.max_sessions - 1)
+        self.reserved_tokens = min(max(0, reserved_tokens), self.burst - 1)
+        self._tokens = float(self.burst)
+        self._refilled_at = time.monotonic()
+        self._paused_until = 0.0
+        self._active = 0
+        self._waiters = []
+        self._queued = 0
+        self._sequence = itertools.count()
+        self._timer = None
+        self._stats = {'admitted': 0, 'queued': 0, 'rejected_queue_full': 0, 'rejected_queue_timeout': 0, 'throttles': 0}
+
+    @asynccontextmanager
+    async def session(self, priority=INTERACTIVE, carrier_name=None):
+        """
+        Hold one browser session for the duration of the block
+        """
+        started = time.monotonic()
+        await self.acquire(priority)
+        STAGE_SECONDS.observe(time.monotonic() - started, stage='session_wait', carrier=carrier_name)
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def acquire(self, priority=INTERACTIVE):
+        """
+        Wait for a session; raises SessionRejected when the queue is full or
+        the wait exceeds the timeout for its priority, which a raised
+        priority can only shorten
+        """
+        value = priority_value(priority)
+        if not self._waiters and self._try_start(value):
+            self._admitted(value)
+            return
+
+        if self._queued >= self.queue_max and not self._displace(value):
+            self._reject('queue_full', value)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        entry = [value, next(self._sequence), future]
+        heapq.heappush(self._waiters, entry)
+        self._queued += 1
+        self._stats['queued'] += 1
+
+        deadline = loop.time() + QUEUE_TIMEOUTS.get(value, QUEUE_TIMEOUTS[BACKGROUND])
+        timer = loop.call_at(deadline, self._expire, entry)
+
+        def raised():
+            nonlocal deadline, timer
+            self._reprioritize(entry, priority.value)
+            # A promoted waiter waits no longer than its new priority allows from now on
+            promoted = loop.time() + QUEUE_TIMEOUTS.get(entry[0], QUEUE_TIMEOUTS[BACKGROUND])
+            if not future.done() and promoted < deadline:
+                deadline = promoted
+                timer.cancel()
+                timer = loop.call_at(deadline, self._expire, entry)
+        if isinstance(priority, LookupPriority):
+            priority.subscribe(raised)
+        self._dispatch()
+
+        try:
+            # Raises SessionRejected when displaced or expired
+            await asyncio.shield(future)
+        except asyncio.CancelledError:
+            if not future.done():
+                self._withdraw(future)
+            elif not future.cancelled() and future.exception() is None:
+                # Granted just as the caller went away, hand the session back
+                self.release()
+            raise
+        finally:
+            timer.cancel()
+            if isinstance(priority, LookupPriority):
+                priority.unsubscribe(raised)
+        self._admitted(entry[0])
+
+    def release(self):
+        self._active -= 1
+        self._dispatch()
+
+    def throttle(self, seconds):
+        """
+        Hold back new sessions for `seconds` after an upstream rate limit
+        """
+        until = time.monotonic() + seconds
+        if until > self._paused_until:
+            self._paused_until = until
+            self._tokens = 0.0
+            self._stats['throttles'] += 1
+            logger.warning(f"🚦 Browser sessions throttled for {seconds:.1f}s after a rate limit")
+        self._schedule(seconds)
+
+    def stats(self):
+        """
+        Snapshot for /health; read-only, as it is called from Flask threads
+        """
+        now = time.monotonic()
+        tokens = self._tokens
+        if now >= self._paused_until:
+            tokens = min(self.burst, tokens + (now - max(self._refilled_at, self._paused_until)) * self.rate)
+        return {
+            'max_sessions': self.max_sessions,
+            'reserved_sessions': self.reserved_sessions,
+            'reserved_tokens': self.reserved_tokens,
+            'rate_per_minute': round(self.rate * 60, 2),
+            'active': self._active,
+            'waiting': self._queued,
+            'queue_max': self.queue_max,
+            'tokens': round(tokens, 2),
+            'throttled_for': round(max(0.0, self._paused_until - now), 1),
+            **self._stats,
+        }
+
+    def _refill(self):
+        now = time.monotonic()
+        if now >= self._paused_until:
+            self._tokens = min(self.burst, self._tokens + (now - max(self._refilled_at, self._paused_until)) * self.rate)
+        self._refilled_at = now
+
+    def _session_limit(self, priority):
+        return self.max_sessions if priority == INTERACTIVE else self.max_sessions - self.reserved_sessions
+
+    def _token_floor(self, priority):
+        """
+        Tokens that must be in the bucket for `priority` to take one
+        """
+        return 1 if priority == INTERACTIVE else 1 + self.reserved_tokens
+
+    def _try_start(self, priority):
+        self._refill()
+        if self._active >= self._session_limit(priority) or self._tokens < self._token_floor(priority):
+            return False
+        self._tokens -= 1
+        self._active += 1
+        return True
+
+    def _dispatch(self):
+        """
+        Grant sessions to waiters in priority order while slots and tokens allow
+        """
+        while self._waiters:
+            priority, _, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            if not self._try_start(priority):
+                break
+            heapq.heappop(self._waiters)
+            self._queued -= 1
+            future.set_result(True)
+
+        if self._waiters and self._active < self._session_limit(priority):
+            # Waiting on tokens: come back when the head waiter's token is due
+            now = time.monotonic()
+            deficit = max(0.0, self._token_floor(priority) - self._tokens)
+            self._schedule(max(0.0, self._paused_until - now) + deficit / self.rate)
+
+    def _schedule(self, delay):
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = asyncio.get_running_loop().call_later(delay, self._dispatch)
+
+    def _displace(self, priority):
+        """
+        Make room for `priority` by rejecting the newest lowest-priority waiter
+        """
+        live = [entry for entry in self._waiters if not entry[2].done()]
+        if not live:
+            return False
+        worst = max(live, key=lambda entry: (entry[0], entry[1]))
+        if worst[0] <= priority:
+            return False
+        worst[2].set_exception(SessionRejected('queue_full', worst[0]))
+        self._count_rejection('queue_full', worst[0])
+        self._queued -= 1
+        return True
+
+    def _reprioritize(self, entry, priority):
+        """
+        Move a queued waiter to a higher priority and see if it can start now
+        """
+        if entry[2].done() or priority >= entry[0]:
+            return
+        entry[0] = priority
+        heapq.heapify(self._waiters)
+        self._dispatch()
+
+    def _expire(self, entry):
+        """
+        Reject a waiter still queued at its deadline
+        """
+        future = entry[2]
+        if future.done():
+            return
+        self._queued -= 1
+        future.set_exception(SessionRejected('queue_timeout', entry[0]))
+        self._count_rejection('queue_timeout', entry[0])
+
+    def _withdraw(self, future):
+        future.cancel()
+        self._queued -= 1
+
+    def _admitted(self, priority):
+        self._stats['admitted'] += 1
+        SESSION_ADMISSIONS.inc(priority=PRIORITY_NAMES.get(priority, str(priority)), outcome='admitted')
+
+    def _reject(self, reason, priority):
+        self._count_rejection(reason, priority)
+        raise SessionRejected(reason, priority)
+
+    def _count_rejection(self, reason, priority):
+        self._stats[f"rejected_{reason}"] += 1
+        SESSION_ADMISSIONS.inc(priority=PRIORITY_NAMES.get(priority, str(priority)), outcome=f"rejected_{reason}")
+        logger.warning(f"🚫 Browser session rejected ({reason}) for {PRIORITY_NAMES.get(priority, priority)} lookup")
+
+
+# Only used from the scraper runtime loop
+_session_governor = SessionGovernor()
+
+
+def get_session_governor():
+    return _session_governor
+
+
+def is_rate_limit_error(error):
+    """
+    Playwright surfaces Browserless 429s only in the error text
+    """
+    message = str(error)
+    return '429' in message or 'Too Many Requests' in message
@@ -0,0 +1,116 @@
+"""
+Single-flight request coalescing
+Identical lookups that arrive while one is already running wait for that one
+and share its result instead of starting their own browser session and LLM call
+"""
+import asyncio
+import concurrent.futures
+import logging
+import threading
+from metrics import COALESCED_REQUESTS
+from session_governor import PRIORITY_NAMES, LookupPriority
+
+logger = logging.getLogger(__name__)
+
+# Roles recorded per call: the leader runs the lookup, followers join it
+LEADER = 'leader'
+FOLLOWER = 'follower'
+
+
+class SingleFlight:
+    """
+    Thread-level coalescing for synchronous callers such as Flask workers.
+
+    do(key, fn, *args) runs fn in the first caller for a key; callers that
+    arrive before it returns block on the same Future and get its result,
+    or its exception re-raised.
+    """
+    def __init__(self, scope):
+        self.scope = scope
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = concurrent.futures.Future()
+
+        COALESCED_REQUESTS.inc(scope=self.scope, role=LEADER if leader else FOLLOWER)
+        if not leader:
+            logger.info(f"🔗 Joined in-flight {self.scope} lookup for {key}")
+            return future.result()
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                if self._calls.get(key) is future:
+                    del self._calls[key]
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+
+class _AsyncCall:
+    def __init__(self, task, priority=None):
+        self.task = task
+        self.priority = priority
+        self.waiters = 0
+
+
+class AsyncSingleFlight:
+    """
+    Coalescing for coroutines running on one event loop.
+
+    The shared lookup runs as its own task so a follower that is cancelled
+    (e.g. its caller timed out) does not cancel it for everyone else; it is
+    only cancelled once every caller waiting on it has gone.
+
+    With priority=, the lookup is called with a LookupPriority as its
+    `priority` keyword, raised to the most urgent priority of the callers
+    that join it.
+    """
+    def __init__(self, scope):
+        self.scope = scope
+        self._calls = {}
+
+    async def do(self, key, coro_fn, *args, priority=None, **kwargs):
+        call = self._calls.get(key)
+        leader = call is None
+        if leader:
+            shared_priority = LookupPriority(priority) if priority is not None else None
+            if shared_priority is not None:
+                kwargs['priority'] = shared_priority
+            call = self._calls[key] = _AsyncCall(asyncio.ensure_future(coro_fn(*args, **kwargs)), shared_priority)
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+        else:
+            logger.info(f"🔗 Joined in-flight {self.scope} lookup for {key}")
+            if priority is not None and call.priority is not None and call.priority.raise_to(priority):
+                logger.info(f"⏫ Raised in-flight {self.scope} lookup for {key} to {PRIORITY_NAMES.get(priority, priority)}")
+        COALESCED_REQUESTS.inc(scope=self.scope, role=LEADER if leader else FOLLOWER)
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if call.waiters == 1 and not call.task.done():
+                call.task.cancel()
+            raise
+        finally:
+            call.waiters -= 1
+
+    def in_flight(self):
+        return len(self._calls)
+
+    def _forget(self, key, call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
@@ -0,0 +1,259 @@
+"""
+Status-aware tracking result cache
+In-memory LRU tier in front of a persistent SQLite tier (app.db), with
+TTLs chosen from the tracking status of each result
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from carrier_profiles import get_carrier_profile
+
+logger = logging.getLogger(__name__)
+
+# Cache configuration
+TRACKING_CACHE_MEMORY_ENTRIES = int(os.getenv('TRACKING_CACHE_MEMORY_ENTRIES', '1024'))
+TRACKING_CACHE_NEGATIVE_TTL = int(os.getenv('TRACKING_CACHE_NEGATIVE_TTL', '120'))  # seconds
+TRACKING_CACHE_DEFAULT_TTL = int(os.getenv('TRACKING_CACHE_DEFAULT_TTL', '1800'))  # seconds
+# Terminal statuses read by the rules alone expire after this, until the AI confirms them
+TRACKING_CACHE_RULE_TERMINAL_TTL = int(os.getenv('TRACKING_CACHE_RULE_TERMINAL_TTL', '86400'))  # seconds
+
+# TTL per tracking status in seconds, None caches for good (carrier profiles may override)
+STATUS_TTLS = {
+    'Delivered': None,
+    'Out for Delivery': 10 * 60,
+    'In Transit': 3 * 60 * 60,
+    'Label Created': 6 * 60 * 60,
+    'Delivery Exception': 30 * 60,
+    'Unknown': 15 * 60,
+}
+
+# extraction_method values that mark a failed lookup
+FALLBACK_METHODS = ('browserless_fallback', 'browserless_error')
+
+# extraction_method of results read by the rule-based extractor without the AI
+RULE_METHOD = 'browserless_stealth_rules'
+
+
+class LRUCache:
+    """
+    Thread-safe LRU mapping bounded by entry count, with optional per-entry expiry
+    """
+    def __init__(self, max_entries):
+        self.max_entries = max(1, max_entries)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or expires_at > time.time():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, value, ttl=None, expires_at=None):
+        if ttl is not None:
+            expires_at = time.time() + ttl
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+
+def is_fallback_result(result):
+    """
+    True for results produced by _fallback_response or the wrapper error path
+    """
+    return result.get('extraction_method') in FALLBACK_METHODS
+
+
+def status_ttl(carrier_name, status):
+    """
+    Cache lifetime in seconds for a status, None for terminal statuses
+    """
+    default = STATUS_TTLS.get(status, TRACKING_CACHE_DEFAULT_TTL)
+    profile = get_carrier_profile(carrier_name)
+    return profile.cache_ttl(status, default) if profile else default
+
+
+def ttl_for_result(result):
+    """
+    Cache lifetime in seconds for a tracking result, None for terminal statuses.
+    A terminal status from the rules alone is never final: it expires (and
+    stays on the refresh schedule) until an AI analysis confirms it.
+    """
+    if is_fallback_result(result):
+        return TRACKING_CACHE_NEGATIVE_TTL
+    ttl = status_ttl(result.get('carrier'), result.get('status'))
+    if ttl is None and result.get('extraction_method') == RULE_METHOD:
+        return TRACKING_CACHE_RULE_TERMINAL_TTL
+    return ttl
+
+
+class TrackingResultCache:
+    """
+    Two-tier cache keyed by (carrier, tracking_number).
+
+    Lookups hit the in-memory LRU first, then the tracking_result table when
+    the cache has been bound to the Flask app with init_app(). Without an
+    app only the memory tier is used.
+    """
+    def __init__(self, max_entries=TRACKING_CACHE_MEMORY_ENTRIES):
+        self.memory = LRUCache(max_entries)
+        self._app = None
+        self._db = None
+        self._model = None
+        self.persistent_hits = 0
+
+    def init_app(self, app):
+        from src.models.tracking_result import TrackingResult, db
+        self._app = app
+        self._db = db
+        self._model = TrackingResult
+
+    @staticmethod
+    def make_key(carrier_name, tracking_number):
+        return f"{(carrier_name or '').strip().lower()}:{(tracking_number or '').strip().upper()}"
+
+    def get(self, carrier_name, tracking_number):
+        """
+        Cached result or None when missing or expired
+        """
+        key = self.make_key(carrier_name, tracking_number)
+        result = self.memory.get(key)
+        if result is not None or self._app is None:
+            return result
+        return self._load(key)
+
+    def _load(self, key, allow_stale=False):
+        try:
+            with self._app.app_context():
+                row = self._model.query.filter_by(cache_key=key).first()
+                if row is None:
+                    return None
+                expired = row.expires_at is not None and row.expires_at <= time.time()
+                if expired and not allow_stale:
+                    return None
+                result, expires_at = row.to_dict(), row.expires_at
+        except Exception as e:
+            logger.warning(f"⚠️ Tracking cache read error: {e}")
+            return None
+
+        if expired:
+            return result
+        self.persistent_hits += 1
+        self.memory.set(key, result, expires_at=expires_at)
+        return result
+
+    def set(self, carrier_name, tracking_number, result, tracking_url=None):
+        """
+        Store a result with a TTL derived from its status
+        """
+        key = self.make_key(carrier_name, tracking_number)
+        ttl = ttl_for_result(result)
+        now = time.time()
+        expires_at = None if ttl is None else now + ttl
+        self.memory.set(key, result, expires_at=expires_at)
+
+        if self._app is None:
+            return
+
+        try:
+            with self._app.app_context():
+                row = self._model.query.filter_by(cache_key=key).first()
+                if row is None:
+                    row = self._model(cache_key=key)
+                    self._db.session.add(row)
+                row.carrier = carrier_name or ''
+                row.tracking_number = tracking_number or ''
+                row.tracking_url = tracking_url
+                row.status = result.get('status')
+                row.result = json.dumps(result)
+                row.fetched_at = now
+                row.expires_at = expires_at
+                self._db.session.commit()
+        except Exception as e:
+            logger.warning(f"⚠️ Tracking cache write error: {e}")
+
+    def invalidate(self, carrier_name, tracking_number):
+        key = self.make_key(carrier_name, tracking_number)
+        self.memory.delete(key)
+
+        if self._app is None:
+            return
+
+        try:
+            with self._app.app_context():
+                self._model.query.filter_by(cache_key=key).delete()
+                self._db.session.commit()
+        except Exception as e:
+            logger.warning(f"⚠️ Tracking cache invalidate error: {e}")
+
+    async def aget(self, carrier_name, tracking_number):
+        """
+        get() for the scraper loop, keeping SQLite off the event loop thread
+        """
+        key = self.make_key(carrier_name, tracking_number)
+        result = self.memory.get(key)
+        if result is not None or self._app is None:
+            return result
+        return await asyncio.to_thread(self._load, key)
+
+    async def aget_stale(self, carrier_name, tracking_number):
+        """
+        Last stored result even if it has expired, for when no fresh lookup
+        can run; None without the persistent tier
+        """
+        key = self.make_key(carrier_name, tracking_number)
+        result = self.memory.get(key)
+        if result is not None or self._app is None:
+            return result
+        return await asyncio.to_thread(self._load, key, True)
+
+    async def aset(self, carrier_name, tracking_number, result, tracking_url=None):
+        await asyncio.to_thread(self.set, carrier_name, tracking_number, result, tracking_url)
+
+    def stats(self):
+        return {
+            'memory': self.memory.stats(),
+            'persistent_enabled': self._app is not None,
+            'persistent_hits': self.persistent_hits,
+        }
+
+
+_tracking_cache = TrackingResultCache()
+
+
+def get_tracking_cache():
+    return _tracking_cache
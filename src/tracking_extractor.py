@@ -0,0 +1,243 @@
+"""
+Rule-based tracking extraction
+Precompiled per-carrier patterns that read status, dates and location from
+carrier page text and score how confident the match is, so the AI analysis
+only runs when the rules are unsure
+"""
+import logging
+import os
+import re
+from datetime import datetime
+from carrier_profiles import get_scrape_profile
+
+logger = logging.getLogger(__name__)
+
+# Below this confidence the page goes to the AI analysis instead
+RULE_EXTRACTION_MIN_CONFIDENCE = float(os.getenv('RULE_EXTRACTION_MIN_CONFIDENCE', '0.75'))
+
+# How far (in characters) from a status phrase to look for its date and location
+CONTEXT_WINDOW = 250
+
+# A Delivered phrase skips the AI and is cached for a day, so the rules only
+# vouch for one with an event date or location within this many characters after it
+DELIVERED_EVIDENCE_WINDOW = 60
+UNCONFIRMED_DELIVERED_CONFIDENCE = 0.5
+
+# Words shortly before "delivered" that make it a negation or a forecast
+# ("has not been delivered", "wasn't delivered", "expected to be\ndelivered on")
+QUALIFIER_WORDS = {
+    'not', 'never', 'no', 'yet', 'cannot', 'be', 'will', 'should', 'could', 'may', 'might',
+    'expected', 'scheduled', 'estimated', 'anticipated', 'projected',
+}
+QUALIFIER_WINDOW_WORDS = 4
+WORD_PATTERN = re.compile(r"[a-z]+(?:'[a-z]+)?")
+SENTENCE_BREAK_PATTERN = re.compile(r'[.!?;](?:\s|$)')
+
+MONTHS = {
+    'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
+    'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12,
+}
+MONTH_NAME = r'(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)\.?'
+
+# "June 9, 2025" / "9 June 2025" / "6/9/2025" / "2025-06-09"
+DATE_PATTERN = re.compile(
+    rf'\b(?P<mdy_month>{MONTH_NAME})\s+(?P<mdy_day>\d{{1,2}})(?:st|nd|rd|th)?,?\s+(?P<mdy_year>\d{{4}})\b'
+    rf'|\b(?P<dmy_day>\d{{1,2}})\s+(?P<dmy_month>{MONTH_NAME}),?\s+(?P<dmy_year>\d{{4}})\b'
+    r'|\b(?P<us_month>\d{1,2})/(?P<us_day>\d{1,2})/(?P<us_year>\d{4})\b'
+    r'|\b(?P<iso_year>\d{4})-(?P<iso_month>\d{2})-(?P<iso_day>\d{2})\b',
+    re.IGNORECASE
+)
+
+# "MILL VALLEY, CA 94941" / "Louisville, KY, US"
+LOCATION_PATTERN = re.compile(
+    r"\b([A-Z][A-Za-z.'-]*(?:[ ]+[A-Z][A-Za-z.'-]*){0,3}),\s*([A-Z]{2})(?:\s+(\d{5})(?:-\d{4})?|,?\s+(?:US|USA|United States)\b)"
+)
+
+ESTIMATED_DELIVERY_PATTERN = re.compile(
+    r'\b(?:expected|estimated|scheduled)\s+delivery(?:\s+(?:date|by|on))?\s*:?\s*(?:[A-Za-z]+,?\s+)?',
+    re.IGNORECASE
+)
+
+# Statuses in order of precedence: a terminal status anywhere on the page wins
+STATUSES = ['Delivered', 'Delivery Exception', 'Out for Delivery', 'In Transit', 'Label Created']
+
+# (pattern, strong) per status; strong phrases are unambiguous on their own.
+# Carrier-specific phrases live in the carrier profiles
+GENERIC_STATUS_PATTERNS = {
+    'Delivered': [
+        (r'\b(?:package|item|shipment)\s+(?:was|has been)\s+delivered\b', True),
+        (r'\bdelivered\s+on\b', True),
+        (r'\bdelivered\b', False),
+    ],
+    'Delivery Exception': [
+        (r'\bdelivery\s+exception\b', True),
+        (r'\b(?:delivery attempted|attempted delivery|undeliverable|returned to sender)\b', True),
+    ],
+    'Out for Delivery': [
+        (r'\bout\s+for\s+delivery\b', True),
+    ],
+    'In Transit': [
+        (r'\bin\s+transit\b', True),
+        (r'\b(?:arrived at|departed|departed from|on its way|moving through network)\b', False),
+    ],
+    'Label Created': [
+        (r'\b(?:label created|shipping label created|pre-shipment|shipment information sent|label has been created)\b', True),
+    ],
+}
+
+def _compile(patterns):
+    return {
+        status: [(re.compile(pattern, re.IGNORECASE), strong) for pattern, strong in entries]
+        for status, entries in patterns.items()
+    }
+
+
+COMPILED_GENERIC_PATTERNS = _compile(GENERIC_STATUS_PATTERNS)
+
+
+def parse_date(match):
+    """
+    YYYY-MM-DD for a DATE_PATTERN match, or None if it is not a real date
+    """
+    groups = match.groupdict()
+    try:
+        if groups['mdy_month']:
+            year, month, day = groups['mdy_year'], MONTHS[groups['mdy_month'][:3].lower()], groups['mdy_day']
+        elif groups['dmy_month']:
+            year, month, day = groups['dmy_year'], MONTHS[groups['dmy_month'][:3].lower()], groups['dmy_day']
+        elif groups['us_month']:
+            year, month, day = groups['us_year'], groups['us_month'], groups['us_day']
+        else:
+            year, month, day = groups['iso_year'], groups['iso_month'], groups['iso_day']
+        return datetime(int(year), int(month), int(day)).strftime('%Y-%m-%d')
+    except (KeyError, ValueError):
+        return None
+
+
+class RuleBasedExtractor:
+    """
+    Deterministic extractor producing the same JSON fields as the AI analysis
+    plus a confidence score between 0 and 1
+    """
+    def extract(self, page_content, carrier_name, tracking_number):
+        text = page_content or ''
+        status, status_match, strong = self._find_status(text, carrier_name)
+
+        result = {
+            'status': status or 'Unknown',
+            'estimated_delivery': None,
+            'current_location': None,
+            'last_update': None,
+            'delivery_date': None,
+            'notes': None,
+            'confidence': 0.0,
+        }
+        if status is None:
+            return result
+
+        # Date and location closest to the status phrase
+        window_start = max(0, status_match.start() - CONTEXT_WINDOW)
+        window_end = min(len(text), status_match.end() + CONTEXT_WINDOW)
+        window = text[window_start:window_end]
+        anchor = status_match.start() - window_start
+
+        # An "Expected delivery <date>" date is a forecast, not the event date
+        estimated_delivery, estimated_start = self._estimated_delivery(text)
+        skip = {estimated_start - window_start} if estimated_start is not None else set()
+
+        event_date = self._nearest(DATE_PATTERN, window, anchor, parse_date, skip)
+        location = self._nearest(LOCATION_PATTERN, window, anchor, self._format_location)
+
+        result['last_update'] = event_date
+        result['current_location'] = location
+        if status == 'Delivered':
+            result['delivery_date'] = event_date
+        else:
+            result['estimated_delivery'] = estimated_delivery
+
+        line_start = text.rfind('\n', 0, status_match.start()) + 1
+        line_end = text.find('\n', status_match.end())
+        result['notes'] = text[line_start:line_end if line_end != -1 else len(text)].strip()[:200] or None
+
+        confidence = 0.6 if strong else 0.3
+        if event_date:
+            confidence += 0.2
+        if location:
+            confidence += 0.1
+        if tracking_number and tracking_number.lower() in text.lower():
+            confidence += 0.1
+        if status == 'Delivered' and not self._has_event_details(text, status_match.end()):
+            confidence = min(confidence, UNCONFIRMED_DELIVERED_CONFIDENCE)
+        result['confidence'] = round(min(confidence, 1.0), 2)
+
+        return result
+
+    def _find_status(self, text, carrier_name):
+        carrier_patterns = get_scrape_profile(carrier_name).compiled_status_patterns
+
+        weak_match = None
+        for status in STATUSES:
+            patterns = carrier_patterns.get(status, []) + COMPILED_GENERIC_PATTERNS.get(status, [])
+            for pattern, strong in patterns:
+                match = next(
+                    (match for match in pattern.finditer(text)
+                     if status != 'Delivered' or not self._qualified(text, match.start())),
+                    None
+                )
+                if match is None:
+                    continue
+                if strong:
+                    return status, match, True
+                if weak_match is None:
+                    weak_match = (status, match, False)
+
+        return weak_match or (None, None, False)
+
+    @staticmethod
+    def _qualified(text, start):
+        """
+        True when a negation or forecast word is among the few words before
+        `start` in the same sentence, line breaks included
+        """
+        before = text[max(0, start - 80):start].lower().replace('\u2019', "'")
+        breaks = list(SENTENCE_BREAK_PATTERN.finditer(before))
+        if breaks:
+            before = before[breaks[-1].end():]
+        words = WORD_PATTERN.findall(before)[-QUALIFIER_WINDOW_WORDS:]
+        return any(word in QUALIFIER_WORDS or word.endswith("n't") for word in words)
+
+    @staticmethod
+    def _has_event_details(text, end):
+        following = text[end:end + DELIVERED_EVIDENCE_WINDOW]
+        return bool(DATE_PATTERN.search(following) or LOCATION_PATTERN.search(following))
+
+    @staticmethod
+    def _nearest(pattern, window, anchor, convert, skip=()):
+        best, best_distance = None, None
+        for match in pattern.finditer(window):
+            if match.start() in skip:
+                continue
+            value = convert(match)
+            if value is None:
+                continue
+            # Carrier pages list event details after the status line, so prefer what follows it
+            distance = match.start() - anchor if match.start() >= anchor else 2 * (anchor - match.start())
+            if best_distance is None or distance < best_distance:
+                best, best_distance = value, distance
+        return best
+
+    @staticmethod
+    def _format_location(match):
+        city, state, zip_code = match.group(1), match.group(2), match.group(3)
+        location = f"{city.strip().upper()}, {state}"
+        return f"{location} {zip_code}" if zip_code else location
+
+    @staticmethod
+    def _estimated_delivery(text):
+        match = ESTIMATED_DELIVERY_PATTERN.search(text)
+        if match is None:
+            return None, None
+        date_match = DATE_PATTERN.search(text, match.end(), match.end() + 60)
+        if date_match is None:
+            return None, None
+        return parse_date(date_match), date_match.start()
@@ -0,0 +1,208 @@
+"""
+Background tracking jobs
+Runs slow order lookups off the request thread and persists their progress
+in app.db so clients can poll or stream it and jobs survive a restart
+"""
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import and_, or_
+
+logger = logging.getLogger(__name__)
+
+# Job configuration
+TRACKING_JOB_WORKERS = int(os.getenv('TRACKING_JOB_WORKERS', '4'))
+TRACKING_JOB_MAX_ATTEMPTS = int(os.getenv('TRACKING_JOB_MAX_ATTEMPTS', '2'))
+TRACKING_JOB_RETENTION = int(os.getenv('TRACKING_JOB_RETENTION', '86400'))  # seconds
+# A running job with no progress for this long is orphaned and resumable (above the lookup timeout)
+TRACKING_JOB_STALE_AFTER = int(os.getenv('TRACKING_JOB_STALE_AFTER', '300'))  # seconds
+
+# Job states
+QUEUED = 'queued'
+RUNNING = 'running'
+COMPLETED = 'completed'
+FAILED = 'failed'
+TERMINAL_STATES = (COMPLETED, FAILED)
+
+
+class TrackingJobManager:
+    """
+    Persistent job queue executed by a small thread pool.
+
+    The handler is called as handler(order_number, progress) and returns the
+    final response dict. progress(stage, partial_result) records intermediate
+    results that pollers see straight away. A handler raising LookupError
+    fails the job with that message.
+    """
+    def __init__(self, workers=TRACKING_JOB_WORKERS):
+        self.workers = workers
+        self._app = None
+        self._db = None
+        self._model = None
+        self._handler = None
+        self._executor = None
+        self._resume_timer = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app, handler):
+        from src.models.tracking_job import TrackingJob, db
+        self._app = app
+        self._db = db
+        self._model = TrackingJob
+        self._handler = handler
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='tracking-job')
+
+    def start(self):
+        """
+        Prune old jobs and resume unfinished ones; called once by the server
+        entry point, not on import. Jobs that were running when the previous
+        worker stopped only count as orphaned once stale, so they are picked
+        up by a second pass after TRACKING_JOB_STALE_AFTER
+        """
+        self.prune()
+        self.resume_pending()
+        self._resume_timer = threading.Timer(TRACKING_JOB_STALE_AFTER, self.resume_pending)
+        self._resume_timer.daemon = True
+        self._resume_timer.start()
+
+    def submit(self, order_number):
+        """
+        Persist a new job, queue it and return its state
+        """
+        now = time.time()
+        with self._app.app_context():
+            job = self._model(
+                id=uuid.uuid4().hex,
+                order_number=order_number,
+                state=QUEUED,
+                stage='queued',
+                attempts=0,
+                created_at=now,
+                updated_at=now
+            )
+            self._db.session.add(job)
+            self._db.session.commit()
+            job_data = job.to_dict()
+
+        logger.info(f"🧾 Queued tracking job {job_data['job_id']} for order {order_number}")
+        self._executor.submit(self._run, job_data)
+        return job_data
+
+    def get(self, job_id):
+        """
+        Current job state, or None for unknown jobs
+        """
+        with self._app.app_context():
+            job = self._db.session.get(self._model, job_id)
+            return job.to_dict() if job else None
+
+    def resume_pending(self):
+        """
+        Requeue queued jobs and running jobs whose worker went quiet.
+
+        Every process that resumes sees the same rows; _run() claims each job
+        against the row as read here, so a job resumed by several workers
+        still runs once, and a running job that is still making progress is
+        left to its worker.
+        """
+        cutoff = time.time() - TRACKING_JOB_STALE_AFTER
+        with self._app.app_context():
+            jobs = [
+                job.to_dict() for job in self._model.query.filter(or_(
+                    self._model.state == QUEUED,
+                    and_(self._model.state == RUNNING, self._model.updated_at < cutoff)
+                )).all()
+            ]
+
+        for job in jobs:
+            logger.info(f"🔁 Resuming tracking job {job['job_id']}")
+            self._executor.submit(self._run, job)
+
+    def prune(self):
+        """
+        Delete finished jobs older than the retention window
+        """
+        cutoff = time.time() - TRACKING_JOB_RETENTION
+        with self._app.app_context():
+            self._model.query.filter(
+                self._model.state.in_(TERMINAL_STATES),
+                self._model.updated_at < cutoff
+            ).delete(synchronize_session=False)
+            self._db.session.commit()
+
+    def shutdown(self, wait=False):
+        if self._resume_timer is not None:
+            self._resume_timer.cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _run(self, job):
+        """
+        Claim and run a job, given its row as read when it was queued or resumed
+        """
+        job_id = job['job_id']
+
+        if job['attempts'] >= TRACKING_JOB_MAX_ATTEMPTS:
+            if self._claim(job, state=FAILED, stage='failed', error='Tracking job did not finish after restarts'):
+                logger.info(f"❌ Tracking job {job_id} failed after {job['attempts']} attempts")
+            return
+
+        if not self._claim(job, state=RUNNING, stage='started', attempts=job['attempts'] + 1):
+            logger.info(f"⏭️ Tracking job {job_id} claimed by another worker")
+            return
+
+        order_number = job['order_number']
+
+        def progress(stage, partial_result=None):
+            self._update(job_id, stage=stage, result=partial_result)
+
+        try:
+            result = self._handler(order_number, progress)
+            self._update(job_id, state=COMPLETED, stage='completed', result=result)
+            logger.info(f"✅ Tracking job {job_id} completed")
+        except LookupError as e:
+            self._update(job_id, state=FAILED, stage='failed', error=str(e))
+        except Exception as e:
+            logger.error(f"❌ Tracking job {job_id} failed: {e}")
+            self._update(
+                job_id,
+                state=FAILED,
+                stage='failed',
+                error='Unable to retrieve tracking information. Please try again later.'
+            )
+
+    def _claim(self, job, **fields):
+        """
+        Apply fields only if the job row is unchanged since `job` was read.
+        One conditional UPDATE, so of several workers racing for the same
+        job exactly one gets True
+        """
+        with self._lock, self._app.app_context():
+            claimed = self._model.query.filter_by(
+                id=job['job_id'], state=job['state'], updated_at=job['updated_at']
+            ).update({**fields, 'updated_at': time.time()}, synchronize_session=False)
+            self._db.session.commit()
+        return claimed == 1
+
+    def _update(self, job_id, result=None, **fields):
+        with self._lock, self._app.app_context():
+            job = self._db.session.get(self._model, job_id)
+            if job is None:
+                return
+            for name, value in fields.items():
+                setattr(job, name, value)
+            if result is not None:
+                job.result = json.dumps(result)
+            job.updated_at = time.time()
+            self._db.session.commit()
+
+
+_job_manager = TrackingJobManager()
+
+
+def get_job_manager():
+    return _job_manager
@@ -0,0 +1,303 @@
+"""
+Shared WooCommerce REST API client
+One pooled keep-alive HTTP session for all store traffic, with per-call
+timeouts and idempotent retries, plus an httpx-based async twin for the
+ASGI app
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import MaxRetryError, ResponseError
+from urllib3.util.retry import Retry
+from metrics import RETRIES, STAGE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# WooCommerce configuration
+WOOCOMMERCE_URL = os.getenv('WOOCOMMERCE_URL', "https://shop.humanfoodbar.com")
+WOOCOMMERCE_CONSUMER_KEY = os.getenv('WOOCOMMERCE_CONSUMER_KEY', "ck_e796b39727d0a0717194131cc4218eeea6dd43cd")
+WOOCOMMERCE_CONSUMER_SECRET = os.getenv('WOOCOMMERCE_CONSUMER_SECRET', "cs_f7aa55b988e4cc3fefe3c86da06bf45d9fd36574")
+
+# Connection pool and latency budget
+WOOCOMMERCE_POOL_SIZE = int(os.getenv('WOOCOMMERCE_POOL_SIZE', '10'))
+WOOCOMMERCE_CONNECT_TIMEOUT = float(os.getenv('WOOCOMMERCE_CONNECT_TIMEOUT', '3.05'))  # seconds
+WOOCOMMERCE_READ_TIMEOUT = float(os.getenv('WOOCOMMERCE_READ_TIMEOUT', '10'))  # seconds
+WOOCOMMERCE_MAX_RETRIES = int(os.getenv('WOOCOMMERCE_MAX_RETRIES', '2'))
+WOOCOMMERCE_RETRY_BACKOFF = float(os.getenv('WOOCOMMERCE_RETRY_BACKOFF', '0.3'))  # seconds
+# A longer Retry-After is not waited out: the 429/503 goes straight back to the caller
+WOOCOMMERCE_MAX_RETRY_AFTER = float(os.getenv('WOOCOMMERCE_MAX_RETRY_AFTER', str(WOOCOMMERCE_READ_TIMEOUT)))  # seconds
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class CappedRetry(Retry):
+    """
+    urllib3 Retry that hands back the response instead of sleeping through
+    a Retry-After longer than max_retry_after
+    """
+    max_retry_after = WOOCOMMERCE_MAX_RETRY_AFTER
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        retry_after = self.get_retry_after(response) if response is not None else None
+        if retry_after is not None and retry_after > self.max_retry_after:
+            logger.warning(f"⏳ WooCommerce asked to retry after {retry_after:.0f}s, not retrying")
+            # With raise_on_status=False urllib3 returns the response for this
+            raise MaxRetryError(_pool, url, ResponseError(f"Retry-After {retry_after:.0f}s exceeds {self.max_retry_after:.0f}s"))
+        return super().increment(method, url, response, error, _pool, _stacktrace)
+
+
+class WooCommerceClient:
+    """
+    WooCommerce v3 REST client over a single pooled requests.Session.
+
+    Connections to the store are kept alive and reused across requests and
+    gunicorn threads (the urllib3 pool is thread-safe). Only idempotent
+    methods are retried, with exponential backoff that honours Retry-After
+    up to WOOCOMMERCE_MAX_RETRY_AFTER.
+    """
+    def __init__(
+        self,
+        base_url=WOOCOMMERCE_URL,
+        consumer_key=WOOCOMMERCE_CONSUMER_KEY,
+        consumer_secret=WOOCOMMERCE_CONSUMER_SECRET,
+        pool_size=WOOCOMMERCE_POOL_SIZE,
+        timeout=(WOOCOMMERCE_CONNECT_TIMEOUT, WOOCOMMERCE_READ_TIMEOUT),
+        max_retries=WOOCOMMERCE_MAX_RETRIES,
+        retry_backoff=WOOCOMMERCE_RETRY_BACKOFF,
+    ):
+        self.api_url = f"{base_url.rstrip('/')}/wp-json/wc/v3"
+        self.timeout = timeout
+
+        retry = CappedRetry(
+            total=max_retries,
+            backoff_factor=retry_backoff,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset(['GET', 'HEAD', 'OPTIONS']),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        self.adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=pool_size,
+            max_retries=retry,
+        )
+
+        self.session = requests.Session()
+        self.session.auth = (consumer_key, consumer_secret)
+        self.session.headers.update({
+            'Accept': 'application/json',
+            'Accept-Encoding': 'gzip, deflate',
+            'Connection': 'keep-alive',
+            'User-Agent': 'enhanced-customer-tracking',
+        })
+        self.session.mount('https://', self.adapter)
+        self.session.mount('http://', self.adapter)
+
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'requests': 0,
+            'errors': 0,
+            'retries': 0,
+            'total_seconds': 0.0,
+        }
+
+    def get(self, path, params=None, timeout=None):
+        """
+        GET an API path such as 'orders' or 'orders/123'
+        """
+        return self.request('GET', path, params=params, timeout=timeout)
+
+    def request(self, method, path, timeout=None, **kwargs):
+        url = f"{self.api_url}/{path.lstrip('/')}"
+        started = time.monotonic()
+        retries = 0
+
+        try:
+            response = self.session.request(method, url, timeout=timeout or self.timeout, **kwargs)
+            history = getattr(response.raw, 'retries', None)
+            retries = len(history.history) if history is not None else 0
+            return response
+        except requests.RequestException:
+            with self._stats_lock:
+                self._stats['errors'] += 1
+            raise
+        finally:
+            elapsed = time.monotonic() - started
+            STAGE_SECONDS.observe(elapsed, stage='woocommerce_lookup')
+            if retries:
+                RETRIES.inc(retries, stage='woocommerce_lookup')
+            with self._stats_lock:
+                self._stats['requests'] += 1
+                self._stats['retries'] += retries
+                self._stats['total_seconds'] += elapsed
+
+    def pool_stats(self):
+        """
+        Request counters and per-host connection pool state for monitoring
+        """
+        with self._stats_lock:
+            stats = dict(self._stats)
+
+        pools = []
+        manager = self.adapter.poolmanager
+        if manager is not None:
+            for key in list(manager.pools.keys()):
+                pool = manager.pools.get(key)
+                if pool is None:
+                    continue
+                # The queue is pre-filled with None placeholders for unopened slots
+                idle = [conn for conn in list(pool.pool.queue) if conn is not None] if pool.pool is not None else []
+                pools.append({
+                    'host': pool.host,
+                    'maxsize': pool.pool.maxsize if pool.pool is not None else 0,
+                    'idle_connections': len(idle),
+                    'connections_opened': pool.num_connections,
+                    'requests': pool.num_requests,
+                })
+
+        stats['average_seconds'] = stats['total_seconds'] / stats['requests'] if stats['requests'] else 0.0
+        stats['pools'] = pools
+        return stats
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncWooCommerceClient:
+    """
+    WooCommerce v3 REST client over one pooled httpx.AsyncClient.
+
+    Same timeouts and retry policy as WooCommerceClient: idempotent methods
+    are retried on connection errors and RETRY_STATUSES with exponential
+    backoff that honours Retry-After up to max_retry_after. Bound to the
+    event loop that first uses it.
+    """
+    def __init__(
+        self,
+        base_url=WOOCOMMERCE_URL,
+        consumer_key=WOOCOMMERCE_CONSUMER_KEY,
+        consumer_secret=WOOCOMMERCE_CONSUMER_SECRET,
+        pool_size=WOOCOMMERCE_POOL_SIZE,
+        timeout=(WOOCOMMERCE_CONNECT_TIMEOUT, WOOCOMMERCE_READ_TIMEOUT),
+        max_retries=WOOCOMMERCE_MAX_RETRIES,
+        retry_backoff=WOOCOMMERCE_RETRY_BACKOFF,
+        max_retry_after=WOOCOMMERCE_MAX_RETRY_AFTER,
+    ):
+        self.api_url = f"{base_url.rstrip('/')}/wp-json/wc/v3"
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.max_retry_after = max_retry_after
+        self.client = httpx.AsyncClient(
+            auth=(consumer_key, consumer_secret),
+            timeout=httpx.Timeout(timeout[1], connect=timeout[0]),
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            headers={
+                'Accept': 'application/json',
+                'User-Agent': 'enhanced-customer-tracking',
+            },
+        )
+
+        self._stats = {
+            'requests': 0,
+            'errors': 0,
+            'retries': 0,
+            'retry_after_exceeded': 0,
+            'total_seconds': 0.0,
+        }
+
+    async def get(self, path, params=None, timeout=None):
+        """
+        GET an API path such as 'orders' or 'orders/123'
+        """
+        return await self.request('GET', path, params=params, timeout=timeout)
+
+    async def request(self, method, path, timeout=None, **kwargs):
+        url = f"{self.api_url}/{path.lstrip('/')}"
+        idempotent = method in ('GET', 'HEAD', 'OPTIONS')
+        if timeout is not None:
+            kwargs['timeout'] = timeout
+        started = time.monotonic()
+        retries = 0
+
+        try:
+            while True:
+                try:
+                    response = await self.client.request(method, url, **kwargs)
+                except httpx.TransportError:
+                    if not idempotent or retries >= self.max_retries:
+                        self._stats['errors'] += 1
+                        raise
+                    delay = self.retry_backoff * 2 ** retries
+                else:
+                    if response.status_code not in RETRY_STATUSES or not idempotent or retries >= self.max_retries:
+                        return response
+                    retry_after = self._retry_after(response)
+                    if retry_after is not None and retry_after > self.max_retry_after:
+                        self._stats['retry_after_exceeded'] += 1
+                        logger.warning(f"⏳ WooCommerce asked to retry after {retry_after:.0f}s, not retrying")
+                        return response
+                    delay = retry_after or self.retry_backoff * 2 ** retries
+                retries += 1
+                await asyncio.sleep(delay)
+        finally:
+            elapsed = time.monotonic() - started
+            STAGE_SECONDS.observe(elapsed, stage='woocommerce_lookup')
+            if retries:
+                RETRIES.inc(retries, stage='woocommerce_lookup')
+            self._stats['requests'] += 1
+            self._stats['retries'] += retries
+            self._stats['total_seconds'] += elapsed
+
+    @staticmethod
+    def _retry_after(response):
+        try:
+            return max(0.0, float(response.headers.get('Retry-After', '')))
+        except ValueError:
+            return None
+
+    def pool_stats(self):
+        stats = dict(self._stats)
+        stats['average_seconds'] = stats['total_seconds'] / stats['requests'] if stats['requests'] else 0.0
+        return stats
+
+    async def close(self):
+        await self.client.aclose()
+
+
+_client = WooCommerceClient()
+# Created on first use so it binds to the event loop that uses it
+_async_client = None
+_async_client_lock = threading.Lock()
+
+
+def get_woocommerce_client():
+    return _client
+
+
+def get_async_woocommerce_client():
+    global _async_client
+    with _async_client_lock:
+        if _async_client is None:
+            _async_client = AsyncWooCommerceClient()
+        return _async_client
+
+
+def async_woocommerce_client_stats():
+    """
+    Stats of the async client for /health, None until the ASGI app has used it
+    """
+    client = _async_client
+    return client.pool_stats() if client is not None else None
+
+
+async def close_async_woocommerce_client():
+    global _async_client
+    with _async_client_lock:
+        client, _async_client = _async_client, None
+    if client is not None:
+        await client.close()
@@ -0,0 +1,10 @@
+"""
+WSGI entry point
+The Flask app with its background services (job resumption, refresh
+scheduler, order sync) started, for gunicorn:
+
+    gunicorn --chdir src --worker-class gthread --threads 8 wsgi:app
+"""
+from main import app, start_background_services
+
+start_background_services()
@@ -0,0 +1,11 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules import each other by bare name from src/, as when the app runs there,
+# and reach the models as src.models
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+sys.path.insert(0, ROOT)
+# The benchmark scripts import their stand-ins by bare name from benchmarks/
+sys.path.append(os.path.join(ROOT, 'benchmarks'))
@@ -0,0 +1,65 @@
+import json
+import pytest
+import requests
+from bench_e2e import compare, percentile
+from fakes import CarrierPages, FakeWooCommerce, OpenAIStub, order_for
+
+
+@pytest.fixture
+def stand_in(request):
+    server = request.param().start()
+    yield server
+    server.stop()
+
+
+@pytest.mark.parametrize('stand_in', [FakeWooCommerce], indirect=True)
+def test_fake_woocommerce_serves_direct_bulk_and_search_lookups(stand_in):
+    base = f"{stand_in.url}/wp-json/wc/v3/orders"
+    assert requests.get(f"{base}/1001").json() == order_for(1001)
+    assert [order['id'] for order in requests.get(base, params={'include': '1,2,3'}).json()] == [1, 2, 3]
+    assert requests.get(base, params={'search': 'ACME-1'}).json() == []
+    assert stand_in.requests == 3
+
+
+@pytest.mark.parametrize('stand_in', [CarrierPages], indirect=True)
+def test_carrier_pages_fill_in_the_tracking_number(stand_in):
+    response = requests.get(stand_in.url_template.format(carrier='usps', tracking_number='9400111899000000001001'))
+    assert response.status_code == 200
+    assert '9400111899000000001001' in response.text
+    assert '{{tracking_number}}' not in response.text
+    assert requests.get(f"{stand_in.url}/unknown/1").status_code == 404
+
+
+@pytest.mark.parametrize('stand_in', [OpenAIStub], indirect=True)
+def test_openai_stub_answers_from_the_page_content(stand_in):
+    def ask(page_content):
+        response = requests.post(f"{stand_in.url}/v1/chat/completions", json={
+            'model': 'gpt-4o-mini',
+            'messages': [{'role': 'user', 'content': f"Page Content: {page_content} CRITICAL: mention delivered"}],
+        })
+        return json.loads(response.json()['choices'][0]['message']['content'])['status']
+
+    assert ask('Your item was delivered') == 'Delivered'
+    assert ask('Arrived at facility') == 'In Transit'
+
+
+def test_percentile_picks_the_nearest_rank():
+    values = [0.1 * n for n in range(1, 101)]
+    assert percentile(values, 0.50) == values[49]
+    assert percentile(values, 0.99) == values[98]
+    assert percentile([], 0.5) is None
+
+
+def run(rps, p95, achieved):
+    return {'target_rps': rps, 'achieved_rps': achieved, 'latency_seconds': {'p95': p95}}
+
+
+def test_compare_flags_slower_p95_and_lower_throughput(tmp_path):
+    baseline = tmp_path / 'baseline.json'
+    baseline.write_text(json.dumps({'runs': [run(5, 1.0, 5.0), run(10, 2.0, 10.0)]}))
+
+    results = {'runs': [run(5, 1.05, 4.9), run(10, 3.0, 7.0), run(20, 9.0, 1.0)]}
+    regressions = compare(results, baseline, threshold=0.1)
+
+    assert len(regressions) == 2
+    assert all(regression.startswith('10 rps') for regression in regressions)
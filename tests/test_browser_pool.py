@@ -0,0 +1,224 @@
+import asyncio
+import os
+import pytest
+import browser_pool
+from browser_pool import BrowserPool
+
+
+class FakeContext:
+    def __init__(self, browser):
+        self.browser = browser
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeBrowser:
+    def __init__(self, number):
+        self.number = number
+        self.connected = True
+        self.contexts = []
+
+    def is_connected(self):
+        return self.connected
+
+    async def new_context(self, **options):
+        context = FakeContext(self)
+        self.contexts.append(context)
+        return context
+
+    async def close(self):
+        self.connected = False
+
+
+class FakePlaywright:
+    async def start(self):
+        return self
+
+    async def stop(self):
+        pass
+
+
+class FakePool(BrowserPool):
+    name = 'fake'
+
+    def __init__(self, size=1, max_uses=10):
+        super().__init__(size, max_uses)
+        self.opened = []
+
+    async def _open_browser(self, slot):
+        browser = FakeBrowser(len(self.opened))
+        self.opened.append(browser)
+        return browser
+
+
+@pytest.fixture(autouse=True)
+def fake_playwright(monkeypatch):
+    monkeypatch.setattr(browser_pool, 'async_playwright', FakePlaywright)
+
+
+async def lookup(pool):
+    async with pool.new_context() as context:
+        return context
+
+
+async def settle():
+    # Let background replacements finish
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_lookups_reuse_the_pooled_browser_with_a_fresh_context():
+    async def run():
+        pool = FakePool()
+        first = await lookup(pool)
+        second = await lookup(pool)
+        await pool.close()
+        return pool, first, second
+
+    pool, first, second = asyncio.run(run())
+    assert first.browser is second.browser
+    assert first is not second
+    assert first.closed and second.closed
+    assert pool.stats['connects'] == 1
+    assert pool.stats['contexts'] == 2
+
+
+def test_browser_is_recycled_after_max_uses():
+    async def run():
+        pool = FakePool(max_uses=2)
+        contexts = [await lookup(pool) for _ in range(2)]
+        await settle()
+        contexts.append(await lookup(pool))
+        await pool.close()
+        return pool, contexts
+
+    pool, contexts = asyncio.run(run())
+    assert contexts[0].browser is contexts[1].browser
+    assert contexts[2].browser is not contexts[0].browser
+    assert not contexts[0].browser.connected
+    assert pool.stats['recycles'] == 1
+    assert pool.stats['connects'] == 2
+
+
+def test_dropped_browser_is_replaced_on_checkout():
+    async def run():
+        pool = FakePool()
+        first = await lookup(pool)
+        first.browser.connected = False
+        second = await lookup(pool)
+        await pool.close()
+        return pool, first, second
+
+    pool, first, second = asyncio.run(run())
+    assert second.browser is not first.browser
+    assert pool.stats['reconnects'] >= 1
+
+
+def test_pool_never_lends_a_browser_to_two_lookups_at_once():
+    async def run():
+        pool = FakePool(size=1)
+        active = []
+        overlap = []
+
+        async def borrow():
+            async with pool.new_context() as context:
+                if context.browser in active:
+                    overlap.append(context.browser)
+                active.append(context.browser)
+                await asyncio.sleep(0.01)
+                active.remove(context.browser)
+
+        await asyncio.gather(*(borrow() for _ in range(4)))
+        await pool.close()
+        return overlap
+
+    assert asyncio.run(run()) == []
+
+
+def test_failed_connect_is_retried_on_the_next_checkout():
+    async def run():
+        pool = FakePool()
+        original = pool._open_browser
+        failures = [ConnectionError('endpoint down')]
+
+        async def flaky(slot):
+            if failures:
+                raise failures.pop()
+            return await original(slot)
+
+        pool._open_browser = flaky
+        context = await lookup(pool)
+        await pool.close()
+        return pool, context
+
+    pool, context = asyncio.run(run())
+    assert context.browser.number == 0
+    assert pool.stats['connect_failures'] == 1
+    assert pool.stats['connects'] == 1
+
+
+class FakeLocalPool(browser_pool.LocalChromiumPool):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.opened = []
+
+    async def _open_browser(self, slot):
+        slot.marker = f"--tracking-pool-browser={len(self.opened)}"
+        slot.pid = None
+        browser = FakeBrowser(len(self.opened))
+        self.opened.append(browser)
+        return browser
+
+
+def test_backend_setting_picks_the_pool(monkeypatch):
+    monkeypatch.setattr(browser_pool, 'BROWSER_BACKEND', 'local')
+    assert isinstance(browser_pool.create_browser_pool('ws://unused'), browser_pool.LocalChromiumPool)
+
+    monkeypatch.setattr(browser_pool, 'BROWSER_BACKEND', 'browserless')
+    pool = browser_pool.create_browser_pool('ws://browserless.test')
+    assert isinstance(pool, browser_pool.BrowserlessPool)
+    assert pool.endpoint == 'ws://browserless.test'
+
+
+def test_local_browser_over_the_memory_limit_is_restarted(monkeypatch):
+    monkeypatch.setattr(browser_pool, 'find_process', lambda marker: 4242)
+    monkeypatch.setattr(browser_pool, 'process_tree_rss', lambda pid: 900 * 2 ** 20)
+
+    async def run():
+        pool = FakeLocalPool(size=1, max_pages=100, max_rss_mb=600)
+        first = await lookup(pool)
+        await settle()
+        await asyncio.sleep(0.05)
+        second = await lookup(pool)
+        await pool.close()
+        return pool, first, second
+
+    pool, first, second = asyncio.run(run())
+    assert second.browser is not first.browser
+    assert pool.stats['memory_restarts'] >= 1
+
+
+def test_local_browser_under_the_memory_limit_is_kept(monkeypatch):
+    monkeypatch.setattr(browser_pool, 'find_process', lambda marker: 4242)
+    monkeypatch.setattr(browser_pool, 'process_tree_rss', lambda pid: 100 * 2 ** 20)
+
+    async def run():
+        pool = FakeLocalPool(size=1, max_pages=100, max_rss_mb=600)
+        first = await lookup(pool)
+        second = await lookup(pool)
+        await pool.close()
+        return pool, first, second
+
+    pool, first, second = asyncio.run(run())
+    assert second.browser is first.browser
+    assert pool.stats['memory_restarts'] == 0
+    assert pool.snapshot()['max_rss_mb'] == 600
+
+
+def test_process_tree_rss_reads_this_process():
+    if not os.path.isdir('/proc/self'):
+        pytest.skip('needs /proc')
+    assert browser_pool.process_tree_rss(os.getpid()) > 0
+    assert browser_pool.find_process('--no-such-marker') is None
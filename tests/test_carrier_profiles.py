@@ -0,0 +1,55 @@
+import carrier_profiles
+from carrier_profiles import (
+    GENERIC_PROFILE, GENERIC_READY_SELECTORS, STATUS_TEXT_PATTERN, get_carrier_profile, get_scrape_profile
+)
+from routes.tracking import get_tracking_url
+from tracking_cache import STATUS_TTLS, status_ttl
+from tracking_extractor import RuleBasedExtractor
+
+
+def test_profiled_carriers_wait_on_their_own_selectors_only():
+    for name in ('usps', 'ups', 'fedex', 'dhl'):
+        profile = get_carrier_profile(name)
+        assert profile.ready_selector == ', '.join(profile.ready_selectors)
+        for generic in GENERIC_READY_SELECTORS:
+            assert generic not in profile.ready_selector
+            assert generic not in profile.ready_predicate
+
+
+def test_unknown_carrier_needs_status_text_in_a_generic_element():
+    profile = get_scrape_profile('Some Regional Courier')
+    assert profile is GENERIC_PROFILE
+    assert profile.ready_selector is None
+    assert 'querySelectorAll' in profile.ready_predicate
+    assert all(selector in profile.ready_predicate for selector in GENERIC_READY_SELECTORS)
+    assert STATUS_TEXT_PATTERN in profile.ready_predicate
+
+
+def test_aliases_resolve_to_the_carrier_profile():
+    assert get_carrier_profile(' Federal Express ') is get_carrier_profile('fedex')
+    assert get_carrier_profile('unknown') is None
+
+
+def test_tracking_urls_come_from_the_profile():
+    assert get_tracking_url('1Z999AA10123456784', 'UPS') == 'https://www.ups.com/track?loc=en_US&tracknum=1Z999AA10123456784'
+    assert get_tracking_url('123', 'Federal Express').startswith('https://www.fedex.com/')
+    assert get_tracking_url('123', 'Some Regional Courier') is None
+
+
+def test_url_override_points_every_carrier_at_one_host(monkeypatch):
+    monkeypatch.setattr(carrier_profiles, 'CARRIER_URL_OVERRIDE', 'http://127.0.0.1:9000/{carrier}/{tracking_number}')
+    assert get_carrier_profile('usps').tracking_url('940011') == 'http://127.0.0.1:9000/usps/940011'
+
+
+def test_carrier_status_patterns_drive_the_extractor():
+    text = 'Tracking Number: 9400111899223817563412\nDelivered, Front Door/Porch\nOctober 16, 2026, 3:04 pm\nAUSTIN, TX 78701'
+    result = RuleBasedExtractor().extract(text, 'USPS', '9400111899223817563412')
+    assert result['status'] == 'Delivered'
+    # The same phrase means nothing to the generic profile
+    assert RuleBasedExtractor().extract('Front Door/Porch', 'Some Regional Courier', '1')['status'] == 'Unknown'
+
+
+def test_cache_ttls_can_be_set_per_carrier():
+    assert status_ttl('usps', 'In Transit') == 2 * 60 * 60
+    assert status_ttl('ups', 'In Transit') == STATUS_TTLS['In Transit']
+    assert status_ttl('usps', 'Delivered') is None
@@ -0,0 +1,94 @@
+import pytest
+import circuit_breaker
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+
+class FakeTime:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeTime()
+    monkeypatch.setattr(circuit_breaker, 'time', fake)
+    return fake
+
+
+def breaker():
+    return CircuitBreaker('test', window=60, min_calls=4, failure_rate=0.5, open_seconds=30)
+
+
+def test_opens_once_the_failure_rate_is_reached(clock):
+    b = breaker()
+    b.record_failure()
+    b.record_failure()
+    b.record_success()
+    assert b.state == CLOSED
+
+    b.record_failure()
+    assert b.state == OPEN
+    with pytest.raises(CircuitOpenError) as error:
+        b.check()
+    assert error.value.retry_in == 30
+    assert b.stats()['short_circuited'] == 1
+
+
+def test_needs_min_calls_before_opening(clock):
+    b = breaker()
+    for _ in range(3):
+        b.record_failure()
+    assert b.state == CLOSED
+    b.check()
+
+
+def test_old_outcomes_leave_the_window(clock):
+    b = breaker()
+    for _ in range(3):
+        b.record_failure()
+    clock.now += 61
+    b.record_failure()
+    assert b.state == CLOSED
+    assert b.stats()['calls'] == 1
+
+
+def open_breaker(clock):
+    b = breaker()
+    for _ in range(4):
+        b.record_failure()
+    clock.now += 30
+    return b
+
+
+def test_half_open_lets_one_probe_through(clock):
+    b = open_breaker(clock)
+    b.check()
+    assert b.state == HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        b.check()
+
+    b.record_success()
+    assert b.state == CLOSED
+    assert b.stats()['calls'] == 0
+    b.check()
+
+
+def test_failed_probe_opens_again(clock):
+    b = open_breaker(clock)
+    b.check()
+    b.record_failure()
+    assert b.state == OPEN
+    assert b.stats()['opened'] == 2
+    with pytest.raises(CircuitOpenError):
+        b.check()
+
+
+def test_lost_probe_is_replaced(clock):
+    b = open_breaker(clock)
+    b.check()
+    clock.now += 30
+    b.check()
+    assert b.state == HALF_OPEN
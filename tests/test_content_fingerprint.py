@@ -0,0 +1,82 @@
+import asyncio
+from content_fingerprint import ContentFingerprints, content_fingerprint, normalize_page_text
+from tracking_cache import RULE_METHOD, TrackingResultCache
+
+AI_METHOD = 'browserless_stealth_AI'
+
+
+def page(stamp, status):
+    return f"USPS Tracking\nTracking Number: 9400111899223817563412\nStatus as of {stamp}: {status}\nAll rights reserved"
+
+
+def test_render_stamp_is_stripped_but_the_status_line_kept():
+    normalized = normalize_page_text(page('Oct 16, 2026 at 3:04 PM PDT', 'In Transit'), '9400111899223817563412')
+    assert 'status as of' in normalized
+    assert 'in transit' in normalized
+    assert 'oct' not in normalized and '2026' not in normalized
+
+
+def test_only_the_stamp_changing_keeps_the_fingerprint():
+    first = content_fingerprint(page('10/16/2026 3:04 PM', 'In Transit'))
+    second = content_fingerprint(page('10/17/2026 9:12 AM', 'In Transit'))
+    assert first == second
+
+
+def test_iso_and_epoch_render_stamps_are_stripped():
+    first = content_fingerprint(page('2026-10-16T15:04:00Z', 'In Transit'))
+    second = content_fingerprint(page('2026-10-17T09:12:30.120+02:00', 'In Transit'))
+    third = content_fingerprint(page('1760627040', 'In Transit'))
+    assert first == second == third
+
+
+def test_event_times_change_the_fingerprint():
+    events = "October 16, 2026, {time}\nArrived at USPS Regional Facility\nOctober 15, 2026, 8:10 pm\nIn Transit"
+    assert content_fingerprint(events.format(time='3:04 pm')) != content_fingerprint(events.format(time='9:12 pm'))
+
+
+def test_noise_does_not_change_the_fingerprint():
+    base = 'Your item was delivered in or at the mailbox'
+    noisy = f"{base}\na1b2c3d4e5f6a7b8c9d0e1f2a3b4 https://tools.usps.com/x?t=1760000000 3 minutes ago"
+    assert content_fingerprint(base) == content_fingerprint(noisy)
+
+
+def find(fingerprints, text):
+    return asyncio.run(fingerprints.find_reusable('usps', '9400111899223817563412', content_fingerprint(text)))
+
+
+def store(cache, text, method=AI_METHOD, status='In Transit'):
+    cache.set('usps', '9400111899223817563412', {
+        'carrier': 'usps',
+        'status': status,
+        'extraction_method': method,
+        'content_fingerprint': content_fingerprint(text),
+    })
+
+
+def test_status_change_on_a_volatile_phrase_line_is_changed():
+    cache = TrackingResultCache()
+    fingerprints = ContentFingerprints(cache)
+    store(cache, page('10/16/2026 3:04 PM', 'In Transit'))
+
+    assert find(fingerprints, page('10/17/2026 9:12 AM', 'Out for Delivery')) is None
+    assert fingerprints.stats()['changed'] == 1
+
+
+def test_unchanged_page_reuses_the_previous_result():
+    cache = TrackingResultCache()
+    fingerprints = ContentFingerprints(cache)
+    store(cache, page('10/16/2026 3:04 PM', 'In Transit'))
+
+    reused = find(fingerprints, page('10/16/2026 5:30 PM', 'In Transit'))
+    assert reused['status'] == 'In Transit'
+    assert fingerprints.stats()['reused'] == 1
+
+
+def test_rule_results_and_misses_are_not_reused():
+    cache = TrackingResultCache()
+    fingerprints = ContentFingerprints(cache)
+    assert find(fingerprints, page('today', 'In Transit')) is None
+
+    store(cache, page('10/16/2026', 'In Transit'), method=RULE_METHOD)
+    assert find(fingerprints, page('10/16/2026', 'In Transit')) is None
+    assert fingerprints.stats()['no_previous'] == 2
@@ -0,0 +1,59 @@
+from content_reducer import CHARS_PER_TOKEN, reduce_page_content, score_block, split_blocks
+
+TRACKING_NUMBER = '9400111899223817563412'
+
+EVENTS = [
+    'Delivered, In/At Mailbox',
+    'October 16, 2026, 3:04 pm',
+    'AUSTIN, TX 78701',
+    'Your item was delivered in or at the mailbox at 3:04 pm on October 16, 2026 in AUSTIN, TX 78701.',
+]
+
+
+def padded_page():
+    nav = [f"Menu item {n}: Shop stamps, Business, International" for n in range(80)]
+    footer = [f"Privacy Policy | Terms of Use | Careers | Copyright {n}" for n in range(80)]
+    return '\n'.join(nav + [f"Tracking Number: {TRACKING_NUMBER}"] + EVENTS + footer)
+
+
+def test_short_pages_are_left_alone():
+    page = '\n'.join(EVENTS)
+    assert reduce_page_content(page, TRACKING_NUMBER, 'usps') == page
+
+
+def test_long_pages_keep_the_tracking_events_within_budget():
+    page = padded_page()
+    reduced = reduce_page_content(page, TRACKING_NUMBER, 'usps', token_budget=100)
+
+    assert len(reduced) <= 100 * CHARS_PER_TOKEN
+    assert len(reduced) < len(page)
+    for event in EVENTS:
+        assert event in reduced
+    assert 'Privacy Policy' not in reduced
+
+
+def test_gaps_between_kept_windows_are_marked():
+    blocks = ['Status: Delivered to AUSTIN, TX 78701 on October 16, 2026'] + [f"filler {n}" for n in range(200)] + [
+        'Label created, shipment accepted at origin facility on October 12, 2026'
+    ]
+    reduced = reduce_page_content('\n'.join(blocks), None, 'usps', token_budget=60)
+    assert reduced.splitlines()[0].startswith('Status: Delivered')
+    assert '...' in reduced.splitlines()
+
+
+def test_boilerplate_scores_below_tracking_events():
+    assert score_block('Cookie settings and Privacy Policy', TRACKING_NUMBER) < 0
+    assert score_block(EVENTS[3], TRACKING_NUMBER) > score_block('Shop stamps and supplies', TRACKING_NUMBER)
+
+
+def test_long_lines_are_split_and_duplicates_dropped():
+    line = ' '.join(['The package is in transit to the next facility.'] * 20)
+    blocks = split_blocks(f"{line}\nSame line\nSame line")
+    assert all(len(block) <= 300 for block in blocks)
+    assert blocks.count('Same line') == 1
+
+
+def test_pages_with_nothing_relevant_keep_their_start():
+    page = '\n'.join(f"Lorem ipsum dolor sit amet {n}" for n in range(200))
+    reduced = reduce_page_content(page, None, 'usps', token_budget=50)
+    assert reduced == page[:50 * CHARS_PER_TOKEN]
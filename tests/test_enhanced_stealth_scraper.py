@@ -0,0 +1,88 @@
+import asyncio
+import httpx
+import openai
+import pytest
+import enhanced_stealth_scraper
+from enhanced_stealth_scraper import EnhancedStealthScraper
+
+
+@pytest.fixture
+def scraper(monkeypatch):
+    monkeypatch.setenv('OPENAI_API_KEY', 'test-key')
+    return EnhancedStealthScraper()
+
+
+def rate_limited(retry_after):
+    request = httpx.Request('POST', 'https://api.openai.com/v1/chat/completions')
+    response = httpx.Response(429, headers={'retry-after': retry_after}, request=request)
+    return openai.RateLimitError('rate limited', response=response, body=None)
+
+
+def fake_completions(monkeypatch, scraper, errors):
+    calls = []
+
+    async def create(**request):
+        calls.append(request)
+        if errors:
+            raise errors.pop(0)
+        return object()
+
+    monkeypatch.setattr(scraper.openai_client.chat.completions, 'create', create)
+    return calls
+
+
+def test_long_retry_after_is_returned_instead_of_slept_through(scraper, monkeypatch):
+    calls = fake_completions(monkeypatch, scraper, [rate_limited('120')])
+    monkeypatch.setattr(enhanced_stealth_scraper, 'OPENAI_MAX_RETRY_AFTER', 30)
+
+    async def no_sleep(delay):
+        pytest.fail(f"slept {delay}s")
+
+    monkeypatch.setattr(enhanced_stealth_scraper.asyncio, 'sleep', no_sleep)
+
+    with pytest.raises(openai.RateLimitError):
+        asyncio.run(scraper._create_chat_completion(model='gpt-4o-mini', messages=[]))
+    assert len(calls) == 1
+
+
+def test_short_retry_after_is_honoured(scraper, monkeypatch):
+    calls = fake_completions(monkeypatch, scraper, [rate_limited('2')])
+    monkeypatch.setattr(enhanced_stealth_scraper, 'OPENAI_MAX_RETRY_AFTER', 30)
+    delays = []
+
+    async def record_sleep(delay):
+        delays.append(delay)
+
+    monkeypatch.setattr(enhanced_stealth_scraper.asyncio, 'sleep', record_sleep)
+
+    asyncio.run(scraper._create_chat_completion(model='gpt-4o-mini', messages=[]))
+    assert len(calls) == 2
+    assert delays and delays[0] >= 2
+
+
+class CountingScraper:
+    def __init__(self):
+        self.active = 0
+        self.peak = 0
+        self.priorities = []
+
+    async def get_tracking_status(self, tracking_url, carrier_name, tracking_number, priority=None):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        self.priorities.append(priority)
+        await asyncio.sleep(0.01)
+        self.active -= 1
+        return {'tracking_number': tracking_number, 'status': 'In Transit'}
+
+
+def test_batch_fan_out_stays_within_the_concurrency_limit(monkeypatch):
+    scraper = CountingScraper()
+    monkeypatch.setattr(enhanced_stealth_scraper, '_scraper', scraper)
+    lookups = [(f"https://carrier.test/{n}", 'usps', str(n)) for n in range(12)]
+
+    futures = enhanced_stealth_scraper.submit_enhanced_stealth_tracking_batch(lookups, concurrency=3)
+    results = [future.result(5) for future in futures]
+
+    assert [result['tracking_number'] for result in results] == [str(n) for n in range(12)]
+    assert scraper.peak == 3
+    assert set(scraper.priorities) == {enhanced_stealth_scraper.BATCH}
@@ -0,0 +1,53 @@
+import asyncio
+import httpx
+import http_fetcher
+from http_fetcher import TIER_BROWSER, TIER_HTTP, TieredFetcher
+
+
+def fetcher_with(handler):
+    fetcher = TieredFetcher(enabled=True)
+    fetcher._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return fetcher
+
+
+def fetch(fetcher, carrier='usps'):
+    async def run():
+        try:
+            return await fetcher.fetch('https://tools.usps.com/go/TrackConfirmAction?tLabels=1', carrier, '1')
+        finally:
+            await fetcher.close()
+    return asyncio.run(run())
+
+
+def test_client_rendered_carriers_skip_the_http_tier():
+    fetcher = TieredFetcher(enabled=True)
+    assert fetcher.first_tier('UPS') == TIER_BROWSER
+    assert fetcher.first_tier('FedEx') == TIER_BROWSER
+    assert fetcher.first_tier('USPS') == TIER_HTTP
+
+
+def test_reading_stops_at_the_byte_cap(monkeypatch):
+    monkeypatch.setattr(http_fetcher, 'HTTP_FETCH_MAX_BYTES', 1024)
+    sent = []
+
+    async def body():
+        for _ in range(100):
+            sent.append(512)
+            yield b'<p>' + b'x' * 505 + b'</p>'
+
+    fetcher = fetcher_with(lambda request: httpx.Response(200, headers={'content-type': 'text/html'}, content=body()))
+    text = fetch(fetcher)
+
+    assert 0 < len(text) <= 1024
+    assert len(sent) < 100
+
+
+def test_error_status_returns_empty_text():
+    fetcher = fetcher_with(lambda request: httpx.Response(503, text='busy'))
+    assert fetch(fetcher) == ''
+    assert fetcher.stats()['http_errors'] == 1
+
+
+def test_json_responses_are_flattened():
+    fetcher = fetcher_with(lambda request: httpx.Response(200, json={'status': {'description': 'Delivered'}}))
+    assert fetch(fetcher) == 'status description: Delivered'
@@ -0,0 +1,69 @@
+import threading
+import pytest
+from metrics import MetricsRegistry, render_metrics
+
+
+@pytest.fixture
+def registry():
+    return MetricsRegistry()
+
+
+def test_counter_renders_labelled_samples(registry):
+    counter = registry.counter('lookups_total', 'Lookups', ('carrier', 'method'))
+    counter.inc(carrier='usps', method='rules')
+    counter.inc(2, carrier='usps', method='rules')
+    counter.inc(carrier='ups', method='ai')
+
+    lines = registry.render().splitlines()
+    assert lines[:2] == ['# HELP lookups_total Lookups', '# TYPE lookups_total counter']
+    assert 'lookups_total{carrier="usps",method="rules"} 3' in lines
+    assert 'lookups_total{carrier="ups",method="ai"} 1' in lines
+
+
+def test_label_values_are_escaped(registry):
+    counter = registry.counter('errors_total', 'Errors', ('reason',))
+    counter.inc(reason='bad "quote"\nnext')
+    assert 'errors_total{reason="bad \\"quote\\"\\nnext"} 1' in registry.render()
+
+
+def test_histogram_buckets_are_cumulative(registry):
+    histogram = registry.histogram('stage_seconds', 'Stage time', ('stage',), buckets=(0.1, 1))
+    for value in (0.05, 0.5, 5):
+        histogram.observe(value, stage='llm_call')
+
+    lines = registry.render().splitlines()
+    assert 'stage_seconds_bucket{stage="llm_call",le="0.1"} 1' in lines
+    assert 'stage_seconds_bucket{stage="llm_call",le="1.0"} 2' in lines
+    assert 'stage_seconds_bucket{stage="llm_call",le="+Inf"} 3' in lines
+    assert 'stage_seconds_count{stage="llm_call"} 3' in lines
+    assert 'stage_seconds_sum{stage="llm_call"} 5.55' in lines
+
+
+def test_histogram_timer_records_even_when_the_stage_fails(registry):
+    histogram = registry.histogram('stage_seconds', 'Stage time', ('stage',))
+    with pytest.raises(RuntimeError):
+        with histogram.time(stage='page_goto'):
+            raise RuntimeError('navigation failed')
+    assert 'stage_seconds_count{stage="page_goto"} 1' in registry.render()
+
+
+def test_counters_are_thread_safe(registry):
+    counter = registry.counter('hits_total', 'Hits')
+    threads = [threading.Thread(target=lambda: [counter.inc() for _ in range(1000)]) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert counter.value() == 8000
+
+
+def test_duplicate_names_are_rejected(registry):
+    registry.counter('hits_total', 'Hits')
+    with pytest.raises(ValueError):
+        registry.counter('hits_total', 'Hits again')
+
+
+def test_pipeline_metrics_are_exposed():
+    text = render_metrics()
+    for name in ('tracking_stage_duration_seconds', 'tracking_llm_tokens_total', 'tracking_cache_requests_total'):
+        assert f"# TYPE {name} " in text
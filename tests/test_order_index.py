@@ -0,0 +1,36 @@
+import pytest
+from flask import Flask
+from src.models.user import db
+from src.models.order_index import IndexedOrder, OrderSyncState  # noqa: F401 (registers the tables)
+from order_index import LocalOrderIndex
+
+
+@pytest.fixture
+def order_index(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'orders.db'}"
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+    index = LocalOrderIndex(enabled=True, sync_interval=60)
+    index.init_app(app, start_sync=False)
+    yield index
+    with app.app_context():
+        db.engine.dispose()
+
+
+def test_init_app_without_start_sync_starts_no_thread(order_index):
+    assert order_index.ready
+    assert order_index._thread is None
+
+
+def test_sync_reports_skip_while_another_sync_runs(order_index):
+    with order_index._sync_lock:
+        assert order_index.sync() is None
+
+
+def test_disabled_index_is_not_ready(tmp_path):
+    index = LocalOrderIndex(enabled=False)
+    index.init_app(Flask(__name__), start_sync=False)
+    assert not index.ready
+    assert index.sync() == 0
@@ -0,0 +1,95 @@
+import pytest
+from routes import tracking
+from routes.tracking import get_woocommerce_order, invalidate_order_cache, order_cache
+
+TRACKING_META = {'key': '_wc_shipment_tracking_items', 'value': [
+    {'tracking_provider': 'USPS', 'tracking_number': '9400111899223817563412'},
+]}
+
+
+class FakeResponse:
+    def __init__(self, status_code, payload=None):
+        self.status_code = status_code
+        self.payload = payload
+
+    def json(self):
+        return self.payload
+
+
+class FakeWooCommerce:
+    def __init__(self, orders):
+        self.orders = orders
+        self.calls = []
+
+    def get(self, endpoint, params=None):
+        self.calls.append(endpoint)
+        if endpoint.startswith('orders/'):
+            order = next((o for o in self.orders if str(o['id']) == endpoint.split('/', 1)[1]), None)
+            return FakeResponse(200, order) if order else FakeResponse(404, {})
+        return FakeResponse(200, [o for o in self.orders if params['search'] in (str(o['id']), o['number'])])
+
+
+def order(order_id, number=None):
+    return {
+        'id': order_id,
+        'number': number or str(order_id),
+        'status': 'processing',
+        'date_created': '2026-10-01T10:00:00',
+        'line_items': [{'name': 'Widget'}],
+        'meta_data': [TRACKING_META, {'key': '_billing_notes', 'value': 'leave at door'}],
+    }
+
+
+@pytest.fixture
+def woocommerce(monkeypatch):
+    order_cache.clear()
+    client = FakeWooCommerce([order(1001), order(1002, 'ACME-77')])
+    monkeypatch.setattr(tracking, 'get_woocommerce_client', lambda: client)
+    yield client
+    order_cache.clear()
+
+
+def test_numeric_input_uses_the_direct_id_endpoint(woocommerce):
+    found = get_woocommerce_order('1001')
+    assert found['id'] == 1001
+    assert woocommerce.calls == ['orders/1001']
+
+
+def test_custom_order_numbers_fall_back_to_search(woocommerce):
+    assert get_woocommerce_order('ACME-77')['id'] == 1002
+    assert woocommerce.calls == ['orders']
+
+
+def test_direct_hit_with_another_number_is_confirmed_by_search(woocommerce):
+    # 1002's number is ACME-77, so "1002" is only its ID; the search still decides
+    assert get_woocommerce_order('1002')['id'] == 1002
+    assert woocommerce.calls == ['orders/1002', 'orders']
+
+
+def test_repeat_lookups_are_served_from_the_cache(woocommerce):
+    get_woocommerce_order('ACME-77')
+    assert get_woocommerce_order('ACME-77')['id'] == 1002
+    assert get_woocommerce_order('1002')['number'] == 'ACME-77'
+    assert woocommerce.calls == ['orders']
+
+
+def test_cached_orders_are_slim(woocommerce):
+    cached = get_woocommerce_order('1001')
+    assert 'line_items' not in cached
+    assert cached['meta_data'] == [TRACKING_META]
+
+
+def test_invalidation_drops_every_alias(woocommerce):
+    get_woocommerce_order('ACME-77')
+    invalidate_order_cache('1002')
+    assert order_cache.get('ACME-77') is None
+    assert order_cache.get('1002') is None
+
+    get_woocommerce_order('ACME-77')
+    assert woocommerce.calls == ['orders', 'orders']
+
+
+def test_missing_orders_are_not_cached(woocommerce):
+    assert get_woocommerce_order('999') is None
+    assert get_woocommerce_order('999') is None
+    assert woocommerce.calls == ['orders/999', 'orders', 'orders/999', 'orders']
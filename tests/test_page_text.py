@@ -0,0 +1,28 @@
+from page_text import html_to_text
+
+
+def test_gt_inside_attributes_does_not_leak():
+    html = '<div><a title="x > y" href="/a">Delivered</a></div><p data-x="<p>">June 9, 2025</p>'
+    assert html_to_text(html).split('\n') == ['Delivered', 'June 9, 2025']
+
+
+def test_skipped_elements_and_comments():
+    html = (
+        '<html><head><title>Track</title><style>p > a { color: red }</style></head><body>'
+        '<script>if (a < b && c > d) { show("Delivered") }</script>'
+        '<!-- Delivered --><noscript>Enable JavaScript</noscript><svg><text>icon</text></svg>'
+        '<div>In Transit</div></body></html>'
+    )
+    assert html_to_text(html) == 'In Transit'
+
+
+def test_block_lines_entities_and_dedupe():
+    html = '<ul><li>Arrived at <b>USPS</b> facility</li><li>Out &amp; about</li><li>Arrived at USPS facility</li></ul>'
+    assert html_to_text(html).split('\n') == ['Arrived at USPS facility', 'Out & about']
+
+
+def test_max_chars_cap():
+    html = ''.join(f'<p>Event number {i} at the regional facility</p>' for i in range(20000))
+    text = html_to_text(html, max_chars=5000)
+    assert len(text) <= 5000
+    assert text.startswith('Event number 0 ')
@@ -0,0 +1,34 @@
+from refresh_scheduler import REFRESH_LEAD_FRACTION, REFRESH_MAX_BACKOFF, REFRESH_MIN_INTERVAL, refresh_interval
+from tracking_cache import RULE_METHOD, STATUS_TTLS, TRACKING_CACHE_RULE_TERMINAL_TTL
+
+AI_METHOD = 'browserless_stealth_AI'
+
+
+def result(status, carrier='UPS', method=AI_METHOD):
+    return {'status': status, 'carrier': carrier, 'extraction_method': method}
+
+
+def test_refresh_ahead_of_the_status_ttl():
+    assert refresh_interval(result('In Transit')) == STATUS_TTLS['In Transit'] * REFRESH_LEAD_FRACTION
+    assert refresh_interval(result('Label Created')) == STATUS_TTLS['Label Created'] * REFRESH_LEAD_FRACTION
+
+
+def test_short_ttls_are_floored_at_the_minimum_interval():
+    assert refresh_interval(result('Out for Delivery')) == max(
+        REFRESH_MIN_INTERVAL, STATUS_TTLS['Out for Delivery'] * REFRESH_LEAD_FRACTION
+    )
+    assert refresh_interval({'status': 'Check tracking link', 'extraction_method': 'browserless_fallback'}) >= REFRESH_MIN_INTERVAL
+
+
+def test_terminal_status_is_not_refreshed():
+    assert refresh_interval(result('Delivered')) is None
+
+
+def test_rule_terminal_status_stays_scheduled_for_confirmation():
+    assert refresh_interval(result('Delivered', method=RULE_METHOD)) == TRACKING_CACHE_RULE_TERMINAL_TTL * REFRESH_LEAD_FRACTION
+
+
+def test_failures_back_off_exponentially_up_to_the_cap():
+    intervals = [refresh_interval(result('In Transit'), failures=n) for n in range(1, 4)]
+    assert intervals == [REFRESH_MIN_INTERVAL, REFRESH_MIN_INTERVAL * 2, REFRESH_MIN_INTERVAL * 4]
+    assert refresh_interval(result('Delivered'), failures=30) == REFRESH_MAX_BACKOFF
@@ -0,0 +1,91 @@
+import asyncio
+import pytest
+import resource_blocking
+from carrier_profiles import get_scrape_profile
+from resource_blocking import ResourceBlocker, block_reason
+
+USPS = get_scrape_profile('usps')
+
+
+@pytest.mark.parametrize('resource_type, url, reason', [
+    ('image', 'https://tools.usps.com/img/logo.png', 'resource_type'),
+    ('font', 'https://fonts.gstatic.com/s/roboto.woff2', 'resource_type'),
+    ('script', 'https://www.googletagmanager.com/gtm.js', 'blocked_domain'),
+    ('script', 'https://siteimproveanalytics.com/js/analytics.js', 'blocked_domain'),
+    ('document', 'https://tools.usps.com/go/TrackConfirmAction', None),
+    ('xhr', 'https://tools.usps.com/go/TrackConfirmAction/data', None),
+    ('script', 'https://cdn.example.com/app.js', None),
+    ('document', 'data:text/html,hi', None),
+])
+def test_block_decisions(resource_type, url, reason):
+    assert block_reason(resource_type, url, USPS) == reason
+
+
+def test_carrier_allow_list_wins_over_blocked_domains():
+    # Subdomains of an allowed carrier domain are never treated as third party
+    assert block_reason('script', 'https://tags.usps.com/analytics.js', USPS) is None
+
+
+def test_deny_lists_are_per_carrier():
+    assert block_reason('script', 'https://siteimproveanalytics.com/x.js', get_scrape_profile('ups')) is None
+
+
+def test_unlisted_third_parties_are_blocked_when_enabled(monkeypatch):
+    monkeypatch.setattr(resource_blocking, 'BLOCK_UNLISTED_THIRD_PARTY', True)
+    assert block_reason('script', 'https://cdn.example.com/app.js', USPS) == 'third_party'
+    # Carriers without an allow list keep third parties
+    assert block_reason('script', 'https://cdn.example.com/app.js', get_scrape_profile('unknown')) is None
+
+
+class FakeRequest:
+    def __init__(self, resource_type, url):
+        self.resource_type = resource_type
+        self.url = url
+
+
+class FakeRoute:
+    def __init__(self, resource_type, url):
+        self.request = FakeRequest(resource_type, url)
+        self.outcome = None
+
+    async def continue_(self):
+        self.outcome = 'continued'
+
+    async def abort(self, error_code):
+        self.outcome = 'aborted'
+
+
+class FakeContext:
+    async def route(self, pattern, handler):
+        self.handler = handler
+
+
+def test_attached_handler_aborts_and_counts_blocked_requests():
+    blocker = ResourceBlocker(enabled=True)
+    context = FakeContext()
+    routes = [
+        FakeRoute('document', 'https://tools.usps.com/go/TrackConfirmAction'),
+        FakeRoute('image', 'https://tools.usps.com/img/logo.png'),
+        FakeRoute('script', 'https://www.google-analytics.com/analytics.js'),
+    ]
+
+    async def run():
+        counts = await blocker.attach(context, 'usps')
+        for route in routes:
+            await context.handler(route)
+        return counts
+
+    counts = asyncio.run(run())
+    blocker.record(counts, 'usps')
+
+    assert [route.outcome for route in routes] == ['continued', 'aborted', 'aborted']
+    stats = blocker.stats()
+    assert stats['requests'] == 3
+    assert stats['blocked'] == 2
+    assert stats['by_reason'] == {'resource_type': 1, 'blocked_domain': 1}
+
+
+def test_disabled_blocker_installs_no_route():
+    context = FakeContext()
+    assert asyncio.run(ResourceBlocker(enabled=False).attach(context, 'usps')) is None
+    assert not hasattr(context, 'handler')
@@ -0,0 +1,70 @@
+import asyncio
+import concurrent.futures
+import threading
+import pytest
+from scraper_runtime import ScraperRuntime
+
+
+@pytest.fixture
+def runtime():
+    runtime = ScraperRuntime(name='test-runtime')
+    yield runtime
+    runtime.shutdown(timeout=5)
+
+
+async def current_loop():
+    return asyncio.get_running_loop(), threading.current_thread().name
+
+
+def test_coroutines_share_one_long_lived_loop(runtime):
+    first = runtime.run(current_loop())
+    second = runtime.run(current_loop())
+    assert first[0] is second[0]
+    assert first[1] == second[1] == 'test-runtime'
+
+
+def test_callers_on_many_threads_use_the_same_loop(runtime):
+    with concurrent.futures.ThreadPoolExecutor(max_workers=8) as pool:
+        loops = list(pool.map(lambda _: runtime.run(current_loop())[0], range(16)))
+    assert len({id(loop) for loop in loops}) == 1
+
+
+def test_timeout_cancels_the_coroutine(runtime):
+    cancelled = threading.Event()
+
+    async def slow():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    with pytest.raises(concurrent.futures.TimeoutError):
+        runtime.run(slow(), timeout=0.05)
+    assert cancelled.wait(2)
+
+
+def test_shutdown_runs_hooks_and_cancels_outstanding_work(runtime):
+    closed = []
+
+    async def hook():
+        closed.append(True)
+
+    async def forever():
+        await asyncio.sleep(60)
+
+    runtime.add_shutdown_hook(hook)
+    future = runtime.submit(forever())
+    runtime.shutdown(timeout=5)
+
+    assert closed == [True]
+    assert future.cancelled()
+    assert not runtime.running
+
+
+def test_runtime_restarts_after_shutdown(runtime):
+    first = runtime.run(current_loop())[0]
+    runtime.shutdown(timeout=5)
+    second = runtime.run(current_loop())[0]
+    assert second is not first
+    assert runtime.running
@@ -0,0 +1,198 @@
+import asyncio
+import pytest
+import session_governor
+from session_governor import BACKGROUND, BATCH, INTERACTIVE, LookupPriority, SessionGovernor, SessionRejected
+from single_flight import AsyncSingleFlight
+
+
+def run(coro):
+    return asyncio.run(asyncio.wait_for(coro, 5))
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+async def cancel(*tasks):
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def test_background_leaves_a_slot_for_interactive():
+    async def scenario():
+        governor = SessionGovernor(max_sessions=2, rate_per_minute=6000, burst=10, reserved_sessions=1)
+        await governor.acquire(BACKGROUND)
+        second_background = asyncio.ensure_future(governor.acquire(BACKGROUND))
+        await settle()
+        assert not second_background.done()
+
+        await governor.acquire(INTERACTIVE)
+        assert governor.stats()['active'] == 2
+        assert not second_background.done()
+
+        governor.release()
+        governor.release()
+        await settle()
+        assert second_background.done()
+        assert governor.stats()['active'] == 1
+    run(scenario())
+
+
+def test_batch_leaves_tokens_for_interactive():
+    async def scenario():
+        governor = SessionGovernor(max_sessions=5, rate_per_minute=0.01, burst=2, reserved_tokens=1)
+        await governor.acquire(BATCH)
+        waiting_batch = asyncio.ensure_future(governor.acquire(BATCH))
+        await settle()
+        assert not waiting_batch.done()
+
+        await governor.acquire(INTERACTIVE)
+        assert governor.stats()['active'] == 2
+        await cancel(waiting_batch)
+    run(scenario())
+
+
+def test_single_session_is_not_reserved():
+    async def scenario():
+        governor = SessionGovernor(max_sessions=1, rate_per_minute=6000, burst=1)
+        assert governor.reserved_sessions == 0
+        assert governor.reserved_tokens == 0
+        await governor.acquire(BACKGROUND)
+        assert governor.stats()['active'] == 1
+    run(scenario())
+
+
+def test_raised_priority_moves_a_waiter_into_the_reserved_slot():
+    async def scenario():
+        governor = SessionGovernor(max_sessions=2, rate_per_minute=6000, burst=10, reserved_sessions=1)
+        await governor.acquire(BACKGROUND)
+        priority = LookupPriority(BACKGROUND)
+        waiter = asyncio.ensure_future(governor.acquire(priority))
+        await settle()
+        assert not waiter.done()
+
+        assert priority.raise_to(INTERACTIVE)
+        await settle()
+        assert waiter.done() and waiter.exception() is None
+        assert governor.stats()['active'] == 2
+        assert not priority.raise_to(BACKGROUND)
+        assert priority.value == INTERACTIVE
+    run(scenario())
+
+
+def test_full_queue_displaces_lower_priority_waiters():
+    async def scenario():
+        governor = SessionGovernor(max_sessions=1, rate_per_minute=6000, burst=10, queue_max=1)
+        await governor.acquire(INTERACTIVE)
+        background = asyncio.ensure_future(governor.acquire(BACKGROUND))
+        await settle()
+        interactive = asyncio.ensure_future(governor.acquire(INTERACTIVE))
+        await settle()
+
+        with pytest.raises(SessionRejected) as rejected:
+            await background
+        assert rejected.value.reason == 'queue_full'
+        with pytest.raises(SessionRejected):
+            await governor.acquire(BATCH)
+        assert not interactive.done()
+        await cancel(interactive)
+        assert governor.stats()['waiting'] == 0
+    run(scenario())
+
+
+def test_interactive_follower_raises_a_background_flight():
+    async def scenario():
+        governor = SessionGovernor(max_sessions=2, rate_per_minute=6000, burst=10, reserved_sessions=1)
+        flight = AsyncSingleFlight('test')
+        await governor.acquire(BACKGROUND)
+        calls = []
+
+        async def lookup(tracking_number, priority=INTERACTIVE):
+            calls.append(tracking_number)
+            async with governor.session(priority):
+                return {'status': 'In Transit', 'priority': priority.value}
+
+        refresh = asyncio.ensure_future(flight.do('1Z', lookup, '1Z', priority=BACKGROUND))
+        await settle()
+        assert not refresh.done()
+
+        customer = asyncio.ensure_future(flight.do('1Z', lookup, '1Z', priority=INTERACTIVE))
+        result = await customer
+        assert result == {'status': 'In Transit', 'priority': INTERACTIVE}
+        assert await refresh == result
+        assert calls == ['1Z']
+    run(scenario())
+
+
+def test_background_follower_does_not_lower_a_flight():
+    async def scenario():
+        flight = AsyncSingleFlight('test')
+        release = asyncio.Event()
+        seen = []
+
+        async def lookup(priority=INTERACTIVE):
+            seen.append(priority)
+            await release.wait()
+            return priority.value
+
+        leader = asyncio.ensure_future(flight.do('key', lookup, priority=INTERACTIVE))
+        await settle()
+        follower = asyncio.ensure_future(flight.do('key', lookup, priority=BACKGROUND))
+        await settle()
+        release.set()
+        assert await leader == INTERACTIVE
+        assert await follower == INTERACTIVE
+        assert len(seen) == 1
+    run(scenario())
+
+
+def test_waiter_is_rejected_at_its_queue_timeout(monkeypatch):
+    monkeypatch.setitem(session_governor.QUEUE_TIMEOUTS, BATCH, 0.05)
+
+    async def scenario():
+        governor = SessionGovernor(max_sessions=1, rate_per_minute=6000, burst=10)
+        await governor.acquire(INTERACTIVE)
+        with pytest.raises(SessionRejected) as rejected:
+            await governor.acquire(BATCH)
+        assert rejected.value.reason == 'queue_timeout'
+        assert governor.stats()['waiting'] == 0
+        assert governor.stats()['rejected_queue_timeout'] == 1
+    run(scenario())
+
+
+def test_promoted_waiter_takes_the_shorter_timeout(monkeypatch):
+    monkeypatch.setitem(session_governor.QUEUE_TIMEOUTS, BATCH, 10)
+    monkeypatch.setitem(session_governor.QUEUE_TIMEOUTS, INTERACTIVE, 0.05)
+
+    async def scenario():
+        governor = SessionGovernor(max_sessions=1, rate_per_minute=6000, burst=10)
+        await governor.acquire(INTERACTIVE)
+        priority = LookupPriority(BATCH)
+        waiter = asyncio.ensure_future(governor.acquire(priority))
+        await settle()
+
+        priority.raise_to(INTERACTIVE)
+        with pytest.raises(SessionRejected) as rejected:
+            await asyncio.wait_for(waiter, 1)
+        assert rejected.value.reason == 'queue_timeout'
+        assert rejected.value.priority == INTERACTIVE
+    run(scenario())
+
+
+def test_promotion_never_extends_the_timeout(monkeypatch):
+    monkeypatch.setitem(session_governor.QUEUE_TIMEOUTS, BACKGROUND, 0.05)
+    monkeypatch.setitem(session_governor.QUEUE_TIMEOUTS, BATCH, 10)
+
+    async def scenario():
+        governor = SessionGovernor(max_sessions=1, rate_per_minute=6000, burst=10)
+        await governor.acquire(INTERACTIVE)
+        priority = LookupPriority(BACKGROUND)
+        waiter = asyncio.ensure_future(governor.acquire(priority))
+        await settle()
+
+        priority.raise_to(BATCH)
+        with pytest.raises(SessionRejected):
+            await asyncio.wait_for(waiter, 1)
+    run(scenario())
@@ -0,0 +1,160 @@
+import asyncio
+import threading
+import time
+import pytest
+from session_governor import BACKGROUND, INTERACTIVE
+from single_flight import AsyncSingleFlight, SingleFlight
+
+
+def test_concurrent_sync_callers_share_one_call():
+    flight = SingleFlight('test')
+    calls = []
+    started = threading.Event()
+    release = threading.Event()
+
+    def lookup(key):
+        calls.append(key)
+        started.set()
+        release.wait(2)
+        return {'key': key}
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do('1001', lookup, '1001')))
+    leader.start()
+    started.wait(2)
+    followers = [threading.Thread(target=lambda: results.append(flight.do('1001', lookup, '1001'))) for _ in range(3)]
+    for follower in followers:
+        follower.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in [leader] + followers:
+        thread.join(2)
+
+    assert calls == ['1001']
+    assert results == [{'key': '1001'}] * 4
+    assert flight.in_flight() == 0
+
+
+def test_sync_errors_reach_every_caller_and_are_not_cached():
+    flight = SingleFlight('test')
+    started = threading.Event()
+    release = threading.Event()
+
+    def failing():
+        started.set()
+        release.wait(2)
+        raise LookupError('Order 404 not found')
+
+    errors = []
+
+    def call():
+        try:
+            flight.do('404', failing)
+        except LookupError as e:
+            errors.append(str(e))
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    started.wait(2)
+    follower = threading.Thread(target=call)
+    follower.start()
+    time.sleep(0.05)
+    release.set()
+    leader.join(2)
+    follower.join(2)
+
+    assert errors == ['Order 404 not found'] * 2
+    assert flight.do('404', lambda: 'found now') == 'found now'
+
+
+def test_async_callers_share_one_lookup():
+    flight = AsyncSingleFlight('test')
+    calls = []
+
+    async def lookup(key):
+        calls.append(key)
+        await asyncio.sleep(0.01)
+        return key.upper()
+
+    async def run():
+        return await asyncio.gather(*(flight.do('abc', lookup, 'abc') for _ in range(5)))
+
+    assert asyncio.run(run()) == ['ABC'] * 5
+    assert calls == ['abc']
+    assert flight.in_flight() == 0
+
+
+def test_async_errors_propagate_to_every_caller():
+    flight = AsyncSingleFlight('test')
+
+    async def lookup():
+        await asyncio.sleep(0.01)
+        raise RuntimeError('carrier down')
+
+    async def run():
+        return await asyncio.gather(*(flight.do('k', lookup) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert [str(result) for result in results] == ['carrier down'] * 3
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+def test_cancelled_follower_does_not_cancel_the_shared_lookup():
+    flight = AsyncSingleFlight('test')
+
+    async def lookup():
+        await asyncio.sleep(0.05)
+        return 'done'
+
+    async def run():
+        leader = asyncio.ensure_future(flight.do('k', lookup))
+        follower = asyncio.ensure_future(flight.do('k', lookup))
+        await asyncio.sleep(0.01)
+        follower.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await follower
+        return await leader
+
+    assert asyncio.run(run()) == 'done'
+
+
+def test_lookup_is_cancelled_once_every_caller_has_gone():
+    flight = AsyncSingleFlight('test')
+    cancelled = []
+
+    async def lookup():
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def run():
+        callers = [asyncio.ensure_future(flight.do('k', lookup)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        for caller in callers:
+            caller.cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        await asyncio.sleep(0)
+
+    asyncio.run(run())
+    assert cancelled == [True]
+
+
+def test_more_urgent_follower_raises_the_shared_priority():
+    flight = AsyncSingleFlight('test')
+    seen = []
+
+    async def lookup(priority):
+        await asyncio.sleep(0.01)
+        seen.append(priority.value)
+        return 'ok'
+
+    async def run():
+        background = asyncio.ensure_future(flight.do('k', lookup, priority=BACKGROUND))
+        await asyncio.sleep(0)
+        await flight.do('k', lookup, priority=INTERACTIVE)
+        await background
+
+    asyncio.run(run())
+    assert seen == [INTERACTIVE]
@@ -0,0 +1,50 @@
+from tracking_cache import (
+    LRUCache, RULE_METHOD, STATUS_TTLS, TRACKING_CACHE_NEGATIVE_TTL, TRACKING_CACHE_RULE_TERMINAL_TTL,
+    TrackingResultCache, ttl_for_result,
+)
+
+
+def test_status_ttls():
+    assert ttl_for_result({'status': 'Out for Delivery', 'extraction_method': 'browserless_stealth_AI'}) == STATUS_TTLS['Out for Delivery']
+    assert ttl_for_result({'status': 'Delivered', 'extraction_method': 'browserless_stealth_AI'}) is None
+
+
+def test_carrier_profile_overrides_ttl():
+    result = {'status': 'In Transit', 'carrier': 'USPS', 'extraction_method': 'browserless_stealth_AI'}
+    assert ttl_for_result(result) == 2 * 60 * 60
+
+
+def test_fallback_gets_negative_ttl():
+    result = {'status': 'Check tracking link for current status', 'extraction_method': 'browserless_fallback'}
+    assert ttl_for_result(result) == TRACKING_CACHE_NEGATIVE_TTL
+
+
+def test_rule_terminal_status_is_not_final():
+    result = {'status': 'Delivered', 'carrier': 'UPS', 'extraction_method': RULE_METHOD}
+    assert ttl_for_result(result) == TRACKING_CACHE_RULE_TERMINAL_TTL
+
+
+def test_rule_non_terminal_status_keeps_status_ttl():
+    result = {'status': 'Out for Delivery', 'carrier': 'UPS', 'extraction_method': RULE_METHOD}
+    assert ttl_for_result(result) == STATUS_TTLS['Out for Delivery']
+
+
+def test_lru_expiry_and_eviction():
+    cache = LRUCache(2)
+    cache.set('a', 1, ttl=-1)
+    assert cache.get('a') is None
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+
+
+def test_memory_only_cache_round_trip():
+    cache = TrackingResultCache(max_entries=8)
+    result = {'status': 'In Transit', 'carrier': 'UPS', 'extraction_method': 'browserless_stealth_AI'}
+    cache.set('UPS', '1z999', result)
+    assert cache.get('ups', '1Z999 ') == result
+    cache.invalidate('UPS', '1Z999')
+    assert cache.get('UPS', '1Z999') is None
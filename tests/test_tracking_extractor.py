@@ -0,0 +1,93 @@
+import pytest
+
+from tracking_extractor import RULE_EXTRACTION_MIN_CONFIDENCE, RuleBasedExtractor
+
+
+@pytest.fixture
+def extractor():
+    return RuleBasedExtractor()
+
+
+@pytest.mark.parametrize('text', [
+    'Your package is expected to be delivered on June 12, 2025. MILL VALLEY, CA 94941',
+    'Shipment scheduled to be delivered on June 12, 2025 by end of day',
+    'In transit. Will be delivered on Thursday, June 12, 2025',
+    'Estimated delivered on June 12, 2025',
+    'Package not delivered on June 11, 2025, next attempt tomorrow',
+])
+def test_forecast_phrasing_is_not_delivered(extractor, text):
+    result = extractor.extract(text, 'USPS', '9400111899223197428490')
+    assert result['status'] != 'Delivered'
+
+
+def test_forecast_on_ups_page_is_not_delivered(extractor):
+    text = 'Scheduled to be delivered on Monday, June 16 by End of Day\nIn Transit\nLouisville, KY, US'
+    result = extractor.extract(text, 'UPS', '1Z999AA10123456784')
+    assert result['status'] == 'In Transit'
+
+
+def test_delivered_on_is_strong(extractor):
+    text = 'Tracking 1Z999AA10123456784\nDelivered on June 9, 2025 at 4:11 pm\nMILL VALLEY, CA 94941'
+    result = extractor.extract(text, 'UPS', '1Z999AA10123456784')
+    assert result['status'] == 'Delivered'
+    assert result['delivery_date'] == '2025-06-09'
+    assert result['current_location'] == 'MILL VALLEY, CA 94941'
+    assert result['confidence'] >= RULE_EXTRACTION_MIN_CONFIDENCE
+
+
+def test_has_been_delivered(extractor):
+    result = extractor.extract('Your package has been delivered. June 9, 2025', 'DHL', '1234567890')
+    assert result['status'] == 'Delivered'
+
+
+def test_usps_carrier_phrase(extractor):
+    text = 'Delivered, In/At Mailbox\nJune 9, 2025, 4:11 pm\nMILL VALLEY, CA 94941'
+    result = extractor.extract(text, 'USPS', '9400111899223197428490')
+    assert result['status'] == 'Delivered'
+    assert result['confidence'] >= RULE_EXTRACTION_MIN_CONFIDENCE
+
+
+def test_estimated_delivery_is_not_the_event_date(extractor):
+    text = 'In Transit\nArrived at facility June 8, 2025\nExpected Delivery by Thursday, June 12, 2025'
+    result = extractor.extract(text, 'USPS', '9400111899223197428490')
+    assert result['status'] == 'In Transit'
+    assert result['estimated_delivery'] == '2025-06-12'
+    assert result['last_update'] == '2025-06-08'
+
+
+def test_terminal_status_wins_over_transit(extractor):
+    text = 'In Transit June 8, 2025\nDelivery Exception: address not found June 9, 2025'
+    assert extractor.extract(text, 'FedEx', '123456789012')['status'] == 'Delivery Exception'
+
+
+def test_no_status(extractor):
+    result = extractor.extract('Enter your tracking number', 'FedEx', '123456789012')
+    assert result['status'] == 'Unknown'
+    assert result['confidence'] == 0.0
+
+
+@pytest.mark.parametrize('text', [
+    'Your package has not been delivered on time. We are sorry for the delay. June 12, 2025',
+    "Package wasn't delivered on June 11, 2025. MILL VALLEY, CA 94941",
+    'Package wasn’t delivered on June 11, 2025',
+    'Expected to be\ndelivered on Thursday, June 12, 2025\nMILL VALLEY, CA 94941',
+    "Your shipment hasn't been delivered on June 11, 2025",
+    'Will be\n  delivered on June 12, 2025',
+])
+def test_negated_and_forecast_phrasing_is_not_delivered(extractor, text):
+    result = extractor.extract(text, 'USPS', '9400111899223197428490')
+    assert result['status'] != 'Delivered'
+
+
+def test_negated_phrase_does_not_hide_a_later_delivery(extractor):
+    text = 'Not delivered on June 10, 2025 (no access).\nDelivered on June 11, 2025 MILL VALLEY, CA 94941'
+    result = extractor.extract(text, 'USPS', '9400111899223197428490')
+    assert result['status'] == 'Delivered'
+    assert result['delivery_date'] == '2025-06-11'
+
+
+def test_delivered_on_without_event_details_goes_to_the_ai(extractor):
+    text = 'Tracking 1Z999AA10123456784\nDelivered on Thursday\nThank you for shipping with us'
+    result = extractor.extract(text, 'UPS', '1Z999AA10123456784')
+    assert result['status'] == 'Delivered'
+    assert result['confidence'] < RULE_EXTRACTION_MIN_CONFIDENCE
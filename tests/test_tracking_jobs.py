@@ -0,0 +1,99 @@
+import threading
+import time
+import pytest
+from flask import Flask
+from src.models.user import db
+from src.models.tracking_job import TrackingJob
+from tracking_jobs import (
+    COMPLETED, FAILED, QUEUED, RUNNING, TRACKING_JOB_MAX_ATTEMPTS, TRACKING_JOB_STALE_AFTER, TrackingJobManager
+)
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'jobs.db'}"
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.engine.dispose()
+
+
+def add_job(app, job_id, state=QUEUED, attempts=0, age=0):
+    updated_at = time.time() - age
+    with app.app_context():
+        db.session.add(TrackingJob(id=job_id, order_number='1001', state=state, stage=state,
+                                   attempts=attempts, created_at=updated_at, updated_at=updated_at))
+        db.session.commit()
+
+
+def job_state(app, job_id):
+    with app.app_context():
+        return db.session.get(TrackingJob, job_id).to_dict()
+
+
+def counting_handler():
+    calls = []
+    lock = threading.Lock()
+
+    def handler(order_number, progress):
+        with lock:
+            calls.append(order_number)
+        time.sleep(0.05)
+        return {'success': True}
+    return handler, calls
+
+
+@pytest.mark.parametrize('state, age', [(QUEUED, 0), (RUNNING, TRACKING_JOB_STALE_AFTER + 1)])
+def test_job_resumed_by_several_workers_runs_once(app, state, age):
+    add_job(app, 'job1', state=state, age=age)
+    handler, calls = counting_handler()
+    managers = [TrackingJobManager(workers=2) for _ in range(3)]
+    for manager in managers:
+        manager.init_app(app, handler)
+    for manager in managers:
+        manager.start()
+    for manager in managers:
+        manager.shutdown(wait=True)
+
+    assert calls == ['1001']
+    job = job_state(app, 'job1')
+    assert job['state'] == COMPLETED
+    assert job['attempts'] == 1
+
+
+def test_init_app_does_not_resume(app):
+    add_job(app, 'job1')
+    handler, calls = counting_handler()
+    manager = TrackingJobManager(workers=1)
+    manager.init_app(app, handler)
+    manager.shutdown(wait=True)
+
+    assert calls == []
+    assert job_state(app, 'job1')['state'] == QUEUED
+
+
+def test_running_job_with_recent_progress_is_left_to_its_worker(app):
+    add_job(app, 'job1', state=RUNNING, attempts=1, age=5)
+    handler, calls = counting_handler()
+    manager = TrackingJobManager(workers=1)
+    manager.init_app(app, handler)
+    manager.start()
+    manager.shutdown(wait=True)
+
+    assert calls == []
+    assert job_state(app, 'job1')['state'] == RUNNING
+
+
+def test_job_out_of_attempts_fails_without_running(app):
+    add_job(app, 'job1', state=RUNNING, attempts=TRACKING_JOB_MAX_ATTEMPTS, age=TRACKING_JOB_STALE_AFTER + 1)
+    handler, calls = counting_handler()
+    manager = TrackingJobManager(workers=1)
+    manager.init_app(app, handler)
+    manager.start()
+    manager.shutdown(wait=True)
+
+    assert calls == []
+    assert job_state(app, 'job1')['state'] == FAILED
@@ -0,0 +1,104 @@
+import concurrent.futures
+import json
+import pytest
+from flask import Flask
+from routes import tracking
+
+ORDER = {
+    'id': 1001,
+    'number': '1001',
+    'status': 'completed',
+    'date_created': '2026-10-01T10:00:00',
+    'meta_data': [
+        {'key': '_wc_shipment_tracking_items', 'value': [
+            {'tracking_provider': 'UPS', 'tracking_number': '1Z999AA10123456784'},
+        ]},
+    ],
+}
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    app.register_blueprint(tracking.tracking_bp, url_prefix='/api')
+    return app.test_client()
+
+
+def test_track_order_returns_order_details_without_scraping(client, monkeypatch):
+    monkeypatch.setattr(tracking, 'get_woocommerce_order', lambda number: ORDER)
+    monkeypatch.setattr(tracking, 'get_enhanced_stealth_tracking', pytest.fail)
+
+    response = client.post('/api/track-order', json={'order_number': '1001'})
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['order_number'] == '1001'
+    assert body['tracking_number'] == '1Z999AA10123456784'
+    assert body['tracking_url'].endswith('1Z999AA10123456784')
+    assert 'enhanced_tracking' not in body
+
+
+def test_track_order_missing_order_is_404(client, monkeypatch):
+    monkeypatch.setattr(tracking, 'get_woocommerce_order', lambda number: None)
+
+    response = client.post('/api/track-order', json={'order_number': '404'})
+
+    assert response.status_code == 404
+    assert response.get_json()['success'] is False
+
+
+def test_track_order_runs_the_carrier_lookup_when_enhanced(client, monkeypatch):
+    monkeypatch.setattr(tracking, 'get_woocommerce_order', lambda number: ORDER)
+    monkeypatch.setattr(tracking, 'get_enhanced_stealth_tracking', lambda url, carrier, number: {
+        'success': True,
+        'status': 'Delivered',
+    })
+
+    response = client.post('/api/track-order', json={'order_number': '1001', 'enhanced': True})
+
+    assert response.status_code == 200
+    assert 'enhanced_tracking' in response.get_json()
+
+
+def completed(result):
+    future = concurrent.futures.Future()
+    future.set_result(result)
+    return future
+
+
+def test_batch_streams_one_ndjson_line_per_order(client, monkeypatch):
+    shared = {**ORDER, 'id': 1002, 'number': '1002'}
+    monkeypatch.setattr(tracking, 'get_woocommerce_orders', lambda numbers: {'1001': ORDER, '1002': shared})
+    submitted = []
+
+    def submit(lookups, concurrency):
+        submitted.append((lookups, concurrency))
+        return [completed({'status': 'Delivered', 'tracking_number': lookup[2]}) for lookup in lookups]
+
+    monkeypatch.setattr(tracking, 'submit_enhanced_stealth_tracking_batch', submit)
+
+    response = client.post('/api/track-orders', json={'order_numbers': ['1001', '1002', '404', '1001'], 'concurrency': 99})
+
+    assert response.mimetype == 'application/x-ndjson'
+    lines = response.get_data(as_text=True).splitlines()
+    results = [json.loads(line) for line in lines]
+    assert len(results) == 3
+    assert {result['order_number'] for result in results} == {'1001', '1002', '404'}
+    assert next(r for r in results if r['order_number'] == '404')['success'] is False
+    assert all(r['delivery_status'] == 'Delivered' for r in results if r['order_number'] != '404')
+
+    # Both orders share one shipment, scraped once, at the capped concurrency
+    lookups, concurrency = submitted[0]
+    assert len(lookups) == 1
+    assert concurrency == tracking.BATCH_TRACKING_MAX_CONCURRENCY
+
+
+@pytest.mark.parametrize('body', [{}, {'order_numbers': []}, {'order_numbers': '1001'}])
+def test_batch_needs_a_list_of_orders(client, body):
+    assert client.post('/api/track-orders', json=body).status_code == 400
+
+
+def test_batch_size_is_limited(client, monkeypatch):
+    monkeypatch.setattr(tracking, 'BATCH_MAX_ORDERS', 2)
+    response = client.post('/api/track-orders', json={'order_numbers': ['1', '2', '3']})
+    assert response.status_code == 400
@@ -0,0 +1,154 @@
+import base64
+import hashlib
+import hmac
+import json
+import pytest
+from flask import Flask
+from routes import webhooks
+from routes.tracking import order_cache
+from tracking_cache import get_tracking_cache
+
+SECRET = 'test-secret'
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(webhooks, 'WOOCOMMERCE_WEBHOOK_SECRET', SECRET)
+    app = Flask(__name__)
+    app.register_blueprint(webhooks.webhooks_bp, url_prefix='/api')
+    return app.test_client()
+
+
+def post(client, body, topic='order.updated'):
+    signature = base64.b64encode(hmac.new(SECRET.encode(), body, hashlib.sha256).digest()).decode()
+    return client.post('/api/webhooks/woocommerce', data=body, headers={
+        'X-WC-Webhook-Topic': topic,
+        'X-WC-Webhook-Signature': signature,
+        'Content-Type': 'application/json',
+    })
+
+
+@pytest.mark.parametrize('body', [b'[]', b'[{"id": 1}]', b'"order"', b'null', b'42'])
+def test_non_object_body_is_rejected(client, body):
+    response = post(client, body)
+    assert response.status_code == 400
+    assert response.get_json()['success'] is False
+
+
+def test_invalid_json_is_rejected(client):
+    assert post(client, b'{not json').status_code == 400
+    assert post(client, b'\xff\xfe').status_code == 400
+
+
+def test_bad_signature_is_rejected(client):
+    response = client.post('/api/webhooks/woocommerce', data=b'{}', headers={
+        'X-WC-Webhook-Topic': 'order.updated',
+        'X-WC-Webhook-Signature': 'bogus',
+    })
+    assert response.status_code == 401
+
+
+def test_order_without_id_keeps_other_cached_orders(client):
+    order_cache.set('2002', {'id': 2002, 'number': '2002'})
+    try:
+        response = post(client, json.dumps({'status': 'completed'}).encode())
+        assert response.status_code == 200
+        assert order_cache.get('2002') is not None
+    finally:
+        order_cache.clear()
+
+
+def test_ignored_topic(client):
+    response = post(client, b'[]', topic='product.updated')
+    assert response.status_code == 200
+    assert response.get_json()['ignored'] == 'product.updated'
+
+
+def test_order_webhook_drops_cached_tracking_results(client):
+    cache = get_tracking_cache()
+    delivered = {'carrier': 'UPS', 'status': 'Delivered', 'extraction_method': 'browserless_stealth_AI'}
+    cache.set('UPS', '1Z999AA10123456784', delivered)
+    cache.set('UPS', '1Z999AA10987654321', delivered)
+    order = {
+        'id': 3003,
+        'number': '3003',
+        'meta_data': [{
+            'key': '_wc_shipment_tracking_items',
+            'value': [{'tracking_number': '1Z999AA10123456784', 'tracking_provider': 'UPS'}],
+        }],
+    }
+    try:
+        assert post(client, json.dumps(order).encode()).status_code == 200
+        assert cache.get('UPS', '1Z999AA10123456784') is None
+        assert cache.get('UPS', '1Z999AA10987654321') is not None
+    finally:
+        cache.invalidate('UPS', '1Z999AA10987654321')
+
+
+def tracked_order(*tracking_numbers):
+    return {
+        'id': 4004,
+        'number': '4004',
+        'meta_data': [{
+            'key': '_wc_shipment_tracking_items',
+            'value': [{'tracking_number': number, 'tracking_provider': 'UPS'} for number in tracking_numbers],
+        }],
+    }
+
+
+def test_update_with_unchanged_tracking_keeps_cached_results(client):
+    cache = get_tracking_cache()
+    cache.set('UPS', '1Z999AA10123456784', {'carrier': 'UPS', 'status': 'In Transit', 'extraction_method': 'browserless_stealth_AI'})
+    order_cache.set('4004', tracked_order('1Z999AA10123456784'))
+    try:
+        updated = {**tracked_order('1Z999AA10123456784'), 'status': 'completed'}
+        assert post(client, json.dumps(updated).encode()).status_code == 200
+        assert cache.get('UPS', '1Z999AA10123456784') is not None
+        # The order itself is still refreshed
+        assert order_cache.get('4004') is None
+    finally:
+        cache.invalidate('UPS', '1Z999AA10123456784')
+        order_cache.clear()
+
+
+def test_corrected_tracking_number_drops_old_and_new_results(client):
+    cache = get_tracking_cache()
+    result = {'carrier': 'UPS', 'status': 'Delivered', 'extraction_method': 'browserless_stealth_AI'}
+    for number in ('1Z999AA10123456784', '1Z999AA10987654321', '1Z999AA10555555555'):
+        cache.set('UPS', number, result)
+    order_cache.set('4004', tracked_order('1Z999AA10123456784', '1Z999AA10555555555'))
+    try:
+        updated = tracked_order('1Z999AA10987654321', '1Z999AA10555555555')
+        assert post(client, json.dumps(updated).encode()).status_code == 200
+        assert cache.get('UPS', '1Z999AA10123456784') is None
+        assert cache.get('UPS', '1Z999AA10987654321') is None
+        assert cache.get('UPS', '1Z999AA10555555555') is not None
+    finally:
+        cache.invalidate('UPS', '1Z999AA10555555555')
+        order_cache.clear()
+
+
+class FakeIndex:
+    def __init__(self, order):
+        self.order = order
+
+    def get(self, key):
+        return self.order if str(key) == str(self.order['number']) else None
+
+    def handle_webhook(self, topic, order):
+        self.order = order
+
+
+def test_indexed_copy_decides_what_changed(client, monkeypatch):
+    index = FakeIndex(tracked_order('1Z999AA10123456784'))
+    monkeypatch.setattr(webhooks, 'get_order_index', lambda: index)
+    cache = get_tracking_cache()
+    cache.set('UPS', '1Z999AA10123456784', {'carrier': 'UPS', 'status': 'In Transit', 'extraction_method': 'browserless_stealth_AI'})
+    try:
+        assert post(client, json.dumps(tracked_order('1Z999AA10123456784')).encode()).status_code == 200
+        assert cache.get('UPS', '1Z999AA10123456784') is not None
+
+        assert post(client, json.dumps(tracked_order('1Z999AA10987654321')).encode()).status_code == 200
+        assert cache.get('UPS', '1Z999AA10123456784') is None
+    finally:
+        cache.invalidate('UPS', '1Z999AA10123456784')
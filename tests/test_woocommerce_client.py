@@ -0,0 +1,126 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import httpx
+import pytest
+from urllib3.exceptions import MaxRetryError
+from urllib3.response import HTTPResponse
+from woocommerce_client import AsyncWooCommerceClient, CappedRetry, WooCommerceClient
+
+
+def async_client(responses, **kwargs):
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return responses.pop(0)
+
+    client = AsyncWooCommerceClient(base_url='https://shop.test', retry_backoff=0, **kwargs)
+    client.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return client, requests
+
+
+def get(client):
+    async def call():
+        try:
+            return await client.get('orders/1')
+        finally:
+            await client.close()
+    return asyncio.run(call())
+
+
+def test_long_retry_after_is_not_waited_out():
+    client, requests = async_client([httpx.Response(429, headers={'Retry-After': '3600'})], max_retry_after=10)
+    response = get(client)
+    assert response.status_code == 429
+    assert len(requests) == 1
+    assert client.pool_stats()['retry_after_exceeded'] == 1
+    assert client.pool_stats()['retries'] == 0
+
+
+def test_short_retry_after_is_retried():
+    client, requests = async_client([
+        httpx.Response(429, headers={'Retry-After': '0'}),
+        httpx.Response(200, json={'id': 1}),
+    ], max_retry_after=10)
+    response = get(client)
+    assert response.status_code == 200
+    assert len(requests) == 2
+    assert client.pool_stats()['retries'] == 1
+
+
+def test_sync_retry_gives_up_on_long_retry_after():
+    retry = CappedRetry(total=2, status_forcelist=(429,), respect_retry_after_header=True)
+    with pytest.raises(MaxRetryError):
+        retry.increment('GET', '/orders', response=HTTPResponse(status=429, headers={'Retry-After': '3600'}))
+
+
+def test_sync_retry_honours_short_retry_after():
+    retry = CappedRetry(total=2, status_forcelist=(429,), respect_retry_after_header=True)
+    retry = retry.increment('GET', '/orders', response=HTTPResponse(status=429, headers={'Retry-After': '1'}))
+    assert isinstance(retry, CappedRetry)
+    assert retry.total == 1
+
+
+class StoreHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    statuses = []
+
+    def do_GET(self):
+        self.send_json()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.send_json()
+
+    def send_json(self):
+        status = self.statuses.pop(0) if self.statuses else 200
+        body = json.dumps({'path': self.path}).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def store():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StoreHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    StoreHandler.statuses = []
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_sync_client_reuses_one_keep_alive_connection(store):
+    client = WooCommerceClient(base_url=store, retry_backoff=0)
+    try:
+        for order_id in range(5):
+            response = client.get(f"orders/{order_id}")
+            assert response.json()['path'] == f"/wp-json/wc/v3/orders/{order_id}"
+
+        stats = client.pool_stats()
+        assert stats['requests'] == 5
+        assert [pool['connections_opened'] for pool in stats['pools']] == [1]
+    finally:
+        client.close()
+
+
+def test_sync_client_retries_idempotent_requests_only(store):
+    client = WooCommerceClient(base_url=store, retry_backoff=0)
+    try:
+        StoreHandler.statuses = [503]
+        assert client.get('orders/1').status_code == 200
+        assert client.pool_stats()['retries'] == 1
+
+        StoreHandler.statuses = [503]
+        assert client.request('POST', 'orders', json={}).status_code == 503
+        assert client.pool_stats()['retries'] == 1
+    finally:
+        client.close()